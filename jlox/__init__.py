@@ -1 +1,13 @@
 __version__ = '0.1.0'
+
+__all__ = ["Program", "compile"]
+
+
+def __getattr__(name):
+    # Imported on first use, so that tools which only need a small part of the
+    # package, like the client, do not load the whole interpreter.
+    if name in __all__:
+        import jlox.program
+
+        return getattr(jlox.program, name)
+    raise AttributeError(f"module 'jlox' has no attribute {name!r}")
@@ -1,15 +1,52 @@
+from textwrap import indent
+from typing import Any, Sequence
+
 from jlox.tokens import Token, TokenType
 from jlox.expression import (
+    AnonymousFunctionExpr,
+    AssignExpr,
+    CachedExpr,
+    CallExpr,
+    CommaExpr,
     Expr,
     ExprVisitor,
     BinaryExpr,
+    GetExpr,
     GroupingExpr,
+    IfElseExpr,
+    InlinedCallExpr,
+    InlinedGetterExpr,
     LiteralExpr,
+    LogicalExpr,
+    SetExpr,
+    SuperExpr,
+    ThisExpr,
     UnaryExpr,
+    VariableExpr,
+)
+from jlox.statement import (
+    BlockStmt,
+    BreakStmt,
+    ClassStmt,
+    CountingLoopStmt,
+    ExpressionStmt,
+    FunctionStmt,
+    IfStmt,
+    PrintStmt,
+    ReturnStmt,
+    Stmt,
+    StmtVisitor,
+    VarStmt,
+    WhileStmt,
 )
 
 
-class AstPrinter(ExprVisitor[str]):
+class AstPrinter(ExprVisitor[str], StmtVisitor[str]):
+    """
+    Prints trees as S-expressions. Statements that hold other statements put
+    each of them on its own indented line.
+    """
+
     def visitBinaryExpr(self, expr: BinaryExpr) -> str:
         return self._parenthesize(expr.operator.lexeme, expr.left, expr.right)
 
@@ -17,21 +54,137 @@ class AstPrinter(ExprVisitor[str]):
         return self._parenthesize('group', expr.expression)
 
     def visitLiteralExpr(self, expr: LiteralExpr) -> str:
-        return str(expr.value or 'nil')
+        if expr.value is None:
+            return 'nil'
+        if isinstance(expr.value, bool):
+            return 'true' if expr.value else 'false'
+        if isinstance(expr.value, str):
+            return f'"{expr.value}"'
+        return str(expr.value)
 
     def visitUnaryExpr(self, expr: UnaryExpr) -> str:
         return self._parenthesize(expr.operator.lexeme, expr.right)
-    
-    def print(self, expr: Expr) -> str:
-        return expr.accept(self)
 
-    def _parenthesize(self, name: str, *exprs: Expr) -> str:
+    def visitAssignExpr(self, expr: AssignExpr) -> str:
+        return self._parenthesize('=', expr.name, expr.value)
+
+    def visitVariableExpr(self, expr: VariableExpr) -> str:
+        return expr.name.lexeme
+
+    def visitLogicalExpr(self, expr: LogicalExpr) -> str:
+        return self._parenthesize(expr.operator.lexeme, expr.left, expr.right)
+
+    def visitCallExpr(self, expr: CallExpr) -> str:
+        return self._parenthesize('call', expr.callee, *expr.arguments)
+
+    def visitGetExpr(self, expr: GetExpr) -> str:
+        return self._parenthesize('.', expr.object, expr.name)
+
+    def visitSetExpr(self, expr: SetExpr) -> str:
+        return self._parenthesize('.=', expr.object, expr.name, expr.value)
+
+    def visitThisExpr(self, expr: ThisExpr) -> str:
+        return 'this'
+
+    def visitSuperExpr(self, expr: SuperExpr) -> str:
+        return self._parenthesize('super', expr.method)
+
+    def visitCommaExpr(self, expr: CommaExpr) -> str:
+        return self._parenthesize(',', expr.left, expr.right)
+
+    def visitIfElseExpr(self, expr: IfElseExpr) -> str:
+        return self._parenthesize(
+            '?:', expr.conditional, expr.then_expr, expr.else_expr
+        )
+
+    def visitAnonymousFunctionExpr(self, expr: AnonymousFunctionExpr) -> str:
+        return self._block(f'fun {self._params(expr.params)}', expr.body)
+
+    def visitCachedExpr(self, expr: CachedExpr) -> str:
+        return self._parenthesize('cached', expr.name, expr.expression)
+
+    def visitInlinedCallExpr(self, expr: InlinedCallExpr) -> str:
+        return self._parenthesize('inlined', expr.call, expr.body)
+
+    def visitInlinedGetterExpr(self, expr: InlinedGetterExpr) -> str:
+        return self._parenthesize('inlined', expr.call, expr.field_name)
+
+    def visitExpressionStmt(self, stmt: ExpressionStmt) -> str:
+        return self._parenthesize('expr', stmt.expression)
+
+    def visitPrintStmt(self, stmt: PrintStmt) -> str:
+        return self._parenthesize('print', stmt.expression)
+
+    def visitVarStmt(self, stmt: VarStmt) -> str:
+        if stmt.initializer is None:
+            return self._parenthesize('var', stmt.name)
+        return self._parenthesize('var', stmt.name, stmt.initializer)
+
+    def visitBlockStmt(self, stmt: BlockStmt) -> str:
+        return self._block('block', stmt.statements)
+
+    def visitIfStmt(self, stmt: IfStmt) -> str:
+        branches = [stmt.then_branch]
+        if stmt.else_branch is not None:
+            branches.append(stmt.else_branch)
+
+        return self._block(f'if {self.print(stmt.condition)}', branches)
+
+    def visitWhileStmt(self, stmt: WhileStmt) -> str:
+        return self._block(f'while {self.print(stmt.condition)}', [stmt.loop_body])
+
+    def visitFunctionStmt(self, stmt: FunctionStmt) -> str:
+        return self._block(
+            f'fun {stmt.name.lexeme} {self._params(stmt.params)}', stmt.body
+        )
+
+    def visitReturnStmt(self, stmt: ReturnStmt) -> str:
+        if stmt.value is None:
+            return '(return)'
+        return self._parenthesize('return', stmt.value)
+
+    def visitClassStmt(self, stmt: ClassStmt) -> str:
+        header = f'class {stmt.name.lexeme}'
+        if stmt.superclass is not None:
+            header += f' < {stmt.superclass.name.lexeme}'
+
+        return self._block(header, stmt.methods)
+
+    def visitBreakStmt(self, stmt: BreakStmt) -> str:
+        return '(break)'
+
+    def visitCountingLoopStmt(self, stmt: CountingLoopStmt) -> str:
+        header = ' '.join(
+            self.print(node)
+            for node in (stmt.initializer, stmt.condition, stmt.increment)
+        )
+        return self._block(f'counting-loop {header}', [stmt.loop_body])
+
+    def print(self, node: Expr | Stmt) -> str:
+        return node.accept(self)
+
+    def print_program(self, statements: Sequence[Stmt]) -> str:
+        return '\n'.join(self.print(stmt) for stmt in statements)
+
+    def _parenthesize(self, name: str, *parts: Any) -> str:
         s = f"({name} "
-        s += " ".join([expr.accept(self) for expr in exprs])
+        s += " ".join([self._part(part) for part in parts])
         s += ')'
 
         return s
 
+    def _part(self, part: Expr | Stmt | Token) -> str:
+        return part.lexeme if isinstance(part, Token) else part.accept(self)
+
+    def _params(self, params: Sequence[Token]) -> str:
+        return '(' + ' '.join(param.lexeme for param in params) + ')'
+
+    def _block(self, header: str, statements: Sequence[Stmt]) -> str:
+        lines = [f'({header}']
+        lines.extend(indent(self.print(stmt), '  ') for stmt in statements)
+
+        return '\n'.join(lines) + ')'
+
 if __name__ == '__main__':
     expression = BinaryExpr(
         UnaryExpr(
@@ -43,4 +196,4 @@ if __name__ == '__main__':
     )
 
     ast_str = AstPrinter().print(expression)
-    print(f'AST:\n{ast_str}')
\ No newline at end of file
+    print(f'AST:\n{ast_str}')
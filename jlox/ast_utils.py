@@ -0,0 +1,128 @@
+from dataclasses import Field, fields, is_dataclass, replace
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+from jlox.expression import AssignExpr, Expr
+from jlox.statement import Stmt
+from jlox.tokens import Token
+
+Node = Expr | Stmt
+
+
+def is_node(value: Any) -> bool:
+    return (
+        is_dataclass(value)
+        and not isinstance(value, type)
+        and not isinstance(value, Token)
+    )
+
+
+def child_fields(node: Node) -> Iterator[Field]:
+    """
+    The fields of node that hold its children. Fields marked as references
+    point at nodes elsewhere in the tree and are left out.
+    """
+    return (field for field in fields(node) if not field.metadata.get("reference"))
+
+
+def iter_children(node: Node) -> Iterator[Node]:
+    for field in child_fields(node):
+        value = getattr(node, field.name)
+
+        if isinstance(value, (list, tuple)):
+            for item in value:
+                if is_node(item):
+                    yield item
+        elif is_node(value):
+            yield value
+
+
+def walk(nodes: Iterable[Node]) -> Iterator[Node]:
+    """
+    Yields every node reachable from nodes in preorder. The order only depends
+    on the shape of the tree, so the same source always walks the same way.
+    """
+    stack = list(reversed(list(nodes)))
+
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(list(iter_children(node))))
+
+
+def rewrite(node: Node, fn: Callable[[Node], Node]) -> Node:
+    """
+    Rebuilds node bottom-up, passing every node to fn after its children have
+    been rewritten. Nodes whose children did not change are passed as is, so
+    untouched subtrees keep their identity.
+    """
+    changes: dict[str, Any] = {}
+
+    for field in child_fields(node):
+        value = getattr(node, field.name)
+
+        if isinstance(value, list):
+            items = [rewrite(item, fn) if is_node(item) else item for item in value]
+            if any(new is not old for new, old in zip(items, value)):
+                changes[field.name] = items
+        elif is_node(value):
+            new = rewrite(value, fn)
+            if new is not value:
+                changes[field.name] = new
+
+    return fn(replace(node, **changes) if changes else node)
+
+
+def rewrite_all(nodes: Sequence[Node], fn: Callable[[Node], Node]) -> list[Any]:
+    return [rewrite(node, fn) for node in nodes]
+
+
+def assigned_names(nodes: Iterable[Node]) -> set[str]:
+    return {node.name.lexeme for node in walk(nodes) if isinstance(node, AssignExpr)}
+
+
+class AstTransformer:
+    """
+    Top-down counterpart of rewrite. Subclasses define transform<NodeType>
+    methods for the nodes they care about and call generic_transform to
+    rebuild the children of the others.
+    """
+
+    def transform(self, node: Any) -> Any:
+        method = getattr(self, f"transform{type(node).__name__}", None)
+        if method is not None:
+            return method(node)
+
+        return self.generic_transform(node)
+
+    def generic_transform(self, node: Any) -> Any:
+        changes: dict[str, Any] = {}
+
+        for field in child_fields(node):
+            value = getattr(node, field.name)
+
+            if isinstance(value, list):
+                items = self.transform_list(value)
+                if len(items) != len(value) or any(
+                    new is not old for new, old in zip(items, value)
+                ):
+                    changes[field.name] = items
+            elif is_node(value):
+                new = self.transform(value)
+                if new is not value:
+                    changes[field.name] = new
+
+        return replace(node, **changes) if changes else node
+
+    def transform_list(self, items: Sequence[Any]) -> list[Any]:
+        return [self.transform(item) if is_node(item) else item for item in items]
+
+
+def node_line(node: Node) -> int:
+    """The line of the first token in node, or 0 for nodes without any."""
+    for inner in walk([node]):
+        for field in child_fields(inner):
+            value = getattr(inner, field.name)
+            if isinstance(value, Token):
+                return value.line
+
+    return 0
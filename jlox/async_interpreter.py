@@ -0,0 +1,385 @@
+import inspect
+from typing import Any, Awaitable, Collection, Generator, Sequence
+
+from jlox.ast_utils import Node, iter_children, walk
+from jlox.environment import Environment
+from jlox.errors import JloxRuntimeError
+from jlox.exception_wrappers import BreakWrapper, ReturnWrapper
+from jlox.expression import (
+    AnonymousFunctionExpr,
+    AssignExpr,
+    BinaryExpr,
+    CachedExpr,
+    CallExpr,
+    CommaExpr,
+    Expr,
+    GetExpr,
+    GroupingExpr,
+    IfElseExpr,
+    InlinedCallExpr,
+    InlinedGetterExpr,
+    LogicalExpr,
+    SetExpr,
+    UnaryExpr,
+)
+from jlox.interpreter import _LOX_CALLABLES, Interpreter
+from jlox.lox_callable import LoxCallable
+from jlox.lox_class import LoxClass
+from jlox.lox_function import LoxFunction, this_token
+from jlox.lox_instance import LoxInstance
+from jlox.native_functions import HostFunction, to_lox_value
+from jlox.statement import (
+    BlockStmt,
+    ClassStmt,
+    CountingLoopStmt,
+    ExpressionStmt,
+    FunctionStmt,
+    IfStmt,
+    PrintStmt,
+    ReturnStmt,
+    Stmt,
+    VarStmt,
+    WhileStmt,
+)
+from jlox.tokens import TokenType
+
+# Runs a node, yielding whatever the script waits for and being sent what it
+# came to, and returns the value of the node.
+Suspendable = Generator[Awaitable[Any], Any, Any]
+
+
+class AsyncInterpreter(Interpreter):
+    """
+    Runs a script as a coroutine, which the event loop it runs on suspends
+    whenever the script waits for an async native function, so any number of
+    scripts can share one loop and thread.
+
+    Only calls can wait, so only nodes with calls in them are run by the
+    generators here, which hand what the script waits for up to
+    interpret_async. Everything else, like a loop that calls nothing, runs
+    like it does in the interpreter, tiers included.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._suspending: Collection[Node] = frozenset()
+
+    async def interpret_async(
+        self,
+        statements: list[Stmt],
+        suspending: Collection[Node] | None = None,
+    ) -> None:
+        """
+        Runs a resolved program. Suspending, when given, is what
+        suspending_nodes found in it.
+        """
+        self._suspending = (
+            suspending if suspending is not None else suspending_nodes(statements)
+        )
+        script = self._interpret(statements)
+
+        value = None
+        error: BaseException | None = None
+        while True:
+            try:
+                if error is None:
+                    awaitable = script.send(value)
+                else:
+                    awaitable = script.throw(error)
+            except StopIteration:
+                return
+
+            try:
+                value, error = await awaitable, None
+            except Exception as e:
+                value, error = None, e
+
+    def _interpret(self, statements: list[Stmt]) -> Suspendable:
+        for stmt in statements:
+            self._root_stmt = stmt
+            yield from self._exec(stmt)
+
+    def _exec(self, stmt: Stmt) -> Suspendable:
+        if stmt in self._suspending:
+            yield from getattr(self, "_exec" + type(stmt).__name__)(stmt)
+        else:
+            self._execute(stmt)
+
+    def _eval(self, expr: Expr) -> Suspendable:
+        if expr in self._suspending:
+            return (yield from getattr(self, "_eval" + type(expr).__name__)(expr))
+        return self._evaluate(expr)
+
+    def _execExpressionStmt(self, stmt: ExpressionStmt) -> Suspendable:
+        ret = yield from self._eval(stmt.expression)
+
+        if ret is not None and self._repl and stmt == self._root_stmt:
+            print(ret, file=self.stdout)
+
+    def _execPrintStmt(self, stmt: PrintStmt) -> Suspendable:
+        value = yield from self._eval(stmt.expression)
+        print(value, file=self.stdout)
+
+    def _execReturnStmt(self, stmt: ReturnStmt) -> Suspendable:
+        value = None
+        if stmt.value is not None:
+            value = yield from self._eval(stmt.value)
+
+        raise ReturnWrapper(value)
+
+    def _execVarStmt(self, stmt: VarStmt) -> Suspendable:
+        value = None
+        if stmt.initializer is not None:
+            value = yield from self._eval(stmt.initializer)
+
+        self._environment.define(stmt.name.lexeme, value)
+
+    def _execBlockStmt(self, stmt: BlockStmt) -> Suspendable:
+        yield from self._exec_block(stmt.statements, Environment(self._environment))
+
+    def _execIfStmt(self, stmt: IfStmt) -> Suspendable:
+        if (yield from self._eval(stmt.condition)):
+            yield from self._exec(stmt.then_branch)
+        elif stmt.else_branch:
+            yield from self._exec(stmt.else_branch)
+
+    def _execWhileStmt(self, stmt: WhileStmt) -> Suspendable:
+        limits = self._limits
+        try:
+            while (yield from self._eval(stmt.condition)):
+                yield from self._exec(stmt.loop_body)
+
+                if limits is not None:
+                    limits.charge(stmt)
+        except BreakWrapper:
+            pass
+
+    def _execCountingLoopStmt(self, stmt: CountingLoopStmt) -> Suspendable:
+        # Run as the loop it was specialized from.
+        prev_env = self._environment
+        limits = self._limits
+
+        try:
+            self._environment = Environment(prev_env)
+            yield from self._exec(stmt.initializer)
+
+            while (yield from self._eval(stmt.condition)):
+                yield from self._exec(stmt.loop_body)
+                yield from self._eval(stmt.increment)
+
+                if limits is not None:
+                    limits.charge(stmt)
+        except BreakWrapper:
+            pass
+        finally:
+            self._environment = prev_env
+
+    def _exec_block(self, statements: Sequence[Stmt], env: Environment) -> Suspendable:
+        prev_env = self._environment
+
+        try:
+            self._environment = env
+
+            for statement in statements:
+                yield from self._exec(statement)
+        finally:
+            self._environment = prev_env
+
+    def _evalGroupingExpr(self, expr: GroupingExpr) -> Suspendable:
+        return (yield from self._eval(expr.expression))
+
+    def _evalUnaryExpr(self, expr: UnaryExpr) -> Suspendable:
+        right = yield from self._eval(expr.right)
+
+        match expr.operator.type:
+            case TokenType.MINUS:
+                unchecked = self._unchecked_operations.get(expr)
+                if unchecked is not None:
+                    return unchecked(right)
+                self._check_number_operands(expr.operator, right)
+                return -float(right)
+            case TokenType.BANG:
+                return not self._is_truthy(right)
+            case _:
+                return None
+
+    def _evalBinaryExpr(self, expr: BinaryExpr) -> Suspendable:
+        left = yield from self._eval(expr.left)
+        right = yield from self._eval(expr.right)
+
+        unchecked = self._unchecked_operations.get(expr)
+        if unchecked is not None:
+            return unchecked(left, right)
+
+        return self._binary_op(expr.operator, left, right)
+
+    def _evalAssignExpr(self, expr: AssignExpr) -> Suspendable:
+        value = yield from self._eval(expr.value)
+
+        dist = self._locals.get(expr, None)
+        if dist is not None:
+            self._environment.assign_at(dist, expr.name, value)
+        else:
+            self._globals.assign(expr.name, value)
+
+        return value
+
+    def _evalLogicalExpr(self, expr: LogicalExpr) -> Suspendable:
+        left = yield from self._eval(expr.left)
+
+        if expr.operator.type == TokenType.OR:
+            if left:
+                return left
+        elif not left:
+            return left
+
+        return (yield from self._eval(expr.right))
+
+    def _evalGetExpr(self, expr: GetExpr) -> Suspendable:
+        obj = yield from self._eval(expr.object)
+
+        if not isinstance(obj, LoxInstance):
+            raise JloxRuntimeError(expr.name, "Only instances have properties.")
+
+        return obj.get(expr.name)
+
+    def _evalSetExpr(self, expr: SetExpr) -> Suspendable:
+        obj = yield from self._eval(expr.object)
+
+        if not isinstance(obj, LoxInstance):
+            raise JloxRuntimeError(expr.name, "Only instances have properties.")
+
+        value = yield from self._eval(expr.value)
+        obj.set(expr.name, value)
+        return value
+
+    def _evalCommaExpr(self, expr: CommaExpr) -> Suspendable:
+        yield from self._eval(expr.left)
+        return (yield from self._eval(expr.right))
+
+    def _evalIfElseExpr(self, expr: IfElseExpr) -> Suspendable:
+        if (yield from self._eval(expr.conditional)):
+            return (yield from self._eval(expr.then_expr))
+        return (yield from self._eval(expr.else_expr))
+
+    def _evalCachedExpr(self, expr: CachedExpr) -> Suspendable:
+        value = self._lookup_var(expr.name, expr)
+        if value is not None:
+            return value
+
+        value = yield from self._eval(expr.expression)
+
+        dist = self._locals.get(expr, None)
+        if dist is not None:
+            self._environment.assign_at(dist, expr.name, value)
+        else:
+            self._globals.assign(expr.name, value)
+
+        return value
+
+    def _evalCallExpr(self, expr: CallExpr) -> Suspendable:
+        callee = yield from self._eval(expr.callee)
+        return (yield from self._call(expr, callee))
+
+    def _evalInlinedCallExpr(self, expr: InlinedCallExpr) -> Suspendable:
+        callee = yield from self._eval(expr.call.callee)
+
+        if type(callee) is LoxFunction and callee.declaration is expr.declaration:
+            if self._limits is not None:
+                self._limits.charge(expr.declaration)
+            return (yield from self._eval(expr.body))
+
+        return (yield from self._call(expr.call, callee))
+
+    def _evalInlinedGetterExpr(self, expr: InlinedGetterExpr) -> Suspendable:
+        get = expr.call.callee
+        assert isinstance(get, GetExpr)
+
+        obj = yield from self._eval(get.object)
+
+        if type(obj) is LoxInstance and get.name.lexeme not in obj._fields:
+            method = obj.kind.find_method(get.name.lexeme)
+            if method is not None and method.declaration is expr.declaration:
+                if self._limits is not None:
+                    self._limits.charge(expr.declaration)
+                return obj.get(expr.field_name)
+
+        if not isinstance(obj, LoxInstance):
+            raise JloxRuntimeError(get.name, "Only instances have properties.")
+
+        return (yield from self._call(expr.call, obj.get(get.name)))
+
+    def _call(self, expr: CallExpr, callee: Any) -> Suspendable:
+        if type(callee) not in _LOX_CALLABLES and not isinstance(callee, LoxCallable):
+            raise JloxRuntimeError(expr.paren, "Can only call functions and classes.")
+
+        arguments = []
+        for argument in expr.arguments:
+            arguments.append((yield from self._eval(argument)))
+
+        if len(arguments) != callee.arity:
+            raise JloxRuntimeError(
+                expr.paren,
+                f"Expected {callee.arity} arguments but got {len(arguments)}.",
+            )
+
+        if type(callee) is LoxFunction:
+            return (yield from self._call_function(callee, arguments))
+
+        if type(callee) is LoxClass:
+            instance = LoxInstance(callee)
+            initializer = callee.find_method("init")
+            if initializer is not None:
+                yield from self._call_function(initializer.bind(instance), arguments)
+            return instance
+
+        if type(callee) is HostFunction:
+            result = callee.function(*arguments)
+            if inspect.isawaitable(result):
+                result = yield result
+            return to_lox_value(result)
+
+        return callee.call(self, arguments)
+
+    def _call_function(
+        self, function: LoxFunction, arguments: list[Any]
+    ) -> Suspendable:
+        declaration = function.declaration
+        env = Environment(function.closure)
+
+        for param, arg in zip(declaration.params, arguments):
+            env.define(param.lexeme, arg)
+
+        value = None
+        try:
+            if any(stmt in self._suspending for stmt in declaration.body):
+                if self._limits is not None:
+                    self._limits.charge(declaration)
+                yield from self._exec_block(declaration.body, env)
+            else:
+                self._execute_function_body(declaration, env)
+        except ReturnWrapper as ret:
+            value = ret.value
+
+        if function.is_initializer:
+            return function.closure.get_at(0, this_token())
+        return value
+
+
+def suspending_nodes(statements: Sequence[Stmt]) -> frozenset[Node]:
+    """
+    The nodes of a program that can wait: calls, and the nodes with calls in
+    them. Declaring a function does not run its body, so it never waits.
+    """
+    suspending: set[Node] = set()
+
+    # Children come after their parents in preorder, so in reverse they are
+    # all known before their parent.
+    for node in reversed(list(walk(statements))):
+        if isinstance(node, (CallExpr, InlinedCallExpr, InlinedGetterExpr)) or (
+            not isinstance(node, (FunctionStmt, AnonymousFunctionExpr, ClassStmt))
+            and any(child in suspending for child in iter_children(node))
+        ):
+            suspending.add(node)
+
+    return frozenset(suspending)
@@ -0,0 +1,248 @@
+import argparse
+import io
+import multiprocessing
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Sequence
+
+from jlox.errors import JloxRuntimeError, JloxSyntaxError
+from jlox.limits import ExecutionLimits
+from jlox.pass_manager import DEFAULT_OPTIMIZATION_LEVEL, OPTIMIZATION_LEVELS
+from jlox.program import compile
+
+# Scripts a worker runs before it is replaced by a fresh one, which bounds how
+# much memory a worker can hold on to.
+DEFAULT_MAX_RUNS = 500
+
+
+@dataclass
+class ScriptResult:
+    path: str
+    output: str
+    # The error that stopped the script, None if it ran to the end.
+    error: str | None
+    seconds: float
+    # The process id of the worker that ran it.
+    worker: int
+
+
+@dataclass
+class BatchResults:
+    scripts: list[ScriptResult]
+    seconds: float
+
+    @property
+    def failed(self) -> list[ScriptResult]:
+        return [result for result in self.scripts if result.error is not None]
+
+    @property
+    def throughput(self) -> float:
+        """Scripts per second, including the time it took to start the workers."""
+        return len(self.scripts) / self.seconds if self.seconds else 0.0
+
+
+def script_paths(paths: Sequence[str | Path]) -> list[Path]:
+    """The scripts given, and every .lox file under the directories given."""
+    scripts = []
+
+    for path in map(Path, paths):
+        if path.is_dir():
+            scripts.extend(sorted(path.rglob("*.lox")))
+        else:
+            scripts.append(path)
+
+    return scripts
+
+
+def run_script(
+    path: str | Path,
+    level: int,
+    tiering: bool,
+    fuel: int | None = None,
+    timeout: float | None = None,
+) -> ScriptResult:
+    """
+    Runs one script, capturing what it prints and the error it stops on,
+    which includes running out of fuel or time.
+    """
+    start = time.perf_counter()
+    output = io.StringIO()
+    error = None
+
+    try:
+        source = Path(path).read_text()
+        limits = (
+            ExecutionLimits(fuel, timeout)
+            if fuel is not None or timeout is not None
+            else None
+        )
+        compile(source, level).run(stdout=output, tiering=tiering, limits=limits)
+    except JloxRuntimeError as e:
+        error = f"Runtime error: {e}"
+    except JloxSyntaxError as e:
+        error = f"Syntax error: {e}"
+    except Exception as e:
+        # A broken script must not take the worker, and the batch, down.
+        error = f"{type(e).__name__}: {e}"
+
+    seconds = time.perf_counter() - start
+    return ScriptResult(str(path), output.getvalue(), error, seconds, os.getpid())
+
+
+def run_batch(
+    paths: Sequence[Path],
+    workers: int | None = None,
+    max_runs: int = DEFAULT_MAX_RUNS,
+    level: int = DEFAULT_OPTIMIZATION_LEVEL,
+    tiering: bool = True,
+    fuel: int | None = None,
+    timeout: float | None = None,
+) -> BatchResults:
+    """
+    Runs the scripts in a pool of worker processes, which import the
+    interpreter once and then run script after script. The results are in the
+    order of the paths.
+    """
+    start = time.perf_counter()
+
+    with multiprocessing.Pool(
+        workers, initializer=_warm_up, maxtasksperchild=max_runs
+    ) as pool:
+        results = pool.map(
+            _run_script,
+            [(str(path), level, tiering, fuel, timeout) for path in paths],
+            chunksize=1,
+        )
+
+    return BatchResults(results, time.perf_counter() - start)
+
+
+def _run_script(
+    args: tuple[str, int, bool, int | None, float | None],
+) -> ScriptResult:
+    return run_script(*args)
+
+
+def _warm_up() -> None:
+    """Gets the first script of a worker off to the same start as the rest."""
+    compile("var warm = 1;").run()
+
+
+def write_results(results: BatchResults, directory: Path) -> None:
+    """
+    Writes what every script printed to NAME.out, and its error to NAME.err,
+    keeping the layout of the directories the scripts are in.
+    """
+    if not results.scripts:
+        return
+
+    paths = [Path(result.path).resolve() for result in results.scripts]
+    root = Path(os.path.commonpath([path.parent for path in paths]))
+
+    for path, result in zip(paths, results.scripts):
+        target = directory / path.relative_to(root).with_suffix("")
+        target.parent.mkdir(parents=True, exist_ok=True)
+
+        target.with_suffix(".out").write_text(result.output)
+        if result.error is not None:
+            target.with_suffix(".err").write_text(result.error + "\n")
+
+
+def format_result(result: ScriptResult) -> str:
+    lines = [f"==> {result.path} <=="]
+    if result.output:
+        lines.append(result.output.rstrip("\n"))
+    if result.error is not None:
+        lines.append(result.error)
+    return "\n".join(lines)
+
+
+def format_summary(results: BatchResults) -> str:
+    return (
+        f"{len(results.scripts)} scripts in {results.seconds:.3f} s "
+        f"({results.throughput:.1f} scripts/s), {len(results.failed)} failed"
+    )
+
+
+def get_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="jlox batch", description="Run many Lox scripts in worker processes"
+    )
+    parser.add_argument(
+        "paths",
+        nargs="+",
+        metavar="PATH",
+        help="scripts, or directories to run every .lox file under",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="worker processes, one per CPU by default",
+    )
+    parser.add_argument(
+        "--max-runs",
+        type=int,
+        default=DEFAULT_MAX_RUNS,
+        help="scripts a worker runs before it is replaced",
+    )
+    parser.add_argument(
+        "-O",
+        dest="optimization_level",
+        type=int,
+        choices=sorted(OPTIMIZATION_LEVELS),
+        default=DEFAULT_OPTIMIZATION_LEVEL,
+    )
+    parser.add_argument("--no-tiering", action="store_true")
+    parser.add_argument(
+        "--fuel",
+        type=int,
+        metavar="STATEMENTS",
+        help="stop every script after it has run this many statements",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        metavar="SECONDS",
+        help="stop every script once it has run this long",
+    )
+    parser.add_argument(
+        "--output",
+        "-o",
+        type=Path,
+        help="write the output of every script to NAME.out and its error to "
+        "NAME.err in this directory, instead of printing them",
+    )
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Returns 1 if any script failed, 0 otherwise."""
+    args = get_args(argv)
+
+    results = run_batch(
+        script_paths(args.paths),
+        args.workers,
+        args.max_runs,
+        args.optimization_level,
+        not args.no_tiering,
+        args.fuel,
+        args.timeout,
+    )
+
+    if args.output is not None:
+        write_results(results, args.output)
+    else:
+        for result in results.scripts:
+            print(format_result(result))
+
+    print(format_summary(results), file=sys.stderr)
+    return 1 if results.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
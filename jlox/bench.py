@@ -0,0 +1,315 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Sequence
+
+from jlox.counting import CountingInterpreter
+from jlox.interpreter import Interpreter
+from jlox.pass_manager import DEFAULT_OPTIMIZATION_LEVEL, OPTIMIZATION_LEVELS
+from jlox.program import compile
+
+# The corpus lives in a source checkout, next to the package. Installed
+# copies of jlox have to be told where it is.
+BENCHMARK_DIR = Path(__file__).resolve().parent.parent / "benchmarks"
+
+DEFAULT_WARMUP = 1
+DEFAULT_REPETITIONS = 5
+DEFAULT_THRESHOLD = 0.05
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    times: list[float]
+    # Work counts of a separate counting run, empty unless requested.
+    counts: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def mean(self) -> float:
+        return statistics.fmean(self.times)
+
+    @property
+    def stdev(self) -> float:
+        return statistics.stdev(self.times) if len(self.times) > 1 else 0.0
+
+
+@dataclass
+class SuiteResults:
+    benchmarks: list[BenchmarkResult]
+    metadata: dict[str, Any] = field(default_factory=dict)
+
+    def save(self, path: str | Path) -> None:
+        data = {
+            "metadata": self.metadata,
+            "benchmarks": {
+                result.name: {
+                    "mean": result.mean,
+                    "stdev": result.stdev,
+                    "times": result.times,
+                    "counts": result.counts,
+                }
+                for result in self.benchmarks
+            },
+        }
+        Path(path).write_text(json.dumps(data, indent=2) + "\n")
+
+    @classmethod
+    def load(cls, path: str | Path) -> "SuiteResults":
+        data = json.loads(Path(path).read_text())
+        benchmarks = [
+            BenchmarkResult(name, entry["times"], entry.get("counts", {}))
+            for name, entry in data["benchmarks"].items()
+        ]
+        return cls(benchmarks, data.get("metadata", {}))
+
+
+@dataclass
+class Comparison:
+    name: str
+    baseline: float
+    current: float
+    # The work counts both runs recorded that differ, as (baseline, current).
+    counts: dict[str, tuple[int, int]] = field(default_factory=dict)
+
+    @property
+    def change(self) -> float:
+        """The relative change in mean time, positive when slower."""
+        if self.baseline == 0:
+            return math.inf if self.current > 0 else 0.0
+        return (self.current - self.baseline) / self.baseline
+
+    def is_regression(self, threshold: float) -> bool:
+        """Slower by more than threshold, or doing any more work at all."""
+        return self.change > threshold or any(
+            current > baseline for baseline, current in self.counts.values()
+        )
+
+
+def benchmark_paths(
+    names: Sequence[str] = (), directory: Path = BENCHMARK_DIR
+) -> list[Path]:
+    paths = sorted(directory.glob("*.lox"))
+    if not names:
+        return paths
+
+    by_name = {path.stem: path for path in paths}
+    unknown = [name for name in names if name not in by_name]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    return [by_name[name] for name in names]
+
+
+def run_once(source: str, level: int, tiering: bool) -> float:
+    """Runs a program from source to completion and returns the time it took."""
+    start = time.perf_counter()
+    _run(source, Interpreter(tiering=tiering), level)
+    return time.perf_counter() - start
+
+
+def count_once(source: str, level: int) -> dict[str, int]:
+    interpreter = CountingInterpreter()
+    _run(source, interpreter, level)
+    return interpreter.counts.summary()
+
+
+def _run(source: str, interpreter: Interpreter, level: int) -> None:
+    with contextlib.redirect_stdout(io.StringIO()):
+        compile(source, level).run_in(interpreter)
+
+
+def run_benchmark(
+    path: Path,
+    warmup: int = DEFAULT_WARMUP,
+    repetitions: int = DEFAULT_REPETITIONS,
+    level: int = DEFAULT_OPTIMIZATION_LEVEL,
+    tiering: bool = True,
+    count: bool = False,
+) -> BenchmarkResult:
+    source = path.read_text()
+
+    for _ in range(warmup):
+        run_once(source, level, tiering)
+
+    times = [run_once(source, level, tiering) for _ in range(repetitions)]
+    counts = count_once(source, level) if count else {}
+
+    return BenchmarkResult(path.stem, times, counts)
+
+
+def run_suite(
+    paths: Sequence[Path],
+    warmup: int = DEFAULT_WARMUP,
+    repetitions: int = DEFAULT_REPETITIONS,
+    level: int = DEFAULT_OPTIMIZATION_LEVEL,
+    tiering: bool = True,
+    count: bool = False,
+) -> SuiteResults:
+    metadata = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "optimization_level": level,
+        "tiering": tiering,
+        "warmup": warmup,
+        "repetitions": repetitions,
+    }
+
+    results = []
+    for path in paths:
+        results.append(run_benchmark(path, warmup, repetitions, level, tiering, count))
+        print(format_results([results[-1]], header=False), file=sys.stderr)
+
+    return SuiteResults(results, metadata)
+
+
+def compare(baseline: SuiteResults, current: SuiteResults) -> list[Comparison]:
+    """Compares the benchmarks that both runs have, in the current order."""
+    baseline_results = {result.name: result for result in baseline.benchmarks}
+    comparisons = []
+
+    for result in current.benchmarks:
+        before = baseline_results.get(result.name)
+        if before is None:
+            continue
+
+        counts = {
+            key: (before.counts[key], value)
+            for key, value in result.counts.items()
+            if key in before.counts and before.counts[key] != value
+        }
+        comparisons.append(Comparison(result.name, before.mean, result.mean, counts))
+
+    return comparisons
+
+
+def regressions(
+    comparisons: Sequence[Comparison], threshold: float = DEFAULT_THRESHOLD
+) -> list[Comparison]:
+    return [
+        comparison for comparison in comparisons if comparison.is_regression(threshold)
+    ]
+
+
+def format_results(results: Sequence[BenchmarkResult], header: bool = True) -> str:
+    lines = [f"{'benchmark':<20} {'mean (s)':>10} {'stdev (s)':>10}"] if header else []
+
+    for result in results:
+        lines.append(f"{result.name:<20} {result.mean:>10.4f} {result.stdev:>10.4f}")
+
+    return "\n".join(lines)
+
+
+def format_comparison(
+    comparisons: Sequence[Comparison], threshold: float = DEFAULT_THRESHOLD
+) -> str:
+    lines = [f"{'benchmark':<20} {'baseline':>10} {'current':>10} {'change':>8}"]
+
+    for comparison in comparisons:
+        flag = "  REGRESSION" if comparison.is_regression(threshold) else ""
+        lines.append(
+            f"{comparison.name:<20} {comparison.baseline:>10.4f} "
+            f"{comparison.current:>10.4f} {comparison.change:>+8.1%}{flag}"
+        )
+
+        for key, (before, after) in comparison.counts.items():
+            lines.append(f"  {key}: {before} -> {after}")
+
+    return "\n".join(lines)
+
+
+def get_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="jlox bench", description="Run the Lox benchmark corpus"
+    )
+    parser.add_argument(
+        "benchmarks",
+        nargs="*",
+        metavar="NAME",
+        help="benchmarks to run, all of them by default",
+    )
+    parser.add_argument(
+        "--dir",
+        type=Path,
+        default=BENCHMARK_DIR,
+        help="directory of the benchmarks, the benchmarks directory of the "
+        "source checkout by default",
+    )
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP)
+    parser.add_argument("--repetitions", type=int, default=DEFAULT_REPETITIONS)
+    parser.add_argument(
+        "-O",
+        dest="optimization_level",
+        type=int,
+        choices=sorted(OPTIMIZATION_LEVELS),
+        default=DEFAULT_OPTIMIZATION_LEVEL,
+    )
+    parser.add_argument("--no-tiering", action="store_true")
+    parser.add_argument(
+        "--count",
+        action="store_true",
+        help="also record the work counts of one extra, untimed run",
+    )
+    parser.add_argument("--output", "-o", help="write the results to a JSON file")
+    parser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASELINE", "CURRENT"),
+        help="compare two JSON result files instead of running anything",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="relative slowdown of the mean that counts as a regression",
+    )
+
+    args = parser.parse_args(argv)
+    if args.compare:
+        return args
+
+    try:
+        args.paths = benchmark_paths(args.benchmarks, args.dir)
+    except ValueError as e:
+        parser.error(str(e))
+    if not args.paths:
+        parser.error(f"no benchmarks in {args.dir}")
+
+    return args
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Returns 1 if a comparison found regressions, 0 otherwise."""
+    args = get_args(argv)
+
+    if args.compare:
+        baseline, current = (SuiteResults.load(path) for path in args.compare)
+        comparisons = compare(baseline, current)
+        print(format_comparison(comparisons, args.threshold))
+        return 1 if regressions(comparisons, args.threshold) else 0
+
+    results = run_suite(
+        args.paths,
+        args.warmup,
+        args.repetitions,
+        args.optimization_level,
+        not args.no_tiering,
+        args.count,
+    )
+    print(format_results(results.benchmarks))
+
+    if args.output:
+        results.save(args.output)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
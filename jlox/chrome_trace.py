@@ -0,0 +1,175 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+from jlox.ast_utils import node_line
+from jlox.environment import Environment
+from jlox.expression import Expr
+from jlox.hooks import Event
+from jlox.interpreter import Interpreter
+from jlox.lox_class import LoxClass
+from jlox.statement import FunctionStmt, Stmt
+
+# Events kept, the oldest are overwritten beyond that. Every event takes four
+# list slots, so the default uses a few tens of megabytes at most.
+DEFAULT_CAPACITY = 1 << 20
+
+
+class TraceRecorder:
+    """
+    Records when Lox functions, class instantiations and top level statements
+    begin and end, for viewing as a timeline in Perfetto or chrome://tracing.
+
+    Events go to a ring buffer that is allocated up front, so recording one is
+    a few stores and tracing a long script does not slow down as it grows.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY) -> None:
+        self.capacity = capacity
+        self.recorded = 0
+        self._next = 0
+        self._phases: list[str | None] = [None] * capacity
+        self._categories: list[str | None] = [None] * capacity
+        self._subjects: list[Any] = [None] * capacity
+        self._times: list[int] = [0] * capacity
+        self._statement: Stmt | None = None
+        self._thread = threading.get_native_id()
+
+    @property
+    def dropped(self) -> int:
+        return max(0, self.recorded - self.capacity)
+
+    @contextmanager
+    def recording(self, interpreter: Interpreter) -> Iterator[None]:
+        """Records what the interpreter runs while it is active."""
+        hooks = [
+            (Event.STATEMENT, lambda stmt: self._begin_statement(interpreter, stmt)),
+            (Event.FUNCTION_ENTER, self._enter_function),
+            (Event.FUNCTION_EXIT, self._exit_function),
+            (Event.CALL_ENTER, self._enter_call),
+            (Event.CALL_EXIT, self._exit_call),
+        ]
+        for event, listener in hooks:
+            interpreter.add_hook(event, listener)
+
+        self._thread = threading.get_native_id()
+        try:
+            yield
+        finally:
+            for event, listener in hooks:
+                interpreter.remove_hook(event, listener)
+            if self._statement is not None:
+                self._record("E", "statement", self._statement)
+                self._statement = None
+
+    def trace_events(self) -> list[dict[str, Any]]:
+        """
+        The recorded events in the Trace Event Format, oldest first. Ends whose
+        beginning was overwritten are left out, and anything that has not ended
+        ends with the last event.
+        """
+        kept = min(self.recorded, self.capacity)
+        first = (self._next - kept) % self.capacity
+        indices = [(first + offset) % self.capacity for offset in range(kept)]
+        start = self._times[indices[0]] if indices else 0
+
+        pid = os.getpid()
+        events = []
+        open_events: list[dict[str, Any]] = []
+
+        for index in indices:
+            timestamp = (self._times[index] - start) / 1000
+            phase = self._phases[index]
+
+            if phase == "E":
+                if not open_events:
+                    continue
+                begin = open_events.pop()
+                events.append({**_without_args(begin), "ph": "E", "ts": timestamp})
+                continue
+
+            category = self._categories[index]
+            name, args = _describe(category, self._subjects[index])
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "B",
+                "ts": timestamp,
+                "pid": pid,
+                "tid": self._thread,
+                "args": args,
+            }
+            events.append(event)
+            open_events.append(event)
+
+        end = events[-1]["ts"] if events else 0
+        while open_events:
+            events.append({**_without_args(open_events.pop()), "ph": "E", "ts": end})
+
+        return events
+
+    def save(self, path: str | Path) -> None:
+        data = {
+            "traceEvents": self.trace_events(),
+            "displayTimeUnit": "ms",
+            "otherData": {"recorded": self.recorded, "dropped": self.dropped},
+        }
+        Path(path).write_text(json.dumps(data) + "\n")
+
+    def _begin_statement(self, interpreter: Interpreter, stmt: Stmt) -> None:
+        if stmt is not interpreter._root_stmt:
+            return
+
+        if self._statement is not None:
+            self._record("E", "statement", self._statement)
+        self._statement = stmt
+        self._record("B", "statement", stmt)
+
+    def _enter_function(self, declaration: Any, env: Environment) -> None:
+        self._record("B", "function", declaration)
+
+    def _exit_function(self, declaration: Any, value: Any) -> None:
+        self._record("E", "function", declaration)
+
+    def _enter_call(self, callee: Any, expr: Expr) -> None:
+        if isinstance(callee, LoxClass):
+            self._record("B", "class", callee)
+
+    def _exit_call(self, callee: Any, value: Any) -> None:
+        if isinstance(callee, LoxClass):
+            self._record("E", "class", callee)
+
+    def _record(self, phase: str, category: str, subject: Any) -> None:
+        index = self._next
+        self._phases[index] = phase
+        self._categories[index] = category
+        self._subjects[index] = subject
+        self._times[index] = time.perf_counter_ns()
+
+        self._next = index + 1 if index + 1 < self.capacity else 0
+        self.recorded += 1
+
+
+def _describe(category: str | None, subject: Any) -> tuple[str, dict[str, Any]]:
+    if isinstance(subject, LoxClass):
+        return subject.name, {}
+
+    line = node_line(subject)
+    if category == "statement":
+        kind = type(subject).__name__.removesuffix("Stmt").lower()
+        if not line:
+            # Statements made of literals alone have no token to tell.
+            return kind, {}
+        return f"{kind} (line {line})", {"line": line}
+
+    if isinstance(subject, FunctionStmt):
+        return subject.name.lexeme, {"line": subject.name.line}
+    return "<anonymous>", {"line": line}
+
+
+def _without_args(event: dict[str, Any]) -> dict[str, Any]:
+    return {key: value for key, value in event.items() if key != "args"}
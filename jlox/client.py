@@ -0,0 +1,52 @@
+import argparse
+import os
+import sys
+from typing import Sequence
+
+from jlox.protocol import ProtocolError, request
+
+# Where the daemon listens unless told otherwise.
+DEFAULT_SOCKET = os.environ.get("JLOX_SOCKET", f"/tmp/jlox-{os.getuid()}.sock")
+
+
+def get_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="jlox client", description="Run a Lox script on a running jlox daemon"
+    )
+    parser.add_argument("script", help="the script to run, - to read it from stdin")
+    parser.add_argument(
+        "--socket",
+        default=DEFAULT_SOCKET,
+        help="where the daemon listens, $JLOX_SOCKET or %(default)s",
+    )
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Prints what the script printed and returns its exit status."""
+    args = get_args(argv)
+
+    if args.script == "-":
+        message = {"source": sys.stdin.read()}
+    else:
+        # The daemon resolves paths from its own working directory.
+        message = {"path": os.path.abspath(args.script)}
+
+    try:
+        reply = request(args.socket, message)
+    except OSError as e:
+        print(f"Cannot reach the jlox daemon at {args.socket}: {e}", file=sys.stderr)
+        return 1
+    except ProtocolError as e:
+        print(f"The jlox daemon at {args.socket} replied with {e}", file=sys.stderr)
+        return 1
+
+    sys.stdout.write(reply["output"])
+    if reply["error"] is not None:
+        print(reply["error"], file=sys.stderr)
+    return reply["status"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,699 @@
+from operator import add, ge, gt, le, lt, mul, sub, truediv
+from typing import Any, Callable, Sequence, TYPE_CHECKING
+
+from jlox.environment import Environment
+from jlox.errors import JloxRuntimeError
+from jlox.exception_wrappers import BreakWrapper, ReturnWrapper
+from jlox.expression import (
+    AnonymousFunctionExpr,
+    AssignExpr,
+    BinaryExpr,
+    CachedExpr,
+    CallExpr,
+    CommaExpr,
+    Expr,
+    ExprVisitor,
+    GetExpr,
+    GroupingExpr,
+    IfElseExpr,
+    InlinedCallExpr,
+    InlinedGetterExpr,
+    LiteralExpr,
+    LogicalExpr,
+    SetExpr,
+    SuperExpr,
+    ThisExpr,
+    UnaryExpr,
+    VariableExpr,
+)
+from jlox.lox_callable import LoxCallable
+from jlox.lox_function import LoxFunction
+from jlox.lox_instance import LoxInstance
+from jlox.statement import (
+    BlockStmt,
+    BreakStmt,
+    ClassStmt,
+    CountingLoopStmt,
+    ExpressionStmt,
+    FunctionStmt,
+    IfStmt,
+    PrintStmt,
+    ReturnStmt,
+    Stmt,
+    StmtVisitor,
+    VarStmt,
+    WhileStmt,
+)
+from jlox.tokens import Token, TokenType
+from jlox.counting_loops import counting_range
+
+if TYPE_CHECKING:
+    from jlox.interpreter import Interpreter
+    from jlox.limits import Charged
+    from jlox.type_profile import ProfileHints
+
+ExprCode = Callable[[Environment], Any]
+StmtCode = Callable[[Environment], None]
+
+FunctionDeclaration = FunctionStmt | AnonymousFunctionExpr
+
+_ARITHMETIC = {
+    TokenType.MINUS: sub,
+    TokenType.SLASH: truediv,
+    TokenType.STAR: mul,
+    TokenType.PLUS: add,
+    TokenType.GREATER: gt,
+    TokenType.GREATER_EQUAL: ge,
+    TokenType.LESS: lt,
+    TokenType.LESS_EQUAL: le,
+}
+
+_VALUE_TYPES = {"nil", "bool", "number", "string", "class", "function"}
+
+
+class ClosureCompiler(ExprVisitor[ExprCode], StmtVisitor[StmtCode]):
+    """
+    Translates resolved AST nodes into nested Python closures that take the
+    current Environment as their only argument. The closures have the same
+    semantics as the tree walking Interpreter, but skip the visitor dispatch
+    and the resolution lookups, which are done once at compile time.
+
+    With profile hints from an earlier run, sites that were monomorphic get
+    guarded fast paths and branches that were never taken are only compiled
+    when they are first reached.
+    """
+
+    def __init__(
+        self, interpreter: "Interpreter", hints: "ProfileHints | None" = None
+    ) -> None:
+        self._interpreter = interpreter
+        self._hints = hints
+
+    def compile_function(self, declaration: FunctionDeclaration) -> StmtCode:
+        return self._sequence(declaration.body)
+
+    def compile_loop(self, stmt: WhileStmt | CountingLoopStmt) -> StmtCode:
+        """
+        Compiles the part of a loop that can be entered in the middle of its
+        iterations. For a CountingLoopStmt that excludes the initializer and
+        the scope holding the counter, the code reads the counter from the
+        environment it is given.
+        """
+        if isinstance(stmt, WhileStmt):
+            return self.compile_stmt(stmt)
+
+        name = stmt.initializer.name.lexeme
+        condition = self.compile_expr(stmt.condition)
+        bound = self.compile_expr(stmt.condition.right)
+        increment = self.compile_expr(stmt.increment)
+        body = self._charged(stmt, self._sequence([stmt.loop_body]))
+        step = stmt.step
+
+        def counting_loop(env: Environment) -> None:
+            values = env._values
+            start = values[name]
+            counter = counting_range(stmt, start, bound(env))
+
+            try:
+                if counter is None:
+                    while condition(env):
+                        body(env)
+                        increment(env)
+                    return
+
+                number = type(start)
+                for i in counter:
+                    values[name] = number(i)
+                    body(env)
+
+                values[name] = number(counter.start + step * len(counter))
+            except BreakWrapper:
+                pass
+
+        return counting_loop
+
+    def compile_stmt(self, stmt: Stmt) -> StmtCode:
+        return stmt.accept(self)
+
+    def compile_expr(self, expr: Expr) -> ExprCode:
+        return expr.accept(self)
+
+    def visitLiteralExpr(self, expr: LiteralExpr) -> ExprCode:
+        value = expr.value
+        return lambda env: value
+
+    def visitGroupingExpr(self, expr: GroupingExpr) -> ExprCode:
+        return self.compile_expr(expr.expression)
+
+    def visitUnaryExpr(self, expr: UnaryExpr) -> ExprCode:
+        right = self.compile_expr(expr.right)
+        operator = expr.operator
+        check_number_operands = self._interpreter._check_number_operands
+        unchecked = self._interpreter._unchecked_operations.get(expr)
+
+        match operator.type:
+            case TokenType.MINUS if unchecked is not None:
+                return lambda env: unchecked(right(env))
+            case TokenType.MINUS:
+
+                def negate(env: Environment) -> Any:
+                    value = right(env)
+                    if type(value) is float:
+                        return -value
+                    check_number_operands(operator, value)
+                    return -float(value)
+
+                return negate
+            case TokenType.BANG:
+                return lambda env: not right(env)
+            case _:
+
+                def unknown(env: Environment) -> Any:
+                    right(env)
+                    return None
+
+                return unknown
+
+    def visitBinaryExpr(self, expr: BinaryExpr) -> ExprCode:
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+        operator = expr.operator
+        binary_op = self._interpreter._binary_op
+
+        unchecked = self._interpreter._unchecked_operations.get(expr)
+        if unchecked is not None:
+            return lambda env: unchecked(left(env), right(env))
+
+        match operator.type:
+            case TokenType.EQUAL_EQUAL:
+                return lambda env: left(env) == right(env)
+            case TokenType.BANG_EQUAL:
+                return lambda env: left(env) != right(env)
+
+        observed = self._hints.binary_types(expr) if self._hints else None
+
+        if operator.type == TokenType.PLUS and observed == {"string string"}:
+
+            def concat(env: Environment) -> Any:
+                l = left(env)
+                r = right(env)
+                if type(l) is str and type(r) is str:
+                    return l + r
+                return binary_op(operator, l, r)
+
+            return concat
+
+        fast_op = _ARITHMETIC.get(operator.type)
+        if fast_op is None or (observed and "number number" not in observed):
+            return lambda env: binary_op(operator, left(env), right(env))
+
+        def binary(env: Environment) -> Any:
+            l = left(env)
+            r = right(env)
+            if type(l) is float and type(r) is float:
+                return fast_op(l, r)
+            return binary_op(operator, l, r)
+
+        return binary
+
+    def visitAssignExpr(self, expr: AssignExpr) -> ExprCode:
+        return self._store(expr, expr.name, self.compile_expr(expr.value))
+
+    def visitVariableExpr(self, expr: VariableExpr) -> ExprCode:
+        return self._load(expr, expr.name)
+
+    def visitLogicalExpr(self, expr: LogicalExpr) -> ExprCode:
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+
+        def restore(code: ExprCode) -> None:
+            nonlocal left
+            left = code
+
+        left = self._probe_branch(expr.left, left, restore)
+
+        if expr.operator.type == TokenType.OR:
+
+            def logical_or(env: Environment) -> Any:
+                value = left(env)
+                return value if value else right(env)
+
+            return logical_or
+
+        def logical_and(env: Environment) -> Any:
+            value = left(env)
+            return right(env) if value else value
+
+        return logical_and
+
+    def visitCallExpr(self, expr: CallExpr) -> ExprCode:
+        callee_code = self.compile_expr(expr.callee)
+        argument_codes = [self.compile_expr(arg) for arg in expr.arguments]
+        interpreter = self._interpreter
+        invoke = self._invoker(expr, argument_codes)
+
+        declaration = self._hints.callee(expr) if self._hints else None
+        if declaration is None or len(declaration.params) != len(argument_codes):
+            return lambda env: invoke(env, callee_code(env))
+
+        def call_known(env: Environment) -> Any:
+            callee = callee_code(env)
+            if type(callee) is LoxFunction and callee._declaration is declaration:
+                return callee.call(interpreter, [arg(env) for arg in argument_codes])
+            return invoke(env, callee)
+
+        return call_known
+
+    def visitGetExpr(self, expr: GetExpr) -> ExprCode:
+        obj_code = self.compile_expr(expr.object)
+        name = expr.name
+
+        def get(env: Environment) -> Any:
+            obj = obj_code(env)
+            if not isinstance(obj, LoxInstance):
+                raise JloxRuntimeError(name, "Only instances have properties.")
+            return obj.get(name)
+
+        receivers = self._hints.receivers(expr) if self._hints else set()
+        if len(receivers) != 1 or receivers & _VALUE_TYPES:
+            return get
+
+        lexeme = name.lexeme
+
+        def get_field(env: Environment) -> Any:
+            obj = obj_code(env)
+            if type(obj) is LoxInstance:
+                fields = obj._fields
+                if lexeme in fields:
+                    return fields[lexeme]
+                return obj.get(name)
+            if not isinstance(obj, LoxInstance):
+                raise JloxRuntimeError(name, "Only instances have properties.")
+            return obj.get(name)
+
+        return get_field
+
+    def visitSetExpr(self, expr: SetExpr) -> ExprCode:
+        obj_code = self.compile_expr(expr.object)
+        value_code = self.compile_expr(expr.value)
+        name = expr.name
+
+        def set_property(env: Environment) -> Any:
+            obj = obj_code(env)
+            if not isinstance(obj, LoxInstance):
+                raise JloxRuntimeError(name, "Only instances have properties.")
+            value = value_code(env)
+            obj.set(name, value)
+            return value
+
+        return set_property
+
+    def visitThisExpr(self, expr: ThisExpr) -> ExprCode:
+        return self._load(expr, expr.keyword)
+
+    def visitSuperExpr(self, expr: SuperExpr) -> ExprCode:
+        return self._fallback_expr(expr)
+
+    def visitCommaExpr(self, expr: CommaExpr) -> ExprCode:
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+
+        def comma(env: Environment) -> Any:
+            left(env)
+            return right(env)
+
+        return comma
+
+    def visitIfElseExpr(self, expr: IfElseExpr) -> ExprCode:
+        condition = self.compile_expr(expr.conditional)
+        then_code = self.compile_expr(expr.then_expr)
+        else_code = self.compile_expr(expr.else_expr)
+
+        def restore(code: ExprCode) -> None:
+            nonlocal condition
+            condition = code
+
+        condition = self._probe_branch(expr.conditional, condition, restore)
+
+        return lambda env: then_code(env) if condition(env) else else_code(env)
+
+    def visitAnonymousFunctionExpr(self, expr: AnonymousFunctionExpr) -> ExprCode:
+        return lambda env: LoxFunction(expr, env)
+
+    def visitCachedExpr(self, expr: CachedExpr) -> ExprCode:
+        load = self._load(expr, expr.name)
+        store = self._store(expr, expr.name, self.compile_expr(expr.expression))
+
+        def cached(env: Environment) -> Any:
+            value = load(env)
+            return store(env) if value is None else value
+
+        return cached
+
+    def visitInlinedCallExpr(self, expr: InlinedCallExpr) -> ExprCode:
+        callee_code = self.compile_expr(expr.call.callee)
+        body_code = self.compile_expr(expr.body)
+        invoke = self._invoker(
+            expr.call, [self.compile_expr(arg) for arg in expr.call.arguments]
+        )
+        declaration = expr.declaration
+        charge = self._charge()
+
+        def inlined_call(env: Environment) -> Any:
+            callee = callee_code(env)
+            if type(callee) is LoxFunction and callee._declaration is declaration:
+                if charge is not None:
+                    charge(declaration)
+                return body_code(env)
+            return invoke(env, callee)
+
+        return inlined_call
+
+    def visitInlinedGetterExpr(self, expr: InlinedGetterExpr) -> ExprCode:
+        get = expr.call.callee
+        assert isinstance(get, GetExpr)
+
+        obj_code = self.compile_expr(get.object)
+        invoke = self._invoker(expr.call, [])
+        declaration = expr.declaration
+        name = get.name
+        lexeme = name.lexeme
+        field_name = expr.field_name
+        charge = self._charge()
+
+        def inlined_getter(env: Environment) -> Any:
+            obj = obj_code(env)
+            if type(obj) is LoxInstance and lexeme not in obj._fields:
+                method = obj._kind.find_method(lexeme)
+                if method is not None and method._declaration is declaration:
+                    if charge is not None:
+                        charge(declaration)
+                    return obj.get(field_name)
+            if not isinstance(obj, LoxInstance):
+                raise JloxRuntimeError(name, "Only instances have properties.")
+            return invoke(env, obj.get(name))
+
+        return inlined_getter
+
+    def visitExpressionStmt(self, stmt: ExpressionStmt) -> StmtCode:
+        return self.compile_expr(stmt.expression)
+
+    def visitPrintStmt(self, stmt: PrintStmt) -> StmtCode:
+        value = self.compile_expr(stmt.expression)
+        interpreter = self._interpreter
+
+        def print_stmt(env: Environment) -> None:
+            print(value(env), file=interpreter.stdout)
+
+        return print_stmt
+
+    def visitVarStmt(self, stmt: VarStmt) -> StmtCode:
+        name = stmt.name.lexeme
+        initializer = self.compile_expr(stmt.initializer) if stmt.initializer else None
+
+        def define(env: Environment) -> None:
+            env._values[name] = initializer(env) if initializer else None
+
+        return define
+
+    def visitBlockStmt(self, stmt: BlockStmt) -> StmtCode:
+        body = self._sequence(stmt.statements)
+
+        def block(env: Environment) -> None:
+            body(Environment(env))
+
+        return block
+
+    def visitIfStmt(self, stmt: IfStmt) -> StmtCode:
+        condition = self.compile_expr(stmt.condition)
+
+        def restore(code: ExprCode) -> None:
+            nonlocal condition
+            condition = code
+
+        condition = self._probe_branch(stmt.condition, condition, restore)
+
+        counts = self._hints.branch_counts(stmt) if self._hints else None
+        then_taken, else_taken = counts or (1, 1)
+
+        then_code = self._branch(stmt.then_branch, then_taken)
+
+        if stmt.else_branch is None:
+
+            def if_then(env: Environment) -> None:
+                if condition(env):
+                    then_code(env)
+
+            return if_then
+
+        else_code = self._branch(stmt.else_branch, else_taken)
+
+        def if_then_else(env: Environment) -> None:
+            if condition(env):
+                then_code(env)
+            else:
+                else_code(env)
+
+        return if_then_else
+
+    def visitWhileStmt(self, stmt: WhileStmt) -> StmtCode:
+        condition = self.compile_expr(stmt.condition)
+        body = self._charged(stmt, self._sequence([stmt.loop_body]))
+
+        def loop(env: Environment) -> None:
+            try:
+                while condition(env):
+                    body(env)
+            except BreakWrapper:
+                pass
+
+        return loop
+
+    def visitCountingLoopStmt(self, stmt: CountingLoopStmt) -> StmtCode:
+        initializer = self._sequence([stmt.initializer])
+        loop = self.compile_loop(stmt)
+
+        def counting_loop(env: Environment) -> None:
+            scope = Environment(env)
+            initializer(scope)
+            loop(scope)
+
+        return counting_loop
+
+    def visitFunctionStmt(self, stmt: FunctionStmt) -> StmtCode:
+        name = stmt.name.lexeme
+
+        def define(env: Environment) -> None:
+            env._values[name] = LoxFunction(stmt, env)
+
+        return define
+
+    def visitReturnStmt(self, stmt: ReturnStmt) -> StmtCode:
+        value = self.compile_expr(stmt.value) if stmt.value is not None else None
+
+        def ret(env: Environment) -> None:
+            raise ReturnWrapper(value(env) if value else None)
+
+        return ret
+
+    def visitClassStmt(self, stmt: ClassStmt) -> StmtCode:
+        return self._fallback_stmt(stmt)
+
+    def visitBreakStmt(self, stmt: BreakStmt) -> StmtCode:
+        def brk(env: Environment) -> None:
+            raise BreakWrapper()
+
+        return brk
+
+    def _branch(self, stmt: Stmt, taken: int) -> StmtCode:
+        if taken:
+            return self._sequence([stmt])
+
+        code: StmtCode | None = None
+
+        def compile_on_first_use(env: Environment) -> None:
+            nonlocal code
+            if code is None:
+                code = self._sequence([stmt])
+            code(env)
+
+        return compile_on_first_use
+
+    def _charge(self) -> "Callable[[Charged], None] | None":
+        """What charges the limits of the run, None without any."""
+        limits = self._interpreter._limits
+        return limits.charge if limits is not None else None
+
+    def _charged(self, loop: WhileStmt | CountingLoopStmt, body: StmtCode) -> StmtCode:
+        """Charges every iteration of loop to the limits of the run, if any."""
+        charge = self._charge()
+        if charge is None:
+            return body
+
+        def charged(env: Environment) -> None:
+            body(env)
+            charge(loop)
+
+        return charged
+
+    def _sequence(self, statements: Sequence[Stmt]) -> StmtCode:
+        codes = [self.compile_stmt(stmt) for stmt in statements]
+
+        probes = self._interpreter._probes
+        probed = False
+        if probes is not None:
+            for index, stmt in enumerate(statements):
+                if stmt in probes.statements:
+                    codes[index] = self._probe(stmt, codes, index)
+                    probed = True
+
+        if len(codes) == 1 and not probed:
+            return codes[0]
+
+        def sequence(env: Environment) -> None:
+            for code in codes:
+                code(env)
+
+        return sequence
+
+    def _probe(self, stmt: Stmt, codes: list[StmtCode], index: int) -> StmtCode:
+        """Reports the statement the first time it runs, then makes way for it."""
+        code = codes[index]
+        probes = self._interpreter._probes
+        assert probes is not None
+
+        def probe(env: Environment) -> None:
+            codes[index] = code
+            probes.statement(stmt)
+            code(env)
+
+        return probe
+
+    def _probe_branch(
+        self,
+        condition: Expr,
+        code: ExprCode,
+        restore: Callable[[ExprCode], None],
+    ) -> ExprCode:
+        """
+        Reports the outcomes of a branch condition until it had both, then
+        restores the code of the condition where the probe was.
+        """
+        probes = self._interpreter._probes
+        if probes is None or condition not in probes.conditions:
+            return code
+
+        def probe(env: Environment) -> Any:
+            value = code(env)
+            if probes.branch(condition, value):
+                restore(code)
+            return value
+
+        return probe
+
+    def _invoker(
+        self, expr: CallExpr, argument_codes: list[ExprCode]
+    ) -> Callable[[Environment, Any], Any]:
+        paren = expr.paren
+        interpreter = self._interpreter
+
+        def invoke(env: Environment, callee: Any) -> Any:
+            if type(callee) is not LoxFunction and not isinstance(callee, LoxCallable):
+                raise JloxRuntimeError(paren, "Can only call functions and classes.")
+
+            arguments = [arg(env) for arg in argument_codes]
+
+            if len(arguments) != callee.arity:
+                raise JloxRuntimeError(
+                    paren,
+                    f"Expected {callee.arity} arguments but got {len(arguments)}.",
+                )
+
+            return callee.call(interpreter, arguments)
+
+        return invoke
+
+    def _load(self, expr: Expr, name: Token) -> ExprCode:
+        lexeme = name.lexeme
+        dist = self._interpreter._locals.get(expr, None)
+
+        if dist is None:
+            globals = self._interpreter.globals
+            global_values = globals._values
+
+            def load_global(env: Environment) -> Any:
+                if lexeme in global_values:
+                    return global_values[lexeme]
+                return globals.get(name)
+
+            return load_global
+
+        if dist == 0:
+
+            def load_local(env: Environment) -> Any:
+                values = env._values
+                if lexeme in values:
+                    return values[lexeme]
+                return env.get_at(0, name)
+
+            return load_local
+
+        def load_enclosing(env: Environment) -> Any:
+            scope = env
+            for _ in range(dist):
+                scope = scope._enclosing
+            values = scope._values
+            if lexeme in values:
+                return values[lexeme]
+            return env.get_at(dist, name)
+
+        return load_enclosing
+
+    def _store(self, expr: Expr, name: Token, value_code: ExprCode) -> ExprCode:
+        lexeme = name.lexeme
+        dist = self._interpreter._locals.get(expr, None)
+
+        if dist is None:
+            globals = self._interpreter.globals
+
+            def store_global(env: Environment) -> Any:
+                value = value_code(env)
+                globals.assign(name, value)
+                return value
+
+            return store_global
+
+        def store_local(env: Environment) -> Any:
+            value = value_code(env)
+            scope = env
+            for _ in range(dist):
+                scope = scope._enclosing
+            values = scope._values
+            if lexeme in values:
+                values[lexeme] = value
+            else:
+                env.assign_at(dist, name, value)
+            return value
+
+        return store_local
+
+    def _fallback_expr(self, expr: Expr) -> ExprCode:
+        interpreter = self._interpreter
+
+        def evaluate(env: Environment) -> Any:
+            prev_env = interpreter._environment
+            interpreter._environment = env
+            try:
+                return interpreter._evaluate(expr)
+            finally:
+                interpreter._environment = prev_env
+
+        return evaluate
+
+    def _fallback_stmt(self, stmt: Stmt) -> StmtCode:
+        interpreter = self._interpreter
+
+        def execute(env: Environment) -> None:
+            interpreter._executeBlock([stmt], env)
+
+        return execute
@@ -0,0 +1,132 @@
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator
+
+from jlox.environment import Environment
+from jlox.expression import AnonymousFunctionExpr, BinaryExpr, CallExpr, Expr
+from jlox.interpreter import Interpreter
+from jlox.limits import ExecutionLimits
+from jlox.lox_class import LoxClass
+from jlox.statement import BreakStmt, FunctionStmt, ReturnStmt, Stmt
+
+
+@dataclass
+class WorkCounts:
+    """
+    Work done by a run. The counts only depend on the program and its input,
+    so unlike timings they can be compared exactly between runs.
+    """
+
+    nodes: Counter[str] = field(default_factory=Counter)
+    environments: int = 0
+    calls: int = 0
+    instances: int = 0
+    control_flow_exceptions: int = 0
+    string_bytes: int = 0
+
+    def summary(self) -> dict[str, int]:
+        return {
+            "nodes": sum(self.nodes.values()),
+            "environments": self.environments,
+            "calls": self.calls,
+            "instances": self.instances,
+            "control_flow_exceptions": self.control_flow_exceptions,
+            "string_bytes": self.string_bytes,
+        }
+
+
+def format_counts(counts: WorkCounts) -> str:
+    summary = counts.summary()
+    lines = [f"{'nodes evaluated':<28} {summary['nodes']:>12}"]
+
+    for name, count in sorted(counts.nodes.items(), key=lambda item: -item[1]):
+        lines.append(f"  {name:<26} {count:>12}")
+
+    labels = {
+        "environments": "environments created",
+        "calls": "function calls",
+        "instances": "instances allocated",
+        "control_flow_exceptions": "control flow exceptions",
+        "string_bytes": "string bytes concatenated",
+    }
+    for key, label in labels.items():
+        lines.append(f"{label:<28} {summary[key]:>12}")
+
+    return "\n".join(lines)
+
+
+class CountingInterpreter(Interpreter):
+    """
+    Tree walking interpreter that counts the work it does. Tiering is off, so
+    every node goes through the visitor and the counts do not depend on when
+    code got hot.
+    """
+
+    def __init__(self, repl: bool = False, limits: ExecutionLimits | None = None):
+        super().__init__(repl, tiering=False, limits=limits)
+
+        self.counts = WorkCounts()
+
+    def interpret(self, statements: list[Stmt]):
+        with _counting_environments(self.counts):
+            super().interpret(statements)
+
+    def visitBinaryExpr(self, expr: BinaryExpr) -> Any:
+        value = super().visitBinaryExpr(expr)
+
+        if type(value) is str:
+            self.counts.string_bytes += len(value.encode())
+
+        return value
+
+    def visitReturnStmt(self, stmt: ReturnStmt) -> None:
+        self.counts.control_flow_exceptions += 1
+        super().visitReturnStmt(stmt)
+
+    def visitBreakStmt(self, stmt: BreakStmt) -> None:
+        self.counts.control_flow_exceptions += 1
+        super().visitBreakStmt(stmt)
+
+    def _evaluate(self, expr: Expr) -> Any:
+        self.counts.nodes[type(expr).__name__] += 1
+        return expr.accept(self)
+
+    def _execute(self, stmt: Stmt):
+        self.counts.nodes[type(stmt).__name__] += 1
+        stmt.accept(self)
+
+    def _execute_function_body(
+        self, declaration: FunctionStmt | AnonymousFunctionExpr, env: Environment
+    ):
+        # Every call of a LoxFunction, initializers included, ends up here.
+        self.counts.calls += 1
+        super()._execute_function_body(declaration, env)
+
+    def _invoke(self, expr: CallExpr, callee: Any) -> Any:
+        value = super()._invoke(expr, callee)
+
+        if isinstance(callee, LoxClass):
+            self.counts.instances += 1
+
+        return value
+
+
+@contextmanager
+def _counting_environments(counts: WorkCounts) -> Iterator[None]:
+    """
+    Counts the environments created while it is active. Functions, methods and
+    the interpreter all create them directly, so the constructor is wrapped.
+    Not safe with other threads running Lox code at the same time.
+    """
+    original = Environment.__init__
+
+    def counting_init(env: Environment, enclosing: Environment | None = None):
+        counts.environments += 1
+        original(env, enclosing)
+
+    Environment.__init__ = counting_init  # type: ignore[method-assign]
+    try:
+        yield
+    finally:
+        Environment.__init__ = original  # type: ignore[method-assign]
@@ -0,0 +1,124 @@
+import math
+from typing import Any, Sequence
+
+from jlox.ast_utils import Node, assigned_names, rewrite_all
+from jlox.expression import AssignExpr, BinaryExpr, LiteralExpr, VariableExpr
+from jlox.statement import (
+    BlockStmt,
+    CountingLoopStmt,
+    ExpressionStmt,
+    Stmt,
+    VarStmt,
+    WhileStmt,
+)
+from jlox.tokens import TokenType
+
+# Floats represent every integer below this exactly, so counting with Python
+# ints and converting back gives the same values as repeated float additions.
+_EXACT_INTEGERS = 2.0**53
+
+
+def specialize_counting_loops(statements: Sequence[Stmt]) -> list[Stmt]:
+    """
+    Replaces canonical desugared counting loops with CountingLoopStmt. Runs
+    before resolution so the resolver binds the new node directly.
+    """
+    program_assignments = assigned_names(statements)
+
+    def specialize(node: Node) -> Node:
+        if isinstance(node, BlockStmt):
+            return _match_counting_loop(node, program_assignments) or node
+        return node
+
+    return rewrite_all(statements, specialize)
+
+
+def counting_range(stmt: CountingLoopStmt, start: Any, bound: Any) -> range | None:
+    """
+    The counter values a CountingLoopStmt goes through, or None when start or
+    bound are not plain numbers and the loop has to run generically.
+    """
+    if type(start) not in (float, int) or type(bound) not in (float, int):
+        return None
+
+    if not (abs(start) < _EXACT_INTEGERS and abs(bound) < _EXACT_INTEGERS):
+        return None
+
+    if start != int(start):
+        return None
+
+    if stmt.condition.operator.type == TokenType.LESS_EQUAL:
+        stop = math.floor(bound) + 1
+    else:
+        stop = math.ceil(bound)
+
+    return range(int(start), stop, stmt.step)
+
+
+def _match_counting_loop(
+    block: BlockStmt, program_assignments: set[str]
+) -> CountingLoopStmt | None:
+    match block.statements:
+        case [
+            VarStmt(name=counter, initializer=initializer) as var_stmt,
+            WhileStmt(
+                condition=BinaryExpr(
+                    left=VariableExpr(name=cond_var), operator=operator, right=bound
+                ) as condition,
+                loop_body=BlockStmt(
+                    statements=[
+                        body,
+                        ExpressionStmt(
+                            expression=AssignExpr(
+                                name=incr_var,
+                                value=BinaryExpr(
+                                    left=VariableExpr(name=step_var),
+                                    operator=plus,
+                                    right=LiteralExpr(value=step),
+                                ),
+                            ) as increment
+                        ),
+                    ]
+                ),
+            ),
+        ]:
+            pass
+        case _:
+            return None
+
+    if initializer is None:
+        return None
+
+    name = counter.lexeme
+    if not (name == cond_var.lexeme == incr_var.lexeme == step_var.lexeme):
+        return None
+
+    if operator.type not in (TokenType.LESS, TokenType.LESS_EQUAL):
+        return None
+
+    if plus.type != TokenType.PLUS or not _is_positive_integer(step):
+        return None
+
+    match bound:
+        case LiteralExpr(value=float() | int()):
+            pass
+        case VariableExpr(name=bound_name) if bound_name.lexeme != name:
+            # Anything in the program could assign a variable that is visible
+            # from the loop, directly or through a call in the body.
+            if bound_name.lexeme in program_assignments:
+                return None
+        case _:
+            return None
+
+    if name in assigned_names([body]):
+        return None
+
+    return CountingLoopStmt(var_stmt, condition, body, increment, int(step))
+
+
+def _is_positive_integer(value: Any) -> bool:
+    return (
+        type(value) in (float, int)
+        and 0 < value < _EXACT_INTEGERS
+        and value == int(value)
+    )
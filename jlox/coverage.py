@@ -0,0 +1,137 @@
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Sequence
+
+from jlox.ast_utils import node_line, walk
+from jlox.expression import Expr, IfElseExpr, LogicalExpr
+from jlox.interpreter import Interpreter
+from jlox.probes import Probes
+from jlox.statement import ClassStmt, IfStmt, Stmt
+
+
+class Coverage:
+    """
+    Which statements of a program ran, and which way its branches went.
+
+    It probes the interpreter, which leaves the program alone and tiering on:
+    a probe only costs anything until it fires. Lines are only those of the source when the
+    program was not optimized: passes move code out of loops that may never
+    run, and clone functions whose branches the original never takes.
+    """
+
+    def __init__(self, filename: str = "<script>") -> None:
+        self.filename = filename
+        self.statements: dict[Stmt, bool] = {}
+        # The conditions of branches, with whether they were truthy and whether
+        # they were falsy.
+        self.branches: dict[Expr, list[bool]] = {}
+
+    @contextmanager
+    def recording(
+        self, interpreter: Interpreter, statements: Sequence[Stmt]
+    ) -> Iterator[None]:
+        """Records what of a resolved program the interpreter runs while active."""
+        self.add(statements)
+
+        # What an earlier recording saw needs no probe.
+        probes = Probes(
+            [stmt for stmt, hit in self.statements.items() if not hit],
+            {
+                condition: [
+                    outcome
+                    for outcome, taken in zip((True, False), outcomes)
+                    if not taken
+                ]
+                for condition, outcomes in self.branches.items()
+            },
+            self._statement,
+            self._branch,
+        )
+        probes.attach(interpreter)
+
+        try:
+            yield
+        finally:
+            probes.detach()
+
+    def add(self, statements: Sequence[Stmt]) -> None:
+        """Adds the statements and branches of a program, as not run yet."""
+        methods = {
+            id(method)
+            for node in walk(statements)
+            if isinstance(node, ClassStmt)
+            for method in node.methods
+        }
+
+        for node in walk(statements):
+            # Method declarations never run, their bodies do.
+            if Stmt in type(node).__mro__ and id(node) not in methods:
+                self.statements.setdefault(node, False)
+
+            match node:
+                case IfStmt(condition=condition) | IfElseExpr(conditional=condition):
+                    self.branches.setdefault(condition, [False, False])
+                case LogicalExpr(left=left):
+                    self.branches.setdefault(left, [False, False])
+
+    def lines(self) -> dict[int, bool]:
+        """Whether any statement on a line ran, for every line with some."""
+        lines: dict[int, bool] = {}
+
+        for stmt, hit in self.statements.items():
+            line = node_line(stmt)
+            if line:
+                lines[line] = lines.get(line, False) or hit
+
+        return dict(sorted(lines.items()))
+
+    def branch_lines(self) -> list[tuple[int, bool, bool]]:
+        """The branches as (line, taken when truthy, taken when falsy)."""
+        return sorted(
+            (node_line(condition), truthy, falsy)
+            for condition, (truthy, falsy) in self.branches.items()
+        )
+
+    def lcov(self) -> str:
+        lines = self.lines()
+        branches = self.branch_lines()
+
+        records = ["TN:", f"SF:{self.filename}"]
+        for block, (line, truthy, falsy) in enumerate(branches):
+            records.append(f"BRDA:{line},{block},0,{int(truthy)}")
+            records.append(f"BRDA:{line},{block},1,{int(falsy)}")
+        records.append(f"BRF:{len(branches) * 2}")
+        records.append(f"BRH:{sum(truthy + falsy for _, truthy, falsy in branches)}")
+
+        for line, hit in lines.items():
+            records.append(f"DA:{line},{int(hit)}")
+        records.append(f"LF:{len(lines)}")
+        records.append(f"LH:{sum(lines.values())}")
+        records.append("end_of_record")
+
+        return "".join(record + "\n" for record in records)
+
+    def save(self, path: str | Path) -> None:
+        Path(path).write_text(self.lcov())
+
+    def _statement(self, stmt: Stmt) -> None:
+        self.statements[stmt] = True
+
+    def _branch(self, condition: Expr, outcome: bool) -> None:
+        self.branches[condition][0 if outcome else 1] = True
+
+
+def format_coverage(coverage: Coverage) -> str:
+    lines = coverage.lines()
+    branches = coverage.branch_lines()
+    taken = sum(truthy + falsy for _, truthy, falsy in branches)
+
+    return (
+        f"lines: {_fraction(sum(lines.values()), len(lines))}, "
+        f"branches: {_fraction(taken, len(branches) * 2)}"
+    )
+
+
+def _fraction(part: int, whole: int) -> str:
+    percentage = part / whole * 100 if whole else 100.0
+    return f"{part}/{whole} ({percentage:.1f}%)"
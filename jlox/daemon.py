@@ -0,0 +1,207 @@
+import argparse
+import io
+import socket
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Hashable, Sequence
+
+from jlox.client import DEFAULT_SOCKET
+from jlox.errors import JloxRuntimeError, JloxSyntaxError
+from jlox.pass_manager import DEFAULT_OPTIMIZATION_LEVEL, OPTIMIZATION_LEVELS
+from jlox.program import Program, compile
+from jlox.protocol import (
+    RUNTIME_ERROR_STATUS,
+    SYNTAX_ERROR_STATUS,
+    Message,
+    ProtocolError,
+    check_request,
+    listen,
+    protocol_error,
+    receive_message,
+    send_message,
+)
+
+# Compiled programs the daemon keeps, which bounds the memory it holds on to.
+DEFAULT_CACHE_SIZE = 128
+
+
+class ProgramCache:
+    """
+    Compiled programs of the most recently run scripts, by their path and
+    modification time, or by their source when they were sent as source.
+    A script that changed is compiled again.
+    """
+
+    def __init__(
+        self,
+        capacity: int = DEFAULT_CACHE_SIZE,
+        level: int = DEFAULT_OPTIMIZATION_LEVEL,
+    ) -> None:
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._level = level
+        self._programs: OrderedDict[Hashable, Program] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._programs)
+
+    def get(self, message: Message) -> tuple[Program, bool]:
+        """The program a request asks to run, and whether it was cached."""
+        if "source" in message:
+            source = message["source"]
+            key: Hashable = ("source", source)
+        else:
+            path = Path(message["path"]).resolve()
+            key = ("path", path, path.stat().st_mtime_ns)
+            source = None
+
+        with self._lock:
+            program = self._programs.get(key)
+            if program is not None:
+                self._programs.move_to_end(key)
+                self.hits += 1
+                return program, True
+            self.misses += 1
+
+        # Compiling outside the lock lets other scripts run meanwhile, at the
+        # risk of compiling a script twice when it is requested twice at once.
+        program = compile(
+            source if source is not None else path.read_text(), self._level
+        )
+
+        with self._lock:
+            self._programs[key] = program
+            self._programs.move_to_end(key)
+            while len(self._programs) > self.capacity:
+                self._programs.popitem(last=False)
+
+        return program, False
+
+
+class Daemon:
+    """
+    Runs scripts sent to a Unix socket, on a thread per connection, from the
+    programs it has cached. Programs are only read while they run, so one
+    script can run on many connections at once.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        level: int = DEFAULT_OPTIMIZATION_LEVEL,
+        tiering: bool = True,
+    ) -> None:
+        self.path = Path(path)
+        self.cache = ProgramCache(cache_size, level)
+        self._tiering = tiering
+        self._socket = listen(self.path)
+
+    def serve_forever(self) -> None:
+        while True:
+            connection, _ = self._socket.accept()
+            threading.Thread(
+                target=self._serve, args=(connection,), daemon=True
+            ).start()
+
+    def close(self) -> None:
+        self._socket.close()
+        self.path.unlink(missing_ok=True)
+
+    def run(self, message: Message) -> Message:
+        try:
+            check_request(message)
+        except ProtocolError as e:
+            return protocol_error(e)
+
+        output = io.StringIO()
+        error = None
+        status = 0
+        cached = False
+
+        try:
+            program, cached = self.cache.get(message)
+            program.run(stdout=output, tiering=self._tiering)
+        except JloxRuntimeError as e:
+            error, status = f"Runtime error: {e}", RUNTIME_ERROR_STATUS
+        except JloxSyntaxError as e:
+            error, status = f"Syntax error: {e}", SYNTAX_ERROR_STATUS
+        except Exception as e:
+            # Missing scripts, and whatever else goes wrong, only fail the one
+            # request.
+            error, status = f"{type(e).__name__}: {e}", 1
+
+        return {
+            "output": output.getvalue(),
+            "error": error,
+            "status": status,
+            "cached": cached,
+        }
+
+    def _serve(self, connection: socket.socket) -> None:
+        with connection:
+            try:
+                message = receive_message(connection)
+                if message is None:
+                    return
+                reply = self.run(message)
+            except ProtocolError as e:
+                reply = protocol_error(e)
+
+            try:
+                send_message(connection, reply)
+            except ConnectionError:
+                pass
+
+
+def get_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="jlox daemon",
+        description="Keep compiled Lox scripts warm and run them for jlox client",
+    )
+    parser.add_argument(
+        "--socket",
+        default=DEFAULT_SOCKET,
+        help="where to listen, $JLOX_SOCKET or %(default)s",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+        help="compiled scripts to keep",
+    )
+    parser.add_argument(
+        "-O",
+        dest="optimization_level",
+        type=int,
+        choices=sorted(OPTIMIZATION_LEVELS),
+        default=DEFAULT_OPTIMIZATION_LEVEL,
+    )
+    parser.add_argument("--no-tiering", action="store_true")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = get_args(argv)
+    daemon = Daemon(
+        args.socket, args.cache_size, args.optimization_level, not args.no_tiering
+    )
+    print(f"Listening on {args.socket}", file=sys.stderr)
+
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
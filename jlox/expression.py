@@ -1,9 +1,9 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Protocol, Sequence, TypeVar, TYPE_CHECKING
 from jlox.tokens import Token
 
 if TYPE_CHECKING:
-    from jlox.statement import Stmt
+    from jlox.statement import FunctionStmt, Stmt
 
 T = TypeVar("T", covariant=True)
 
@@ -54,6 +54,15 @@ class ExprVisitor(Protocol[T]):
     def visitAnonymousFunctionExpr(self, expr: "AnonymousFunctionExpr") -> T:
         ...
 
+    def visitCachedExpr(self, expr: "CachedExpr") -> T:
+        ...
+
+    def visitInlinedCallExpr(self, expr: "InlinedCallExpr") -> T:
+        ...
+
+    def visitInlinedGetterExpr(self, expr: "InlinedGetterExpr") -> T:
+        ...
+
 
 V = TypeVar("V")
 
@@ -309,3 +318,71 @@ class AnonymousFunctionExpr(Expr):
         in dicts.
         """
         return id(self)
+
+
+@dataclass
+class CachedExpr(Expr):
+    """
+    Evaluates expression once and keeps the value in the variable called name
+    until that variable is reset to nil. Produced by jlox.loop_optimizer for
+    pure expressions whose operands do not change while the cache is live.
+    """
+
+    name: Token
+    expression: Expr
+
+    def accept(self, visitor: ExprVisitor[V]) -> V:
+        return visitor.visitCachedExpr(self)
+
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want expressions to be globally unique
+        in dicts.
+        """
+        return id(self)
+
+
+@dataclass
+class InlinedCallExpr(Expr):
+    """
+    A call to the global function declared by declaration with its body
+    substituted in. Evaluates body if the callee still is that function and
+    falls back to the original call otherwise. Produced by jlox.inliner.
+    """
+
+    call: CallExpr
+    declaration: "FunctionStmt" = field(metadata={"reference": True})
+    body: Expr
+
+    def accept(self, visitor: ExprVisitor[V]) -> V:
+        return visitor.visitInlinedCallExpr(self)
+
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want expressions to be globally unique
+        in dicts.
+        """
+        return id(self)
+
+
+@dataclass
+class InlinedGetterExpr(Expr):
+    """
+    A call to a method declared as `name() { return this.field_name; }`. Reads
+    the field directly if the receiver's method is still that declaration and
+    falls back to the original call otherwise. Produced by jlox.inliner.
+    """
+
+    call: CallExpr
+    declaration: "FunctionStmt" = field(metadata={"reference": True})
+    field_name: Token
+
+    def accept(self, visitor: ExprVisitor[V]) -> V:
+        return visitor.visitInlinedGetterExpr(self)
+
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want expressions to be globally unique
+        in dicts.
+        """
+        return id(self)
@@ -0,0 +1,232 @@
+import marshal
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from jlox.ast_utils import node_line
+from jlox.lox_callable import LoxCallable
+from jlox.lox_class import LoxClass
+from jlox.lox_function import LoxFunction
+
+# (file, line, name), the way pstats identifies functions.
+FunctionKey = tuple[str, int, str]
+
+# Natives have no source, pstats files them under "~" like Python's builtins.
+NATIVE_FILE = "~"
+
+
+@dataclass
+class FunctionStats:
+    key: FunctionKey
+    calls: int = 0
+    # Calls that were not made from inside another call of the same function.
+    primitive_calls: int = 0
+    # Time spent in the function and everything it called. Recursive calls are
+    # part of the outermost one, so they are not counted again.
+    inclusive: float = 0.0
+    # Time spent in the function itself.
+    exclusive: float = 0.0
+    callers: dict[FunctionKey, "FunctionStats"] = field(default_factory=dict)
+
+    @property
+    def name(self) -> str:
+        file, line, name = self.key
+        return name if file == NATIVE_FILE else f"{name} ({file}:{line})"
+
+
+def function_key(callee: LoxCallable, filename: str) -> FunctionKey:
+    """Names a callable after its declaration, or its class for natives."""
+    if isinstance(callee, LoxFunction):
+        declaration = callee.declaration
+        name = getattr(declaration, "name", None)
+        if name is not None:
+            # The specializer names its clones of f f$1, f$2 and so on, and
+            # keeps the line. They are all the function the user wrote.
+            return (filename, name.line, name.lexeme.partition("$")[0])
+        return (filename, node_line(declaration), "<anonymous>")
+
+    if isinstance(callee, LoxClass):
+        return (filename, 0, f"<class {callee.name}>")
+
+    return (NATIVE_FILE, 0, f"<native {type(callee).__name__}>")
+
+
+class _Frame:
+    __slots__ = ("key", "start", "children", "caller")
+
+    def __init__(self, key: FunctionKey, caller: FunctionKey | None) -> None:
+        self.key = key
+        self.caller = caller
+        self.children = 0.0
+        self.start = time.perf_counter()
+
+
+class FunctionProfiler:
+    """
+    Times every call of a Lox function, class or native function. The calls
+    are timed where they happen, in LoxCallable.call, so compiled code is
+    profiled too. Calls that the optimizer inlined are part of their caller.
+    """
+
+    def __init__(self, filename: str = "<script>") -> None:
+        self.filename = filename
+        self.functions: dict[FunctionKey, FunctionStats] = {}
+        self.script = FunctionStats((filename, 0, "<script>"))
+        self._stack: list[_Frame] = []
+        self._active: dict[FunctionKey, int] = {}
+        self._keys: dict[Any, FunctionKey] = {}
+
+    @contextmanager
+    def profiling(self) -> Iterator[None]:
+        """
+        Profiles the calls made while it is active, and the top level code as
+        <script>. Not safe with other threads running Lox code at the same time.
+        """
+        originals = {
+            cls: cls.__dict__["call"]
+            for cls in callable_classes()
+            if "call" in cls.__dict__
+        }
+        for cls, call in originals.items():
+            cls.call = self._wrap(call)  # type: ignore[method-assign]
+
+        self._enter(self.script.key)
+        try:
+            yield
+        finally:
+            self._exit()
+            for cls, call in originals.items():
+                cls.call = call  # type: ignore[method-assign]
+
+    def stats(self) -> list[FunctionStats]:
+        """Every function called, the slowest first."""
+        return sorted(
+            self.functions.values(), key=lambda stats: (-stats.inclusive, stats.key)
+        )
+
+    def dump_stats(self, path: str | Path) -> None:
+        """Writes the profile in the format pstats.Stats loads."""
+        data = {
+            stats.key: (
+                stats.primitive_calls,
+                stats.calls,
+                stats.exclusive,
+                stats.inclusive,
+                # cProfile orders the call counts of callers the other way.
+                {
+                    caller: (
+                        edge.calls,
+                        edge.primitive_calls,
+                        edge.exclusive,
+                        edge.inclusive,
+                    )
+                    for caller, edge in stats.callers.items()
+                },
+            )
+            for stats in [self.script, *self.functions.values()]
+        }
+        with open(path, "wb") as f:
+            marshal.dump(data, f)
+
+    def _wrap(self, call: Callable[..., Any]) -> Callable[..., Any]:
+        enter = self._enter
+        exit = self._exit
+        key = self._key
+
+        def profiled_call(callee: LoxCallable, interpreter: Any, arguments: list[Any]):
+            enter(key(callee))
+            try:
+                return call(callee, interpreter, arguments)
+            finally:
+                exit()
+
+        return profiled_call
+
+    def _key(self, callee: LoxCallable) -> FunctionKey:
+        if isinstance(callee, LoxFunction):
+            key = self._keys.get(callee.declaration)
+            if key is None:
+                key = self._keys[callee.declaration] = function_key(
+                    callee, self.filename
+                )
+            return key
+
+        return function_key(callee, self.filename)
+
+    def _enter(self, key: FunctionKey) -> None:
+        caller = self._stack[-1].key if self._stack else None
+        self._active[key] = self._active.get(key, 0) + 1
+        self._stack.append(_Frame(key, caller))
+
+    def _exit(self) -> None:
+        frame = self._stack.pop()
+        elapsed = time.perf_counter() - frame.start
+        if self._stack:
+            self._stack[-1].children += elapsed
+
+        outermost = self._active[frame.key] == 1
+        self._active[frame.key] -= 1
+
+        stats = self._stats(frame.key)
+        entries = [stats]
+        if frame.caller is not None:
+            edge = stats.callers.get(frame.caller)
+            if edge is None:
+                edge = stats.callers[frame.caller] = FunctionStats(frame.caller)
+            entries.append(edge)
+
+        for entry in entries:
+            entry.calls += 1
+            entry.exclusive += elapsed - frame.children
+            if outermost:
+                entry.primitive_calls += 1
+                entry.inclusive += elapsed
+
+    def _stats(self, key: FunctionKey) -> FunctionStats:
+        if key == self.script.key:
+            return self.script
+
+        stats = self.functions.get(key)
+        if stats is None:
+            stats = self.functions[key] = FunctionStats(key)
+        return stats
+
+
+def callable_classes() -> list[type]:
+    classes = []
+    pending = list(LoxCallable.__subclasses__())
+
+    while pending:
+        cls = pending.pop()
+        if cls not in classes:
+            classes.append(cls)
+            pending.extend(cls.__subclasses__())
+
+    return classes
+
+
+def format_profile(profiler: FunctionProfiler, limit: int | None = None) -> str:
+    lines = [
+        f"{'calls':>12} {'incl (ms)':>10} {'excl (ms)':>10} {'excl/call':>10}  "
+        "function"
+    ]
+
+    for stats in profiler.stats()[:limit]:
+        calls = str(stats.calls)
+        if stats.primitive_calls != stats.calls:
+            calls += f"/{stats.primitive_calls}"
+        lines.append(
+            f"{calls:>12} {stats.inclusive * 1000:>10.3f} "
+            f"{stats.exclusive * 1000:>10.3f} "
+            f"{stats.exclusive / stats.calls * 1000:>10.4f}  {stats.name}"
+        )
+
+    script = profiler.script
+    lines.append(
+        f"{script.inclusive * 1000:.3f} ms in total, "
+        f"{script.exclusive * 1000:.3f} ms at the top level"
+    )
+
+    return "\n".join(lines)
@@ -0,0 +1,216 @@
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Callable
+
+from jlox.environment import Environment
+from jlox.errors import JloxRuntimeError
+from jlox.exception_wrappers import ReturnWrapper
+from jlox.expression import (
+    AnonymousFunctionExpr,
+    CallExpr,
+    ExprVisitor,
+    GetExpr,
+    IfElseExpr,
+    InlinedCallExpr,
+    InlinedGetterExpr,
+    LogicalExpr,
+    SetExpr,
+)
+from jlox.lox_class import LoxClass
+from jlox.lox_instance import LoxInstance
+from jlox.statement import FunctionStmt, IfStmt, Stmt, StmtVisitor
+from jlox.tokens import TokenType
+
+if TYPE_CHECKING:
+    from jlox.interpreter import Interpreter
+
+Listener = Callable[..., None]
+
+
+class Event(Enum):
+    """
+    What the interpreter tells hook listeners about, with the arguments the
+    listeners get.
+    """
+
+    # (stmt)
+    STATEMENT = 1
+    # (declaration, environment), the environment holding the arguments.
+    FUNCTION_ENTER = 2
+    # (declaration, return value), also when the function raised.
+    FUNCTION_EXIT = 3
+    # (instance)
+    INSTANCE_CREATED = 4
+    # (instance, name token, value)
+    PROPERTY_GET = 5
+    # (instance, name token, value)
+    PROPERTY_SET = 6
+    # (error)
+    RUNTIME_ERROR = 7
+    # (callee, call expression), for calls of anything from Lox code. Unlike
+    # FUNCTION_ENTER it covers classes and natives, but not initializers.
+    CALL_ENTER = 8
+    # (callee, value)
+    CALL_EXIT = 9
+    # (condition, value), for the conditions of if statements and conditional
+    # expressions, and the left operands of and and or.
+    BRANCH = 10
+
+
+def instrument(interpreter: "Interpreter") -> None:
+    """
+    Turns an interpreter into the instrumented version of its class. Compiled
+    code does not report events, so tiering is suspended until it is undone.
+    """
+    if isinstance(interpreter, InstrumentedInterpreter):
+        return
+
+    interpreter._suspended_tiers, interpreter._tiers = interpreter._tiers, None
+    interpreter.__class__ = instrumented_class(type(interpreter))
+
+
+def uninstrument(interpreter: "Interpreter") -> None:
+    if not isinstance(interpreter, InstrumentedInterpreter):
+        return
+
+    interpreter.__class__ = interpreter.uninstrumented
+    interpreter._tiers, interpreter._suspended_tiers = (
+        interpreter._suspended_tiers,
+        None,
+    )
+
+
+_instrumented_classes: dict[type, type] = {}
+
+
+def instrumented_class(cls: type["Interpreter"]) -> type["Interpreter"]:
+    instrumented = _instrumented_classes.get(cls)
+    if instrumented is None:
+        # Threads instrumenting at once all end up with the class that won.
+        instrumented = _instrumented_classes.setdefault(
+            cls,
+            type(
+                f"Instrumented{cls.__name__}",
+                (InstrumentedInterpreter, cls),
+                {"uninstrumented": cls},
+            ),
+        )
+    return instrumented
+
+
+class InstrumentedInterpreter(ExprVisitor[Any], StmtVisitor[None]):
+    """
+    Reports events to the hooks of the interpreter it is mixed into. Optimized
+    calls and getters are run as they were written, so listeners see the
+    program they would expect.
+
+    It derives from the visitors like Interpreter does, which keeps the layout
+    of instances the same so their class can be swapped. A listener can remove
+    hooks, which swaps the class back in the middle of these methods, so they
+    look up what they call before reporting anything.
+    """
+
+    uninstrumented: type["Interpreter"]
+    _hooks: dict[Event, list[Listener]]
+    _evaluate: Callable[[Any], Any]
+
+    def interpret(self, statements: list[Stmt]):
+        interpret = super().interpret  # type: ignore[misc]
+        try:
+            interpret(statements)
+        except JloxRuntimeError as e:
+            self._emit(Event.RUNTIME_ERROR, e)
+            raise
+
+    def visitGetExpr(self, expr: GetExpr) -> Any:
+        obj = self._evaluate(expr.object)
+
+        if not isinstance(obj, LoxInstance):
+            raise JloxRuntimeError(expr.name, "Only instances have properties.")
+
+        value = obj.get(expr.name)
+        self._emit(Event.PROPERTY_GET, obj, expr.name, value)
+        return value
+
+    def visitSetExpr(self, expr: SetExpr) -> Any:
+        obj = self._evaluate(expr.object)
+
+        if not isinstance(obj, LoxInstance):
+            raise JloxRuntimeError(expr.name, "Only instances have properties.")
+
+        value = self._evaluate(expr.value)
+        obj.set(expr.name, value)
+        self._emit(Event.PROPERTY_SET, obj, expr.name, value)
+        return value
+
+    def visitLogicalExpr(self, expr: LogicalExpr) -> Any:
+        left = self._evaluate(expr.left)
+        self._emit(Event.BRANCH, expr.left, left)
+
+        if expr.operator.type == TokenType.OR:
+            if left:
+                return left
+        elif not left:
+            return left
+
+        return self._evaluate(expr.right)
+
+    def visitIfElseExpr(self, expr: IfElseExpr) -> Any:
+        condition = self._evaluate(expr.conditional)
+        self._emit(Event.BRANCH, expr.conditional, condition)
+
+        if condition:
+            return self._evaluate(expr.then_expr)
+        return self._evaluate(expr.else_expr)
+
+    def visitIfStmt(self, stmt: IfStmt) -> None:
+        condition = self._evaluate(stmt.condition)
+        self._emit(Event.BRANCH, stmt.condition, condition)
+
+        if condition:
+            self._execute(stmt.then_branch)
+        elif stmt.else_branch:
+            self._execute(stmt.else_branch)
+
+    def visitInlinedCallExpr(self, expr: InlinedCallExpr) -> Any:
+        return self._evaluate(expr.call)
+
+    def visitInlinedGetterExpr(self, expr: InlinedGetterExpr) -> Any:
+        return self._evaluate(expr.call)
+
+    def _execute(self, stmt: Stmt):
+        execute = super()._execute  # type: ignore[misc]
+        self._emit(Event.STATEMENT, stmt)
+        execute(stmt)
+
+    def _execute_function_body(
+        self, declaration: FunctionStmt | AnonymousFunctionExpr, env: Environment
+    ):
+        execute = super()._execute_function_body  # type: ignore[misc]
+        self._emit(Event.FUNCTION_ENTER, declaration, env)
+
+        value = None
+        try:
+            execute(declaration, env)
+        except ReturnWrapper as ret:
+            value = ret.value
+            raise
+        finally:
+            self._emit(Event.FUNCTION_EXIT, declaration, value)
+
+    def _invoke(self, expr: CallExpr, callee: Any) -> Any:
+        invoke = super()._invoke  # type: ignore[misc]
+        self._emit(Event.CALL_ENTER, callee, expr)
+
+        value = None
+        try:
+            value = invoke(expr, callee)
+            if isinstance(callee, LoxClass):
+                self._emit(Event.INSTANCE_CREATED, value)
+        finally:
+            self._emit(Event.CALL_EXIT, callee, value)
+
+        return value
+
+    def _emit(self, event: Event, *args: Any) -> None:
+        for listener in list(self._hooks.get(event, ())):
+            listener(*args)
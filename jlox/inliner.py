@@ -0,0 +1,229 @@
+from collections import Counter
+from dataclasses import replace
+from typing import Sequence
+
+from jlox.ast_utils import AstTransformer, Node, assigned_names, iter_children, walk
+from jlox.expression import (
+    AnonymousFunctionExpr,
+    BinaryExpr,
+    CallExpr,
+    Expr,
+    GetExpr,
+    GroupingExpr,
+    IfElseExpr,
+    InlinedCallExpr,
+    InlinedGetterExpr,
+    LiteralExpr,
+    LogicalExpr,
+    ThisExpr,
+    UnaryExpr,
+    VariableExpr,
+)
+from jlox.statement import ClassStmt, FunctionStmt, ReturnStmt, Stmt, VarStmt
+
+# Expressions made of these nodes have no side effects, so they can be moved
+# to where their value is used. Reading a property runs no Lox code.
+_MOVABLE = (
+    BinaryExpr,
+    GetExpr,
+    GroupingExpr,
+    IfElseExpr,
+    LiteralExpr,
+    LogicalExpr,
+    ThisExpr,
+    UnaryExpr,
+    VariableExpr,
+)
+
+# Arguments that can be evaluated more than once with the same result.
+_DUPLICABLE = (LiteralExpr, ThisExpr, VariableExpr)
+
+
+def inline_calls(statements: Sequence[Stmt]) -> list[Stmt]:
+    """
+    Inlines calls to global functions whose body is a single return of a side
+    effect free expression, and calls to methods that only return a field of
+    this. Runs before resolution. The inlined nodes check at run time that the
+    callee is still the inlined declaration.
+    """
+    functions = _inlinable_functions(statements)
+    getters = _inlinable_getters(statements)
+
+    if not functions and not getters:
+        return list(statements)
+
+    return _Inliner(functions, getters).transform_list(statements)
+
+
+def _inlinable_functions(statements: Sequence[Stmt]) -> dict[str, FunctionStmt]:
+    program_assignments = assigned_names(statements)
+
+    global_declarations = Counter(
+        stmt.name.lexeme
+        for stmt in statements
+        if isinstance(stmt, (VarStmt, FunctionStmt, ClassStmt))
+    )
+
+    # Names declared in a local scope anywhere, which could shadow a function
+    # or the globals its body refers to at some call site.
+    global_statements = {id(stmt) for stmt in statements}
+    local_names = set()
+
+    for node in walk(statements):
+        if isinstance(node, (VarStmt, FunctionStmt, ClassStmt)):
+            if id(node) not in global_statements:
+                local_names.add(node.name.lexeme)
+        if isinstance(node, (FunctionStmt, AnonymousFunctionExpr)):
+            local_names.update(param.lexeme for param in node.params)
+
+    functions = {}
+
+    for stmt in statements:
+        if not isinstance(stmt, FunctionStmt):
+            continue
+
+        name = stmt.name.lexeme
+        if global_declarations[name] > 1 or name in program_assignments:
+            continue
+
+        # Calls through a local of the same name would never pass the guard.
+        if name in local_names:
+            continue
+
+        body = _returned_expression(stmt)
+        if body is None or not _is_movable(body):
+            continue
+
+        params = {param.lexeme for param in stmt.params}
+
+        # Every argument has to be evaluated on every call, like it would be
+        # before the call, so errors in arguments are still raised.
+        if len(params) != len(stmt.params) or not params <= _always_read(body):
+            continue
+
+        if not local_names.isdisjoint(_variable_uses(body).keys() - params):
+            continue
+
+        functions[name] = stmt
+
+    return functions
+
+
+def _inlinable_getters(statements: Sequence[Stmt]) -> dict[str, FunctionStmt]:
+    methods: dict[str, list[FunctionStmt]] = {}
+
+    for node in walk(statements):
+        if isinstance(node, ClassStmt):
+            for method in node.methods:
+                methods.setdefault(method.name.lexeme, []).append(method)
+
+    getters = {}
+
+    for name, declarations in methods.items():
+        if name == "init" or len(declarations) != 1:
+            continue
+
+        [declaration] = declarations
+
+        match _returned_expression(declaration):
+            case GetExpr(object=ThisExpr()) if not declaration.params:
+                getters[name] = declaration
+
+    return getters
+
+
+def _returned_expression(declaration: FunctionStmt) -> Expr | None:
+    match declaration.body:
+        case [ReturnStmt(value=value)] if value is not None:
+            return value
+        case _:
+            return None
+
+
+def _is_movable(expr: Expr) -> bool:
+    return all(isinstance(node, _MOVABLE) for node in walk([expr]))
+
+
+def _variable_uses(expr: Expr) -> Counter[str]:
+    return Counter(
+        node.name.lexeme for node in walk([expr]) if isinstance(node, VariableExpr)
+    )
+
+
+def _always_read(expr: Expr) -> set[str]:
+    """The variables expr reads whichever way its conditions turn out."""
+    match expr:
+        case VariableExpr(name=name):
+            return {name.lexeme}
+        case LogicalExpr(left=condition) | IfElseExpr(conditional=condition):
+            return _always_read(condition)
+        case _:
+            return set().union(*(_always_read(child) for child in iter_children(expr)))
+
+
+class _Inliner(AstTransformer):
+    def __init__(
+        self, functions: dict[str, FunctionStmt], getters: dict[str, FunctionStmt]
+    ) -> None:
+        self._functions = functions
+        self._getters = getters
+
+    def transformCallExpr(self, expr: CallExpr) -> Expr:
+        call = self.generic_transform(expr)
+
+        match call.callee:
+            case VariableExpr(name=name) if name.lexeme in self._functions:
+                return self._inline_function(call, self._functions[name.lexeme])
+            case GetExpr(name=name) if name.lexeme in self._getters:
+                if call.arguments:
+                    return call
+                declaration = self._getters[name.lexeme]
+                body = _returned_expression(declaration)
+                assert isinstance(body, GetExpr)
+                return InlinedGetterExpr(call, declaration, body.name)
+            case _:
+                return call
+
+    def _inline_function(self, call: CallExpr, declaration: FunctionStmt) -> Expr:
+        if len(call.arguments) != len(declaration.params):
+            return call
+
+        body = _returned_expression(declaration)
+        assert body is not None
+
+        uses = _variable_uses(body)
+        arguments = {}
+
+        for param, argument in zip(declaration.params, call.arguments):
+            if uses[param.lexeme] > 1 and not isinstance(argument, _DUPLICABLE):
+                return call
+            if not _is_movable(argument):
+                return call
+            arguments[param.lexeme] = argument
+
+        return InlinedCallExpr(call, declaration, _Instantiator(arguments).copy(body))
+
+
+class _Instantiator(AstTransformer):
+    """
+    Copies an expression, replacing reads of parameters with copies of the
+    arguments. Every inlined body gets its own nodes so the resolver can bind
+    each of them at its call site.
+    """
+
+    def __init__(self, arguments: dict[str, Expr]) -> None:
+        self._arguments = arguments
+
+    def copy(self, expr: Expr) -> Expr:
+        return self.transform(expr)
+
+    def transformVariableExpr(self, expr: VariableExpr) -> Expr:
+        argument = self._arguments.get(expr.name.lexeme)
+        if argument is None:
+            return replace(expr)
+
+        return _Instantiator({}).copy(argument)
+
+    def generic_transform(self, node: Node) -> Node:
+        new = super().generic_transform(node)
+        return replace(new) if new is node else new
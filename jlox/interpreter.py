@@ -1,9 +1,10 @@
-from typing import Any
+from typing import Any, Awaitable, Callable, TextIO, TYPE_CHECKING
 from jlox.environment import Environment
 from jlox.expression import (
     AnonymousFunctionExpr,
     AssignExpr,
     BinaryExpr,
+    CachedExpr,
     CallExpr,
     CommaExpr,
     Expr,
@@ -18,6 +19,8 @@ from jlox.expression import (
     VariableExpr,
     GetExpr,
     IfElseExpr,
+    InlinedCallExpr,
+    InlinedGetterExpr,
 )
 from jlox.lox_class import LoxClass
 from jlox.lox_function import LoxFunction
@@ -25,6 +28,7 @@ from jlox.lox_instance import LoxInstance
 from jlox.tokens import Token, TokenType
 from jlox.statement import (
     BreakStmt,
+    CountingLoopStmt,
     ClassStmt,
     FunctionStmt,
     ReturnStmt,
@@ -41,6 +45,23 @@ from jlox.errors import JloxRuntimeError
 from jlox.lox_callable import LoxCallable
 from jlox.native_functions import AssertEqualFunc, ClockFunc
 from jlox.exception_wrappers import ReturnWrapper, BreakWrapper
+from jlox.tiering import TierController
+from jlox.hooks import Event, Listener, instrument, uninstrument
+from jlox.counting_loops import counting_range
+
+if TYPE_CHECKING:
+    from jlox.type_inference import TypeTable
+    from jlox.type_profile import ProfileHints
+    from jlox.program import Program
+    from jlox.limits import ExecutionLimits
+    from jlox.probes import Probes
+
+
+async def awaited(awaitable: Awaitable[Any]) -> Any:
+    return await awaitable
+
+
+_LOX_CALLABLES = (LoxFunction, LoxClass)
 
 
 def super_token():
@@ -52,7 +73,14 @@ def this_token():
 
 
 class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
-    def __init__(self, repl: bool = False):
+    def __init__(
+        self,
+        repl: bool = False,
+        tiering: bool = True,
+        stdout: TextIO | None = None,
+        program: "Program | None" = None,
+        limits: "ExecutionLimits | None" = None,
+    ):
         self._globals = Environment()
         self._environment = self._globals
 
@@ -60,14 +88,79 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
         self._globals.define("assert_equal", AssertEqualFunc())
 
         self._locals: dict[Expr, int] = {}
+        # Operators whose operand types were inferred statically, mapped to
+        # the Python operation that implements them without any checks.
+        self._unchecked_operations: dict[Expr, Callable[..., Any]] = {}
+
+        # These describe the program and are only read while it runs, unlike
+        # everything else here, which belongs to this execution. A compiled
+        # program shares its read-only ones between any number of
+        # interpreters, on any number of threads.
+        if program is not None:
+            self._locals = program.locals  # type: ignore[assignment]
+            self._unchecked_operations = program.unchecked_operations  # type: ignore
 
         self._repl = repl
         self._root_stmt: Stmt | None = None
+        # Where print writes, sys.stdout at the time of printing when None.
+        self.stdout = stdout
+
+        # Charged on loop back-edges and function calls, in both tiers.
+        self._limits = limits
+
+        self._tiers: TierController | None = TierController(self) if tiering else None
+
+        # While any hooks are added the interpreter runs as an instrumented
+        # subclass, with tiering suspended, so it pays nothing for them
+        # otherwise.
+        self._hooks: dict[Event, list[Listener]] = {}
+        self._suspended_tiers: TierController | None = None
+        # What of the program has not run yet, for coverage. Compiled code
+        # checks these too, so they leave tiering on.
+        self._probes: "Probes | None" = None
 
     @property
     def globals(self) -> Environment:
         return self._globals
 
+    def use_profile(self, hints: "ProfileHints") -> None:
+        if self._tiers is not None:
+            self._tiers.use_hints(hints)
+
+    def use_types(self, types: "TypeTable") -> None:
+        self._unchecked_operations.update(types.unchecked_operations())
+
+    def use_program(self, program: "Program") -> None:
+        """Takes on the resolution of a program compiled apart from it."""
+        # Copied, since the tables of a program are read only.
+        self._locals = {**self._locals, **program.locals}
+        self._unchecked_operations = {
+            **self._unchecked_operations,
+            **program.unchecked_operations,
+        }
+
+    def wait(self, awaitable: Awaitable[Any]) -> Any:
+        """
+        Waits for what an async native function returned. Outside of an event
+        loop there is nothing else to do in the meantime, so this runs one.
+        """
+        import asyncio
+
+        return asyncio.run(awaited(awaitable))
+
+    def add_hook(self, event: Event, listener: Listener) -> None:
+        self._hooks.setdefault(event, []).append(listener)
+        instrument(self)
+
+    def remove_hook(self, event: Event, listener: Listener) -> None:
+        listeners = self._hooks.get(event, [])
+        listeners.remove(listener)
+
+        if not listeners:
+            self._hooks.pop(event, None)
+        if not self._hooks:
+            uninstrument(self)
+
     def interpret(self, statements: list[Stmt]):
         for stmt in statements:
             self._root_stmt = stmt
@@ -84,6 +177,12 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
 
         match expr.operator.type:
             case TokenType.MINUS:
+                # Without inferred types the table is empty, and there is
+                # nothing to look up.
+                if self._unchecked_operations:
+                    unchecked = self._unchecked_operations.get(expr)
+                    if unchecked is not None:
+                        return unchecked(right)
                 self._check_number_operands(expr.operator, right)
                 return -float(right)
             case TokenType.BANG:
@@ -95,55 +194,12 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
         left = self._evaluate(expr.left)
         right = self._evaluate(expr.right)
 
-        match (expr.operator.type, left, right):
-            case TokenType.MINUS, float(l) | int(l), float(r) | int(r):
-                return l - r
-            case TokenType.SLASH, float(l) | int(l), float(r) | int(r):
-                return l / r
-            case TokenType.STAR, float(l) | int(l), float(r) | int(r):
-                return l * r
-            case TokenType.PLUS, int(l), str(r):
-                return str(l) + r
-            case TokenType.PLUS, str(l), int(r):
-                return l + str(r)
-            case TokenType.PLUS, float(l) | int(l), float(r) | int(r):
-                return l + r
-            case TokenType.PLUS, str(l), str(r):
-                return l + r
-            case TokenType.GREATER, float(l) | int(l), float(r) | int(r):
-                return l > r
-            case TokenType.GREATER_EQUAL, float(l) | int(l), float(r) | int(r):
-                return l >= r
-            case TokenType.LESS, float(l) | int(l), float(r) | int(r):
-                return l < r
-            case TokenType.LESS_EQUAL, float(l) | int(l), float(r) | int(r):
-                return l <= r
-            case TokenType.BANG_EQUAL, l, r:
-                return l != r
-            case TokenType.EQUAL_EQUAL, l, r:
-                return l == r
-            case tt, _, _:
-                if tt in [
-                    TokenType.MINUS,
-                    TokenType.SLASH,
-                    TokenType.STAR,
-                    TokenType.GREATER,
-                    TokenType.GREATER_EQUAL,
-                    TokenType.LESS,
-                    TokenType.LESS_EQUAL,
-                ]:
-                    raise JloxRuntimeError(
-                        expr.operator, "Operands must be two numbers"
-                    )
+        if self._unchecked_operations:
+            unchecked = self._unchecked_operations.get(expr)
+            if unchecked is not None:
+                return unchecked(left, right)
 
-                if tt == TokenType.PLUS:
-                    raise JloxRuntimeError(
-                        expr.operator, "Operands must be two numbers or two strings"
-                    )
-
-                return None
-            case _:
-                return None
+        return self._binary_op(expr.operator, left, right)
 
     def visitAssignExpr(self, expr: "AssignExpr") -> Any:
         value = self._evaluate(expr.value)
@@ -160,7 +216,7 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
         ret = self._evaluate(stmt.expression)
 
         if ret is not None and self._repl and stmt == self._root_stmt:
-            print(ret)
+            print(ret, file=self.stdout)
 
     def visitVariableExpr(self, expr: "VariableExpr") -> Any:
         return self._lookup_var(expr.name, expr)
@@ -213,19 +269,7 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
 
     def visitCallExpr(self, expr: "CallExpr") -> Any:
         callee = self._evaluate(expr.callee)
-
-        if not isinstance(callee, LoxCallable):
-            raise JloxRuntimeError(expr.paren, "Can only call functions and classes.")
-
-        arguments = [self._evaluate(arg) for arg in expr.arguments]
-
-        if len(arguments) != callee.arity:
-            raise JloxRuntimeError(
-                expr.paren,
-                f"Expected {callee.arity} arguments but got {len(arguments)}.",
-            )
-
-        return callee.call(self, arguments)
+        return self._invoke(expr, callee)
 
     def visitCommaExpr(self, expr: "CommaExpr") -> Any:
         _, right = self._evaluate(expr.left), self._evaluate(expr.right)
@@ -243,9 +287,53 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
         func = LoxFunction(expr, self._environment)
         return func
 
+    def visitCachedExpr(self, expr: "CachedExpr") -> Any:
+        value = self._lookup_var(expr.name, expr)
+        if value is not None:
+            return value
+
+        value = self._evaluate(expr.expression)
+
+        dist = self._locals.get(expr, None)
+        if dist is not None:
+            self._environment.assign_at(dist, expr.name, value)
+        else:
+            self._globals.assign(expr.name, value)
+
+        return value
+
+    def visitInlinedCallExpr(self, expr: "InlinedCallExpr") -> Any:
+        callee = self._evaluate(expr.call.callee)
+
+        if type(callee) is LoxFunction and callee.declaration is expr.declaration:
+            # Charged like the call it replaces.
+            if self._limits is not None:
+                self._limits.charge(expr.declaration)
+            return self._evaluate(expr.body)
+
+        return self._invoke(expr.call, callee)
+
+    def visitInlinedGetterExpr(self, expr: "InlinedGetterExpr") -> Any:
+        get = expr.call.callee
+        assert isinstance(get, GetExpr)
+
+        obj = self._evaluate(get.object)
+
+        if type(obj) is LoxInstance and get.name.lexeme not in obj._fields:
+            method = obj.kind.find_method(get.name.lexeme)
+            if method is not None and method.declaration is expr.declaration:
+                if self._limits is not None:
+                    self._limits.charge(expr.declaration)
+                return obj.get(expr.field_name)
+
+        if not isinstance(obj, LoxInstance):
+            raise JloxRuntimeError(get.name, "Only instances have properties.")
+
+        return self._invoke(expr.call, obj.get(get.name))
+
     def visitPrintStmt(self, stmt: "PrintStmt") -> None:
         value = self._evaluate(stmt.expression)
-        print(value)
+        print(value, file=self.stdout)
 
     def visitReturnStmt(self, stmt: "ReturnStmt") -> None:
         value = self._evaluate(stmt.value) if stmt.value is not None else None
@@ -267,12 +355,40 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
             self._execute(stmt.else_branch)
 
     def visitWhileStmt(self, stmt: "WhileStmt") -> None:
+        tiers = self._tiers
+        if tiers is not None and (code := tiers.compiled_loop(stmt)) is not None:
+            code(self._environment)
+            return
+
+        limits = self._limits
         try:
             while self._evaluate(stmt.condition):
                 self._execute(stmt.loop_body)
+
+                if limits is not None:
+                    limits.charge(stmt)
+                if tiers is not None and (code := tiers.back_edge(stmt)) is not None:
+                    # Hot loop, finish the remaining iterations in compiled code.
+                    code(self._environment)
+                    return
         except BreakWrapper:
             pass
 
+    def visitCountingLoopStmt(self, stmt: "CountingLoopStmt") -> None:
+        prev_env = self._environment
+
+        try:
+            self._environment = Environment(prev_env)
+            self._execute(stmt.initializer)
+
+            tiers = self._tiers
+            if tiers is not None and (code := tiers.compiled_loop(stmt)) is not None:
+                code(self._environment)
+            else:
+                self._counting_loop(stmt)
+        finally:
+            self._environment = prev_env
+
     def visitFunctionStmt(self, stmt: "FunctionStmt") -> None:
         func = LoxFunction(stmt, self._environment)
         self._environment.define(stmt.name.lexeme, func)
@@ -328,9 +444,129 @@ class Interpreter(ExprVisitor[Any], StmtVisitor[None]):
         finally:
             self._environment = prev_env
 
+    def _counting_loop(self, stmt: CountingLoopStmt):
+        env = self._environment
+        name = stmt.initializer.name
+        tiers = self._tiers
+        limits = self._limits
+
+        start = env.get_at(0, name)
+        counter = counting_range(stmt, start, self._evaluate(stmt.condition.right))
+
+        try:
+            if counter is None:
+                while self._evaluate(stmt.condition):
+                    self._execute(stmt.loop_body)
+                    self._evaluate(stmt.increment)
+
+                    if limits is not None:
+                        limits.charge(stmt)
+                    if (
+                        tiers is not None
+                        and (code := tiers.back_edge(stmt)) is not None
+                    ):
+                        code(env)
+                        return
+                return
+
+            number = type(start)
+            for i in counter:
+                env.define(name.lexeme, number(i))
+                self._execute(stmt.loop_body)
+
+                if limits is not None:
+                    limits.charge(stmt)
+                if tiers is not None and (code := tiers.back_edge(stmt)) is not None:
+                    env.define(name.lexeme, number(i + stmt.step))
+                    code(env)
+                    return
+
+            env.define(name.lexeme, number(counter.start + stmt.step * len(counter)))
+        except BreakWrapper:
+            pass
+
+    def _execute_function_body(
+        self, declaration: FunctionStmt | AnonymousFunctionExpr, env: Environment
+    ):
+        if self._limits is not None:
+            self._limits.charge(declaration)
+
+        if self._tiers is not None:
+            code = self._tiers.function_entry(declaration)
+            if code is not None:
+                code(env)
+                return
+
+        self._executeBlock(declaration.body, env)
+
+    def _invoke(self, expr: CallExpr, callee: Any) -> Any:
+        # Checking against the protocol is slow, and most callees are functions
+        # and classes.
+        if type(callee) not in _LOX_CALLABLES and not isinstance(callee, LoxCallable):
+            raise JloxRuntimeError(expr.paren, "Can only call functions and classes.")
+
+        arguments = [self._evaluate(arg) for arg in expr.arguments]
+
+        if len(arguments) != callee.arity:
+            raise JloxRuntimeError(
+                expr.paren,
+                f"Expected {callee.arity} arguments but got {len(arguments)}.",
+            )
+
+        return callee.call(self, arguments)
+
     def _is_truthy(self, val: Any) -> bool:
         return bool(val)
 
+    def _binary_op(self, operator: Token, left: Any, right: Any) -> Any:
+        match (operator.type, left, right):
+            case TokenType.MINUS, float(l) | int(l), float(r) | int(r):
+                return l - r
+            case TokenType.SLASH, float(l) | int(l), float(r) | int(r):
+                return l / r
+            case TokenType.STAR, float(l) | int(l), float(r) | int(r):
+                return l * r
+            case TokenType.PLUS, int(l), str(r):
+                return str(l) + r
+            case TokenType.PLUS, str(l), int(r):
+                return l + str(r)
+            case TokenType.PLUS, float(l) | int(l), float(r) | int(r):
+                return l + r
+            case TokenType.PLUS, str(l), str(r):
+                return l + r
+            case TokenType.GREATER, float(l) | int(l), float(r) | int(r):
+                return l > r
+            case TokenType.GREATER_EQUAL, float(l) | int(l), float(r) | int(r):
+                return l >= r
+            case TokenType.LESS, float(l) | int(l), float(r) | int(r):
+                return l < r
+            case TokenType.LESS_EQUAL, float(l) | int(l), float(r) | int(r):
+                return l <= r
+            case TokenType.BANG_EQUAL, l, r:
+                return l != r
+            case TokenType.EQUAL_EQUAL, l, r:
+                return l == r
+            case tt, _, _:
+                if tt in [
+                    TokenType.MINUS,
+                    TokenType.SLASH,
+                    TokenType.STAR,
+                    TokenType.GREATER,
+                    TokenType.GREATER_EQUAL,
+                    TokenType.LESS,
+                    TokenType.LESS_EQUAL,
+                ]:
+                    raise JloxRuntimeError(operator, "Operands must be two numbers")
+
+                if tt == TokenType.PLUS:
+                    raise JloxRuntimeError(
+                        operator, "Operands must be two numbers or two strings"
+                    )
+
+                return None
+            case _:
+                return None
+
     def _check_number_operands(self, operator: Token, *operands: Any):
         if all(isinstance(operand, float) for operand in operands):
             return
@@ -0,0 +1,556 @@
+from dataclasses import dataclass, field
+from itertools import count
+from typing import Iterator, Sequence
+
+from jlox.ast_printer import AstPrinter
+from jlox.ast_utils import iter_children, walk
+from jlox.expression import (
+    AnonymousFunctionExpr,
+    AssignExpr,
+    CachedExpr,
+    Expr,
+    VariableExpr,
+)
+from jlox.statement import (
+    BlockStmt,
+    BreakStmt,
+    ClassStmt,
+    CountingLoopStmt,
+    ExpressionStmt,
+    FunctionStmt,
+    IfStmt,
+    PrintStmt,
+    ReturnStmt,
+    Stmt,
+    StmtVisitor,
+    VarStmt,
+    WhileStmt,
+)
+from jlox.tokens import Token
+
+FunctionDeclaration = FunctionStmt | AnonymousFunctionExpr
+
+
+@dataclass(frozen=True)
+class Variable:
+    name: str
+    # Unique per declaration within a graph. None for variables that are not
+    # local to the lowered function: globals and those of enclosing functions.
+    id: int | None
+
+    @property
+    def is_local(self) -> bool:
+        return self.id is not None
+
+    def __str__(self) -> str:
+        return self.name if self.id is None else f"{self.name}.{self.id}"
+
+
+@dataclass(eq=False)
+class Jump:
+    target: "BasicBlock"
+
+
+@dataclass(eq=False)
+class Branch:
+    condition: Expr
+    if_true: "BasicBlock"
+    if_false: "BasicBlock"
+
+
+@dataclass(eq=False)
+class Return:
+    value: Expr | None
+
+
+Terminator = Jump | Branch | Return
+
+
+@dataclass(eq=False)
+class BasicBlock:
+    """
+    Straight-line statements followed by a terminator. uses are the local
+    variables read before the block writes them, defs the ones it writes.
+    """
+
+    id: int
+    statements: list[Stmt] = field(default_factory=list)
+    terminator: Terminator | None = None
+    uses: set[Variable] = field(default_factory=set)
+    defs: set[Variable] = field(default_factory=set)
+
+    @property
+    def successors(self) -> list["BasicBlock"]:
+        match self.terminator:
+            case Jump(target=target):
+                return [target]
+            case Branch(if_true=if_true, if_false=if_false):
+                return [if_true, if_false]
+            case _:
+                return []
+
+
+@dataclass(eq=False)
+class ControlFlowGraph:
+    """
+    The blocks of a function in reverse postorder, starting at the entry.
+    Blocks that cannot be reached are left out. Local variables captured by
+    nested functions can change whenever those run, so they are listed in
+    captured for anything that wants to keep them out of registers, and in
+    assigned_by_closures if a nested function writes them.
+
+    bindings maps the variable nodes and declarations of the function, not
+    those of nested functions, to the variables they refer to.
+    """
+
+    name: str
+    params: list[Variable]
+    blocks: list[BasicBlock]
+    captured: set[Variable]
+    assigned_by_closures: set[Variable] = field(default_factory=set)
+    bindings: dict[Expr | Stmt, Variable] = field(default_factory=dict)
+
+    @property
+    def entry(self) -> BasicBlock:
+        return self.blocks[0]
+
+    def predecessors(self) -> dict[BasicBlock, list[BasicBlock]]:
+        preds: dict[BasicBlock, list[BasicBlock]] = {b: [] for b in self.blocks}
+        for block in self.blocks:
+            for successor in block.successors:
+                preds[successor].append(block)
+        return preds
+
+
+@dataclass
+class Liveness:
+    live_in: dict[BasicBlock, set[Variable]]
+    live_out: dict[BasicBlock, set[Variable]]
+
+
+def lower_program(statements: Sequence[Stmt]) -> ControlFlowGraph:
+    """Lowers top-level code. Its declarations are globals, so not tracked."""
+    return _Lowering().lower("<script>", [], statements, global_scope=True)
+
+
+def lower_function(
+    declaration: FunctionDeclaration, name: str | None = None
+) -> ControlFlowGraph:
+    if name is None:
+        name = (
+            declaration.name.lexeme
+            if isinstance(declaration, FunctionStmt)
+            else "<anonymous>"
+        )
+
+    return _Lowering().lower(name, declaration.params, declaration.body)
+
+
+def lower_all(statements: Sequence[Stmt]) -> list[ControlFlowGraph]:
+    """The graph of the top-level code followed by one for every function."""
+    graphs = [lower_program(statements)]
+
+    for name, declaration in _functions(statements):
+        graphs.append(lower_function(declaration, name))
+
+    return graphs
+
+
+def immediate_dominators(cfg: ControlFlowGraph) -> dict[BasicBlock, BasicBlock]:
+    """
+    Cooper, Harvey and Kennedy's iterative algorithm. The entry is its own
+    immediate dominator.
+    """
+    order = {block: index for index, block in enumerate(cfg.blocks)}
+    preds = cfg.predecessors()
+    idom = {cfg.entry: cfg.entry}
+
+    def intersect(a: BasicBlock, b: BasicBlock) -> BasicBlock:
+        while a is not b:
+            while order[a] > order[b]:
+                a = idom[a]
+            while order[b] > order[a]:
+                b = idom[b]
+        return a
+
+    changed = True
+    while changed:
+        changed = False
+
+        for block in cfg.blocks[1:]:
+            processed = [pred for pred in preds[block] if pred in idom]
+            new_idom = processed[0]
+            for pred in processed[1:]:
+                new_idom = intersect(pred, new_idom)
+
+            if idom.get(block) is not new_idom:
+                idom[block] = new_idom
+                changed = True
+
+    return idom
+
+
+def dominates(
+    idom: dict[BasicBlock, BasicBlock], dominator: BasicBlock, block: BasicBlock
+) -> bool:
+    while block is not dominator:
+        parent = idom[block]
+        if parent is block:
+            return False
+        block = parent
+
+    return True
+
+
+def liveness(cfg: ControlFlowGraph) -> Liveness:
+    live_in: dict[BasicBlock, set[Variable]] = {b: set() for b in cfg.blocks}
+    live_out: dict[BasicBlock, set[Variable]] = {b: set() for b in cfg.blocks}
+
+    changed = True
+    while changed:
+        changed = False
+
+        for block in reversed(cfg.blocks):
+            out = set().union(*(live_in[succ] for succ in block.successors))
+            new_in = block.uses | (out - block.defs)
+
+            if out != live_out[block] or new_in != live_in[block]:
+                live_out[block] = out
+                live_in[block] = new_in
+                changed = True
+
+    return Liveness(live_in, live_out)
+
+
+def to_dot(cfg: ControlFlowGraph, live: Liveness | None = None) -> str:
+    printer = AstPrinter()
+    lines = [
+        f"digraph {_quote(cfg.name)} {{",
+        '  node [shape=box, fontname="monospace"];',
+    ]
+
+    for block in cfg.blocks:
+        label = [f"B{block.id}:"]
+
+        if live is not None:
+            label.append(f"live in: {_names(live.live_in[block])}")
+
+        for stmt in block.statements:
+            match stmt:
+                # Their bodies have graphs of their own.
+                case FunctionStmt(name=name):
+                    label.append(f"(fun {name.lexeme} ...)")
+                case ClassStmt(name=name):
+                    label.append(f"(class {name.lexeme} ...)")
+                case _:
+                    label.extend(printer.print(stmt).splitlines())
+
+        match block.terminator:
+            case Branch(condition=condition):
+                label.append(f"branch {printer.print(condition)}")
+            case Return(value=value):
+                label.append(
+                    "return" if value is None else f"return {printer.print(value)}"
+                )
+
+        if live is not None:
+            label.append(f"live out: {_names(live.live_out[block])}")
+
+        text = "".join(_escape(line) + "\\l" for line in label)
+        lines.append(f'  B{block.id} [label="{text}"];')
+
+        match block.terminator:
+            case Jump(target=target):
+                lines.append(f"  B{block.id} -> B{target.id};")
+            case Branch(if_true=if_true, if_false=if_false):
+                lines.append(f'  B{block.id} -> B{if_true.id} [label="true"];')
+                lines.append(f'  B{block.id} -> B{if_false.id} [label="false"];')
+
+    lines.append("}")
+    return "\n".join(lines)
+
+
+class _Lowering(StmtVisitor[None]):
+    def __init__(self) -> None:
+        self._variable_ids = count()
+        self._block_ids = count()
+        self._scopes: list[dict[str, Variable]] = []
+        self._loop_exits: list[BasicBlock] = []
+        self._captured: set[Variable] = set()
+        self._assigned_by_closures: set[Variable] = set()
+        self._bindings: dict[Expr | Stmt, Variable] = {}
+        self._block = self._new_block()
+
+    def lower(
+        self,
+        name: str,
+        params: Sequence[Token],
+        body: Sequence[Stmt],
+        global_scope: bool = False,
+    ) -> ControlFlowGraph:
+        entry = self._block
+
+        if not global_scope:
+            self._scopes.append({})
+        variables = [self._declare(param) for param in params]
+
+        for stmt in body:
+            stmt.accept(self)
+        self._terminate(Return(None))
+
+        blocks = _reverse_postorder(entry)
+        for index, block in enumerate(blocks):
+            block.id = index
+
+        return ControlFlowGraph(
+            name,
+            variables,
+            blocks,
+            self._captured,
+            self._assigned_by_closures,
+            self._bindings,
+        )
+
+    def visitExpressionStmt(self, stmt: ExpressionStmt) -> None:
+        self._emit(stmt, [stmt.expression])
+
+    def visitPrintStmt(self, stmt: PrintStmt) -> None:
+        self._emit(stmt, [stmt.expression])
+
+    def visitVarStmt(self, stmt: VarStmt) -> None:
+        initializer = [] if stmt.initializer is None else [stmt.initializer]
+        self._emit(stmt, initializer, [stmt.name])
+
+    def visitBlockStmt(self, stmt: BlockStmt) -> None:
+        self._scopes.append({})
+        for inner in stmt.statements:
+            inner.accept(self)
+        self._scopes.pop()
+
+    def visitIfStmt(self, stmt: IfStmt) -> None:
+        then_block = self._new_block()
+        join = self._new_block()
+        else_block = join if stmt.else_branch is None else self._new_block()
+
+        self._terminate(Branch(stmt.condition, then_block, else_block))
+
+        self._block = then_block
+        stmt.then_branch.accept(self)
+        self._terminate(Jump(join))
+
+        if stmt.else_branch is not None:
+            self._block = else_block
+            stmt.else_branch.accept(self)
+            self._terminate(Jump(join))
+
+        self._block = join
+
+    def visitWhileStmt(self, stmt: WhileStmt) -> None:
+        self._loop(stmt.condition, stmt.loop_body, None)
+
+    def visitCountingLoopStmt(self, stmt: CountingLoopStmt) -> None:
+        self._scopes.append({})
+        stmt.initializer.accept(self)
+        self._loop(stmt.condition, stmt.loop_body, ExpressionStmt(stmt.increment))
+        self._scopes.pop()
+
+    def visitFunctionStmt(self, stmt: FunctionStmt) -> None:
+        # Declared first, so the function can refer to itself.
+        variable = self._declare(stmt.name)
+        self._bindings[stmt] = variable
+        self._emit(stmt, [], [], captures=[stmt])
+        self._define(variable)
+
+    def visitReturnStmt(self, stmt: ReturnStmt) -> None:
+        self._terminate(Return(stmt.value))
+        self._block = self._new_block()
+
+    def visitClassStmt(self, stmt: ClassStmt) -> None:
+        variable = self._declare(stmt.name)
+        self._bindings[stmt] = variable
+        superclass = [] if stmt.superclass is None else [stmt.superclass]
+        self._emit(stmt, superclass, [], captures=stmt.methods)
+        self._define(variable)
+
+    def visitBreakStmt(self, stmt: BreakStmt) -> None:
+        self._terminate(Jump(self._loop_exits[-1]))
+        self._block = self._new_block()
+
+    def _loop(self, condition: Expr, body: Stmt, increment: Stmt | None) -> None:
+        header = self._new_block()
+        body_block = self._new_block()
+        exit_block = self._new_block()
+
+        self._terminate(Jump(header))
+        self._block = header
+        self._terminate(Branch(condition, body_block, exit_block))
+
+        self._block = body_block
+        self._loop_exits.append(exit_block)
+        body.accept(self)
+        self._loop_exits.pop()
+
+        if increment is not None:
+            increment.accept(self)
+        self._terminate(Jump(header))
+
+        self._block = exit_block
+
+    def _new_block(self) -> BasicBlock:
+        return BasicBlock(next(self._block_ids))
+
+    def _declare(self, name: Token) -> Variable:
+        if not self._scopes:
+            return Variable(name.lexeme, None)
+
+        variable = Variable(name.lexeme, next(self._variable_ids))
+        self._scopes[-1][name.lexeme] = variable
+        return variable
+
+    def _define(self, variable: Variable) -> None:
+        if variable.is_local:
+            self._block.defs.add(variable)
+
+    def _lookup(self, name: Token) -> Variable:
+        for scope in reversed(self._scopes):
+            if name.lexeme in scope:
+                return scope[name.lexeme]
+
+        return Variable(name.lexeme, None)
+
+    def _emit(
+        self,
+        stmt: Stmt,
+        reads: Sequence[Expr],
+        declares: Sequence[Token] = (),
+        captures: Sequence[FunctionDeclaration] = (),
+    ) -> None:
+        self._access(reads)
+
+        for declaration in captures:
+            self._capture(declaration)
+
+        for name in declares:
+            variable = self._declare(name)
+            self._bindings[stmt] = variable
+            self._define(variable)
+
+        self._block.statements.append(stmt)
+
+    def _terminate(self, terminator: Terminator) -> None:
+        if self._block.terminator is not None:
+            return
+
+        match terminator:
+            case Branch(condition=condition):
+                self._access([condition])
+            case Return(value=value) if value is not None:
+                self._access([value])
+
+        self._block.terminator = terminator
+
+    def _access(self, exprs: Sequence[Expr]) -> None:
+        """
+        Records the variables exprs read and write, as if all reads happened
+        before all writes. That can only make variables live for longer.
+        """
+        writes = []
+
+        for node in _nodes_outside_functions(exprs):
+            match node:
+                case VariableExpr(name=name):
+                    self._read(self._bind(node, name))
+                case AssignExpr(name=name):
+                    writes.append(self._bind(node, name))
+                case CachedExpr(name=name):
+                    variable = self._bind(node, name)
+                    self._read(variable)
+                    writes.append(variable)
+                case AnonymousFunctionExpr():
+                    self._capture(node)
+
+        for variable in writes:
+            self._define(variable)
+
+    def _capture(self, declaration: FunctionDeclaration) -> None:
+        for node in walk(declaration.body):
+            if isinstance(node, (VariableExpr, AssignExpr, CachedExpr)):
+                variable = self._lookup(node.name)
+                if variable.is_local:
+                    self._captured.add(variable)
+                    self._read(variable)
+                    if not isinstance(node, VariableExpr):
+                        self._assigned_by_closures.add(variable)
+
+    def _bind(self, node: Expr, name: Token) -> Variable:
+        variable = self._lookup(name)
+        self._bindings[node] = variable
+        return variable
+
+    def _read(self, variable: Variable) -> None:
+        if variable.is_local and variable not in self._block.defs:
+            self._block.uses.add(variable)
+
+
+def _nodes_outside_functions(exprs: Sequence[Expr]) -> Iterator[Expr]:
+    stack = list(reversed(exprs))
+
+    while stack:
+        node = stack.pop()
+        yield node
+
+        if not isinstance(node, AnonymousFunctionExpr):
+            stack.extend(reversed(list(iter_children(node))))
+
+
+def _reverse_postorder(entry: BasicBlock) -> list[BasicBlock]:
+    postorder: list[BasicBlock] = []
+    visited = {entry}
+    stack = [(entry, iter(entry.successors))]
+
+    while stack:
+        block, successors = stack[-1]
+        successor = next(successors, None)
+
+        if successor is None:
+            stack.pop()
+            postorder.append(block)
+        elif successor not in visited:
+            visited.add(successor)
+            stack.append((successor, iter(successor.successors)))
+
+    return postorder[::-1]
+
+
+def _functions(
+    statements: Sequence[Stmt],
+) -> Iterator[tuple[str, FunctionDeclaration]]:
+    methods = {
+        id(method)
+        for node in walk(statements)
+        if isinstance(node, ClassStmt)
+        for method in node.methods
+    }
+    anonymous = count(1)
+
+    for node in walk(statements):
+        match node:
+            case ClassStmt(name=class_name, methods=class_methods):
+                for method in class_methods:
+                    yield f"{class_name.lexeme}.{method.name.lexeme}", method
+            case FunctionStmt(name=name) if id(node) not in methods:
+                yield name.lexeme, node
+            case AnonymousFunctionExpr():
+                yield f"<anonymous {next(anonymous)}>", node
+
+
+def _names(variables: set[Variable]) -> str:
+    return ", ".join(sorted(str(variable) for variable in variables))
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _quote(text: str) -> str:
+    return f'"{_escape(text)}"'
@@ -0,0 +1,101 @@
+import math
+import sys
+import time
+from typing import Iterable
+
+from jlox.ast_utils import Node, iter_children, node_line
+from jlox.errors import JloxRuntimeError
+from jlox.expression import AnonymousFunctionExpr
+from jlox.sampling_profiler import SamplingProfiler
+from jlox.statement import CountingLoopStmt, FunctionStmt, Stmt, WhileStmt
+from jlox.tokens import Token, TokenType
+
+# Charges between two reads of the clock.
+DEFAULT_CLOCK_INTERVAL = 1024
+
+Charged = WhileStmt | CountingLoopStmt | FunctionStmt | AnonymousFunctionExpr
+
+
+class ExecutionLimitExceeded(JloxRuntimeError):
+    """
+    A script ran out of fuel or time. Lox code cannot catch it, so it stops
+    the script, and tells the host where it was.
+    """
+
+    def __init__(self, token: Token, msg: str, stack: list[str]) -> None:
+        # The Lox stack, innermost frame first.
+        self.stack = stack
+        super().__init__(token, "\n".join([msg, *stack]))
+
+
+class ExecutionLimits:
+    """
+    The fuel and deadline of a run. Fuel is counted in statements, charged in
+    batches where every long running script keeps passing: every iteration of
+    a loop is charged the statements in its body, and every call one plus the
+    statements of the function. Loops and functions nested in them are
+    charged for themselves. The clock is only read every clock_interval
+    charges, the deadline counts from when the limits were created.
+    """
+
+    def __init__(
+        self,
+        fuel: int | None = None,
+        timeout: float | None = None,
+        clock_interval: int = DEFAULT_CLOCK_INTERVAL,
+    ) -> None:
+        self.fuel = fuel if fuel is not None else math.inf
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self._clock_interval = clock_interval
+        self._until_clock = clock_interval
+        self._costs: dict[Charged, int] = {}
+
+    def charge(self, node: Charged) -> None:
+        cost = self._costs.get(node)
+        if cost is None:
+            cost = self._costs[node] = _cost(node)
+
+        self.fuel -= cost
+        if self.fuel < 0:
+            self._exceeded(node, "Ran out of fuel.")
+
+        self._until_clock -= 1
+        if self._until_clock == 0:
+            self._until_clock = self._clock_interval
+            if self.deadline is not None and time.monotonic() > self.deadline:
+                self._exceeded(node, "Ran past the deadline.")
+
+    def _exceeded(self, node: Charged, msg: str) -> None:
+        if isinstance(node, FunctionStmt):
+            token = node.name
+        elif isinstance(node, AnonymousFunctionExpr):
+            token = Token(TokenType.FUN, "fun", None, node_line(node))
+        else:
+            token = Token(TokenType.WHILE, "while", None, node_line(node))
+
+        frames = SamplingProfiler().stack(sys._getframe(1)) or ()
+        stack = [
+            f"[line {line}] in {name}" if line else f"in {name}"
+            for (_, _, name), line in reversed(frames)
+        ]
+        raise ExecutionLimitExceeded(token, msg, stack)
+
+
+def _cost(node: Charged) -> int:
+    if isinstance(node, (WhileStmt, CountingLoopStmt)):
+        return _statements([node.loop_body])
+    return 1 + _statements(node.body)
+
+
+def _statements(nodes: Iterable[Node]) -> int:
+    count = 0
+    stack = list(nodes)
+
+    while stack:
+        node = stack.pop()
+        if Stmt in type(node).__mro__:
+            count += 1
+        if not isinstance(node, Charged):
+            stack.extend(iter_children(node))
+
+    return count
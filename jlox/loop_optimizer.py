@@ -0,0 +1,365 @@
+from itertools import count
+from typing import Any, Hashable, Iterable, Iterator, Sequence
+
+from jlox.ast_utils import AstTransformer, Node, assigned_names, iter_children, walk
+from jlox.expression import (
+    AnonymousFunctionExpr,
+    BinaryExpr,
+    CachedExpr,
+    CallExpr,
+    Expr,
+    GroupingExpr,
+    LiteralExpr,
+    UnaryExpr,
+    VariableExpr,
+)
+from jlox.statement import (
+    BlockStmt,
+    ClassStmt,
+    CountingLoopStmt,
+    ExpressionStmt,
+    FunctionStmt,
+    PrintStmt,
+    ReturnStmt,
+    Stmt,
+    VarStmt,
+    WhileStmt,
+)
+from jlox.tokens import Token, TokenType
+
+# Nothing can jump into or out of the middle of a run of these statements.
+_STRAIGHT_LINE = (ExpressionStmt, PrintStmt, ReturnStmt, VarStmt)
+
+# Code in these nodes does not run where it appears in the tree, or has been
+# taken care of already.
+_DEFERRED = (AnonymousFunctionExpr, CachedExpr, ClassStmt, FunctionStmt)
+
+Occurrence = tuple[Expr, tuple[Expr, ...]]
+
+
+def optimize_loops(statements: Sequence[Stmt]) -> list[Stmt]:
+    """
+    Hoists loop invariant pure expressions out of loops, then shares pure
+    expressions repeated within straight-line runs of loop bodies. Both end up
+    as CachedExpr nodes whose cache variable is declared right before the loop
+    or the run, so the cache is reset whenever control reaches it again.
+
+    Runs before resolution, so variables are tracked by name and anything a
+    call could reassign counts as changing at every call.
+    """
+    program_assignments = assigned_names(statements)
+
+    hoisted = _InvariantHoister(program_assignments).transform_program(statements)
+    return _SubexpressionSharer(program_assignments).transform_list(hoisted)
+
+
+class _HoistedLoop(BlockStmt):
+    """
+    Cache declarations followed by the loop they belong to. Spliced into the
+    enclosing statement list when there is one, so no scope is added, except
+    at the top level, where the caches would be globals the host can see.
+    """
+
+
+class _Replacer(AstTransformer):
+    def __init__(self, replacements: dict[int, Expr]) -> None:
+        self._replacements = replacements
+
+    def transform(self, node: Any) -> Any:
+        replacement = self._replacements.get(id(node))
+        if replacement is not None:
+            return replacement
+
+        return super().transform(node)
+
+
+class _CacheAllocator:
+    def __init__(self, prefix: str, program_assignments: set[str]) -> None:
+        self._prefix = prefix
+        self._counter = count()
+        self._program_assignments = program_assignments
+
+    def cache(
+        self, candidates: Iterable[Expr], replacements: dict[int, Expr]
+    ) -> list[Stmt]:
+        """
+        Gives every group of equal candidates one cache variable, records the
+        CachedExpr replacing each candidate and returns the declarations.
+        """
+        groups: dict[Hashable, list[Expr]] = {}
+        for expr in candidates:
+            groups.setdefault(_key(expr), []).append(expr)
+
+        return self.declare(groups.values(), replacements)
+
+    def declare(
+        self, groups: Iterable[list[Expr]], replacements: dict[int, Expr]
+    ) -> list[Stmt]:
+        declarations: list[Stmt] = []
+
+        for group in groups:
+            name = Token(
+                TokenType.IDENTIFIER,
+                f"${self._prefix}{next(self._counter)}",
+                None,
+                _line(group[0]),
+            )
+            declarations.append(VarStmt(name, None))
+
+            for expr in group:
+                replacements[id(expr)] = CachedExpr(name, expr)
+
+        return declarations
+
+    def clobbered_by(self, nodes: Sequence[Node]) -> "_Clobbers":
+        return _Clobbers(nodes, self._program_assignments)
+
+
+class _Clobbers:
+    """The variables that may change while nodes run."""
+
+    def __init__(self, nodes: Sequence[Node], program_assignments: set[str]) -> None:
+        self._names = assigned_names(nodes) | _declared_names(nodes)
+        if any(isinstance(node, CallExpr) for node in walk(nodes)):
+            self._names |= program_assignments
+
+    def affect(self, expr: Expr) -> bool:
+        return not self._names.isdisjoint(_operands(expr))
+
+
+class _InvariantHoister(AstTransformer):
+    def __init__(self, program_assignments: set[str]) -> None:
+        self._caches = _CacheAllocator("licm", program_assignments)
+
+    def transform_program(self, statements: Sequence[Stmt]) -> list[Stmt]:
+        return [
+            BlockStmt(stmt.statements) if isinstance(stmt, _HoistedLoop) else stmt
+            for stmt in super().transform_list(statements)
+        ]
+
+    def transform_list(self, items: Sequence[Any]) -> list[Any]:
+        result = []
+        for item in super().transform_list(items):
+            if isinstance(item, _HoistedLoop):
+                result.extend(item.statements)
+            else:
+                result.append(item)
+
+        return result
+
+    def transformWhileStmt(self, stmt: WhileStmt) -> Stmt:
+        loop = self.generic_transform(stmt)
+        return self._hoist(loop, [loop.condition, loop.loop_body])
+
+    def transformCountingLoopStmt(self, stmt: CountingLoopStmt) -> Stmt:
+        loop = self.generic_transform(stmt)
+        return self._hoist(loop, [loop.loop_body])
+
+    def _hoist(self, loop: WhileStmt | CountingLoopStmt, regions: list[Node]) -> Stmt:
+        clobbers = self._caches.clobbered_by([loop])
+        occurrences = [
+            (expr, enclosing)
+            for expr, enclosing in _pure_subexpressions(regions)
+            if not clobbers.affect(expr)
+        ]
+
+        # Enclosing expressions of an invariant are invariant too, unless they
+        # read something that changes, so only the outermost ones are cached.
+        invariant = {id(expr) for expr, _ in occurrences}
+        invariants = [
+            expr
+            for expr, enclosing in occurrences
+            if not any(id(outer) in invariant for outer in enclosing)
+        ]
+
+        if not invariants:
+            return loop
+
+        replacements: dict[int, Expr] = {}
+        declarations = self._caches.cache(invariants, replacements)
+
+        return _HoistedLoop([*declarations, _Replacer(replacements).transform(loop)])
+
+
+class _SubexpressionSharer(AstTransformer):
+    def __init__(self, program_assignments: set[str]) -> None:
+        self._caches = _CacheAllocator("cse", program_assignments)
+        self._in_loop = False
+
+    def transform_list(self, items: Sequence[Any]) -> list[Any]:
+        items = super().transform_list(items)
+        if not self._in_loop:
+            return items
+
+        result: list[Any] = []
+        run: list[Stmt] = []
+
+        for item in items:
+            if isinstance(item, _STRAIGHT_LINE):
+                run.append(item)
+                continue
+
+            result.extend(self._share(run))
+            result.append(item)
+            run = []
+
+        result.extend(self._share(run))
+        return result
+
+    def transformWhileStmt(self, stmt: WhileStmt) -> Stmt:
+        return self._transform_scoped(stmt, in_loop=True)
+
+    def transformCountingLoopStmt(self, stmt: CountingLoopStmt) -> Stmt:
+        return self._transform_scoped(stmt, in_loop=True)
+
+    def transformFunctionStmt(self, stmt: FunctionStmt) -> Stmt:
+        return self._transform_scoped(stmt, in_loop=False)
+
+    def transformAnonymousFunctionExpr(self, expr: AnonymousFunctionExpr) -> Expr:
+        return self._transform_scoped(expr, in_loop=False)
+
+    def _transform_scoped(self, node: Node, in_loop: bool) -> Any:
+        enclosing = self._in_loop
+        self._in_loop = in_loop
+        try:
+            return self.generic_transform(node)
+        finally:
+            self._in_loop = enclosing
+
+    def _share(self, run: list[Stmt]) -> list[Stmt]:
+        live: dict[Hashable, list[Occurrence]] = {}
+        groups: list[list[Occurrence]] = []
+
+        for stmt in run:
+            clobbers = self._caches.clobbered_by([stmt])
+
+            for expr, enclosing in _pure_subexpressions([stmt]):
+                if not clobbers.affect(expr):
+                    live.setdefault(_key(expr), []).append((expr, enclosing))
+
+            for key, occurrences in list(live.items()):
+                if clobbers.affect(occurrences[0][0]):
+                    groups.append(live.pop(key))
+
+        groups.extend(live.values())
+
+        # Share the largest repeated expressions first. Occurrences inside
+        # them are computed only once already.
+        shared: list[list[Expr]] = []
+        taken: set[int] = set()
+
+        for group in sorted(groups, key=lambda g: _size(g[0][0]), reverse=True):
+            exprs = [
+                expr
+                for expr, enclosing in group
+                if not any(id(outer) in taken for outer in enclosing)
+            ]
+            if len(exprs) > 1:
+                shared.append(exprs)
+                taken.update(id(expr) for expr in exprs)
+
+        if not shared:
+            return run
+
+        replacements: dict[int, Expr] = {}
+        declarations = self._caches.declare(shared, replacements)
+
+        replacer = _Replacer(replacements)
+        return [*declarations, *(replacer.transform(stmt) for stmt in run)]
+
+
+def _pure_subexpressions(nodes: Sequence[Node]) -> Iterator[Occurrence]:
+    """
+    Every pure expression in nodes that computes something from at least one
+    variable, together with the ones enclosing it. Leaves out code that runs
+    elsewhere, like function bodies.
+    """
+    stack: list[tuple[Node, tuple[Expr, ...]]] = [
+        (node, ()) for node in reversed(nodes)
+    ]
+
+    while stack:
+        node, enclosing = stack.pop()
+
+        if isinstance(node, _DEFERRED):
+            continue
+
+        if _is_candidate(node):
+            yield node, enclosing
+            enclosing = (*enclosing, node)
+
+        stack.extend(
+            (child, enclosing) for child in reversed(list(iter_children(node)))
+        )
+
+
+def _is_candidate(node: Node) -> bool:
+    while isinstance(node, GroupingExpr):
+        node = node.expression
+
+    return (
+        isinstance(node, (BinaryExpr, UnaryExpr))
+        and _is_pure(node)
+        and bool(_operands(node))
+    )
+
+
+def _is_pure(expr: Expr) -> bool:
+    match expr:
+        case LiteralExpr() | VariableExpr() | CachedExpr():
+            return True
+        case GroupingExpr(expression=inner) | UnaryExpr(right=inner):
+            return _is_pure(inner)
+        case BinaryExpr(left=left, right=right):
+            return _is_pure(left) and _is_pure(right)
+        case _:
+            return False
+
+
+def _operands(expr: Expr) -> set[str]:
+    return {
+        node.name.lexeme
+        for node in walk([expr])
+        if isinstance(node, (VariableExpr, CachedExpr))
+    }
+
+
+def _size(expr: Expr) -> int:
+    return sum(1 for _ in walk([expr]))
+
+
+def _declared_names(nodes: Sequence[Node]) -> set[str]:
+    names = set()
+
+    for node in walk(nodes):
+        if isinstance(node, (VarStmt, FunctionStmt, ClassStmt)):
+            names.add(node.name.lexeme)
+        if isinstance(node, (FunctionStmt, AnonymousFunctionExpr)):
+            names.update(param.lexeme for param in node.params)
+
+    return names
+
+
+def _key(expr: Expr) -> Hashable:
+    """Equal keys mean the expressions compute the same thing."""
+    match expr:
+        case GroupingExpr(expression=inner):
+            return _key(inner)
+        case LiteralExpr(value=value):
+            # True == 1 in Python, but not in Lox.
+            return ("literal", type(value), value)
+        case VariableExpr(name=name) | CachedExpr(name=name):
+            return ("variable", name.lexeme)
+        case UnaryExpr(operator=operator, right=right):
+            return ("unary", operator.type, _key(right))
+        case BinaryExpr(left=left, operator=operator, right=right):
+            return ("binary", operator.type, _key(left), _key(right))
+        case _:
+            raise TypeError(f"Not a pure expression: {expr}")
+
+
+def _line(expr: Expr) -> int:
+    for node in walk([expr]):
+        if isinstance(node, VariableExpr):
+            return node.name.line
+    return 0
@@ -45,7 +45,7 @@ class LoxFunction(LoxCallable):
             env.define(param.lexeme, arg)
 
         try:
-            interpreter._executeBlock(self._declaration.body, env)
+            interpreter._execute_function_body(self._declaration, env)
         except ReturnWrapper as ret:
             if self._is_initializer:
                 return self._closure.get_at(0, this_token())
@@ -61,6 +61,18 @@ class LoxFunction(LoxCallable):
         env.define("this", instance)
         return LoxFunction(self._declaration, env, self._is_initializer)
 
+    @property
+    def declaration(self) -> FunctionStmt | AnonymousFunctionExpr:
+        return self._declaration
+
+    @property
+    def closure(self) -> Environment:
+        return self._closure
+
+    @property
+    def is_initializer(self) -> bool:
+        return self._is_initializer
+
     @property
     def arity(self) -> int:
         return len(self._declaration.params)
@@ -22,6 +22,10 @@ class LoxInstance:
 
         raise JloxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
 
+    @property
+    def kind(self) -> "LoxClass":
+        return self._kind
+
     def set(self, name: Token, value: Any) -> None:
         self._fields[name.lexeme] = value
 
@@ -1,11 +1,34 @@
 import argparse
 import sys
+from jlox import batch, bench, client, daemon, server
 from jlox.interpreter import Interpreter
 
-from jlox.scanner import Scanner
-from jlox.parser import Parser
-from jlox.resolver import Resolver
+from jlox.statement import Stmt
+from jlox.program import compile
+from jlox.pass_manager import (
+    DEFAULT_OPTIMIZATION_LEVEL,
+    OPTIMIZATION_LEVELS,
+    PASSES,
+    PassManager,
+    format_stats,
+)
+from jlox.run_stats import RunStats, format_run_stats
+from jlox.counting import CountingInterpreter, format_counts
+from jlox.coverage import Coverage, format_coverage
 from jlox.errors import JloxRuntimeError, JloxSyntaxError
+from jlox.chrome_trace import TraceRecorder
+from jlox.function_profiler import FunctionProfiler, format_profile
+from jlox.limits import ExecutionLimits
+from jlox.sampling_profiler import DEFAULT_INTERVAL, SamplingProfiler
+from jlox.snapshot import load_snapshot, save_snapshot
+from jlox.ir import liveness, lower_all, to_dot
+from jlox.type_inference import format_types, infer_types
+from jlox.type_profile import (
+    ProfileHints,
+    ProfilingInterpreter,
+    TypeProfile,
+    profile_path,
+)
 
 
 def get_args():
@@ -13,56 +36,445 @@ def get_args():
         prog="jlox", description="Interpreter for the jlox language"
     )
     parser.add_argument("script", nargs="?")
+    parser.add_argument(
+        "--no-tiering",
+        action="store_true",
+        help="never promote hot functions and loops to the compiled tier",
+    )
+    parser.add_argument(
+        "-O",
+        dest="optimization_level",
+        type=int,
+        choices=sorted(OPTIMIZATION_LEVELS),
+        default=DEFAULT_OPTIMIZATION_LEVEL,
+        help="optimization passes to run between parsing and resolution",
+    )
+    parser.add_argument(
+        "--print-after",
+        action="append",
+        choices=list(PASSES),
+        default=[],
+        metavar="PASS",
+        help="print the tree to stderr after the given pass",
+    )
+    parser.add_argument(
+        "--pass-stats",
+        action="store_true",
+        help="print the time taken and the change in node count for every pass",
+    )
+    parser.add_argument(
+        "--dump-cfg",
+        action="store_true",
+        help="print the control flow graphs of the script in Graphviz format "
+        "instead of running it",
+    )
+    parser.add_argument(
+        "--show-types",
+        action="store_true",
+        help="print the statically inferred type of every expression instead of "
+        "running the script",
+    )
+    parser.add_argument(
+        "--count",
+        action="store_true",
+        help="count the work done by the script, without tiering, and print "
+        "the counts to stderr",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="print the time taken by every phase, with token and node counts",
+    )
+    parser.add_argument(
+        "--mem-stats",
+        action="store_true",
+        help="trace memory with tracemalloc and print the peak of every phase",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="time every Lox function call, print the functions to stderr and "
+        "write a pstats file next to the script. The script runs without "
+        "optimizations, which would inline some functions",
+    )
+    parser.add_argument(
+        "--profile-out",
+        metavar="FILE",
+        help="where --profile writes its pstats file, script.prof by default",
+    )
+    parser.add_argument(
+        "--sample",
+        action="store_true",
+        help="sample the Lox stack while the script runs and write it next to "
+        "the script as collapsed stacks and as a speedscope profile",
+    )
+    parser.add_argument(
+        "--sample-interval",
+        type=float,
+        default=DEFAULT_INTERVAL * 1000,
+        metavar="MS",
+        help="milliseconds between samples",
+    )
+    parser.add_argument(
+        "--trace-out",
+        metavar="FILE",
+        help="record the calls, instantiations and top level statements of the "
+        "script as a Chrome trace that Perfetto can open",
+    )
+    parser.add_argument(
+        "--coverage",
+        action="store_true",
+        help="record which statements and branches ran and write them in LCOV "
+        "format next to the script. The script runs without optimizations",
+    )
+    parser.add_argument(
+        "--coverage-out",
+        metavar="FILE",
+        help="where --coverage writes its LCOV file, script.info by default",
+    )
+    parser.add_argument(
+        "--fuel",
+        type=int,
+        metavar="STATEMENTS",
+        help="stop the script after it has run this many statements",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        metavar="SECONDS",
+        help="stop the script once it has run this long",
+    )
+    parser.add_argument(
+        "--load-snapshot",
+        metavar="FILE",
+        help="run the script with the globals saved by --save-snapshot. Loading "
+        "a snapshot unpickles it, which can run any code, so only load files "
+        "you trust",
+    )
+    parser.add_argument(
+        "--save-snapshot",
+        metavar="FILE",
+        help="after running the script, save its globals and everything they "
+        "reference to FILE",
+    )
+    profile = parser.add_mutually_exclusive_group()
+    profile.add_argument(
+        "--record-profile",
+        action="store_true",
+        help="record a type profile to a sidecar file next to the script",
+    )
+    profile.add_argument(
+        "--use-profile",
+        action="store_true",
+        help="specialize the program up front using the recorded sidecar profile",
+    )
 
-    return parser.parse_args()
+    args = parser.parse_args()
+    check_args(parser, args)
+    return args
 
 
-def run(source: str, interpreter: Interpreter) -> None:
-    try:
-        scanner = Scanner(source)
-        tokens = scanner.scan_tokens()
+def check_args(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    """Rejects flags that would be ignored in the company of others."""
+    # Each of these runs the script its own way, or not at all.
+    modes = [
+        flag
+        for flag, given in [
+            ("--dump-cfg", args.dump_cfg),
+            ("--show-types", args.show_types),
+            ("--record-profile", args.record_profile),
+            ("--count", args.count),
+            ("--profile", args.profile),
+            ("--sample", args.sample),
+            ("--trace-out", args.trace_out is not None),
+            ("--coverage", args.coverage),
+        ]
+        if given
+    ]
+    if len(modes) > 1:
+        parser.error(f"{modes[0]} cannot be used with {modes[1]}")
 
-        parser = Parser(tokens)
-        statements = parser.parse()
+    for flag, given, mode, requested in [
+        ("--profile-out", args.profile_out is not None, "--profile", args.profile),
+        ("--coverage-out", args.coverage_out is not None, "--coverage", args.coverage),
+    ]:
+        if given and not requested:
+            parser.error(f"{flag} needs {mode}")
 
-        if not statements:
-            return
+    if not modes:
+        return
+
+    if modes[0] in ("--profile", "--coverage"):
+        for flag, given in [
+            ("--print-after", bool(args.print_after)),
+            ("--pass-stats", args.pass_stats),
+        ]:
+            if given:
+                parser.error(f"{flag} cannot be used with {modes[0]}")
+
+    # Only a plain run uses a recorded profile or snapshots, and only runs
+    # have limits.
+    ignored = [
+        ("--use-profile", args.use_profile),
+        ("--load-snapshot", args.load_snapshot is not None),
+        ("--save-snapshot", args.save_snapshot is not None),
+    ]
+    if modes[0] in ("--dump-cfg", "--show-types"):
+        ignored += [
+            ("--fuel", args.fuel is not None),
+            ("--timeout", args.timeout is not None),
+        ]
+
+    for flag, given in ignored:
+        if given:
+            parser.error(f"{flag} cannot be used with {modes[0]}")
+
+
+def run(
+    source: str,
+    interpreter: Interpreter,
+    profile: TypeProfile | None = None,
+    passes: PassManager | None = None,
+    stats: RunStats | None = None,
+    coverage: Coverage | None = None,
+) -> None:
+    if stats is None:
+        stats = RunStats()
+
+    try:
+        with stats.tracing():
+            program = compile(source, passes=passes, stats=stats)
+            if not program.statements:
+                return
 
-        resolver = Resolver(interpreter)
-        resolver.resolve(statements)
+            statements = list(program.statements)
+            if profile is not None:
+                interpreter.use_profile(ProfileHints(profile, statements))
 
-        interpreter.interpret(statements)
+            with stats.phase("interpret"):
+                if coverage is None:
+                    program.run_in(interpreter)
+                else:
+                    with coverage.recording(interpreter, statements):
+                        program.run_in(interpreter)
     except JloxRuntimeError as e:
         print(f"Runtime error: {e}")
     except JloxSyntaxError as e:
         print(f"Syntax error: {e}")
 
 
-def run_file(file: str) -> None:
-    interpreter = Interpreter()
+def measure(
+    source: str,
+    interpreter: Interpreter | None = None,
+    passes: PassManager | None = None,
+    memory: bool = False,
+) -> RunStats:
+    """Runs source like run does and returns where the time went."""
+    stats = RunStats(memory)
+    run(source, interpreter or Interpreter(), passes=passes, stats=stats)
+    return stats
 
+
+def run_file(
+    file: str,
+    tiering: bool = True,
+    record_profile: bool = False,
+    use_profile: bool = False,
+    passes: PassManager | None = None,
+    pass_stats: bool = False,
+    count: bool = False,
+    stats: RunStats | None = None,
+    profiler: FunctionProfiler | None = None,
+    profile_out: str | None = None,
+    sampler: SamplingProfiler | None = None,
+    trace_out: str | None = None,
+    coverage: Coverage | None = None,
+    coverage_out: str | None = None,
+    snapshot_in: str | None = None,
+    snapshot_out: str | None = None,
+    limits: ExecutionLimits | None = None,
+) -> None:
+    with open(file, "r") as f:
+        script = f.read()
+
+    if passes is None:
+        passes = PassManager.for_level()
+
+    try:
+        if record_profile:
+            interpreter = ProfilingInterpreter(limits=limits)
+            try:
+                run(script, interpreter, passes=passes, stats=stats)
+            finally:
+                interpreter.profile.save(profile_path(file), script, passes.pass_names)
+            return
+
+        if count:
+            interpreter = CountingInterpreter(limits=limits)
+            try:
+                run(script, interpreter, passes=passes, stats=stats)
+            finally:
+                print(format_counts(interpreter.counts), file=sys.stderr)
+            return
+
+        if profiler is not None:
+            try:
+                with profiler.profiling():
+                    interpreter = Interpreter(tiering=tiering, limits=limits)
+                    # Inlined calls would not be counted.
+                    run(script, interpreter, passes=PassManager(), stats=stats)
+            finally:
+                print(format_profile(profiler), file=sys.stderr)
+                profiler.dump_stats(profile_out or f"{file}.prof")
+            return
+
+        if sampler is not None:
+            try:
+                with sampler.sampling():
+                    interpreter = Interpreter(tiering=tiering, limits=limits)
+                    run(script, interpreter, passes=passes, stats=stats)
+            finally:
+                sampler.save_collapsed(f"{file}.collapsed")
+                sampler.save_speedscope(f"{file}.speedscope.json")
+                print(f"{sampler.samples} samples", file=sys.stderr)
+            return
+
+        if trace_out is not None:
+            interpreter = Interpreter(tiering=tiering, limits=limits)
+            recorder = TraceRecorder()
+            try:
+                with recorder.recording(interpreter):
+                    run(script, interpreter, passes=passes, stats=stats)
+            finally:
+                recorder.save(trace_out)
+            return
+
+        if coverage is not None:
+            try:
+                # Optimized code is not where the source says it is.
+                run(
+                    script,
+                    Interpreter(tiering=tiering, limits=limits),
+                    passes=PassManager(),
+                    stats=stats,
+                    coverage=coverage,
+                )
+            finally:
+                coverage.save(coverage_out or f"{file}.info")
+                print(format_coverage(coverage), file=sys.stderr)
+            return
+
+        profile = (
+            TypeProfile.load(profile_path(file), script, passes.pass_names)
+            if use_profile
+            else None
+        )
+        interpreter = (
+            load_snapshot(snapshot_in, tiering, limits=limits)
+            if snapshot_in is not None
+            else Interpreter(tiering=tiering, limits=limits)
+        )
+        run(script, interpreter, profile, passes, stats)
+        if snapshot_out is not None:
+            save_snapshot(interpreter, snapshot_out)
+    finally:
+        if pass_stats:
+            print(format_stats(passes.stats), file=sys.stderr)
+        if stats is not None:
+            print(format_run_stats(stats), file=sys.stderr)
+
+
+def compile_file(file: str, passes: PassManager | None = None) -> list[Stmt] | None:
+    """Parses, optimizes and resolves a script without running it."""
     with open(file, "r") as f:
         script = f.read()
 
-    run(script, interpreter)
+    try:
+        return list(compile(script, passes=passes).statements)
+    except JloxSyntaxError as e:
+        print(f"Syntax error: {e}")
+        return None
 
 
-def run_prompt() -> None:
+def dump_cfg(file: str, passes: PassManager | None = None) -> None:
+    statements = compile_file(file, passes)
+    if statements is None:
+        return
+
+    for cfg in lower_all(statements):
+        print(to_dot(cfg, liveness(cfg)))
+
+
+def show_types(file: str, passes: PassManager | None = None) -> None:
+    statements = compile_file(file, passes)
+    if statements is None:
+        return
+
+    print(format_types(infer_types(statements)))
+
+
+def run_prompt(passes: PassManager | None = None) -> None:
     interpreter = Interpreter(True)
     try:
         while (line := input("> ")) != "q":
-            run(line, interpreter)
+            run(line, interpreter, passes=passes)
     except (KeyboardInterrupt, EOFError):
         pass
 
 
 def main():
+    if sys.argv[1:2] == ["bench"]:
+        sys.exit(bench.main(sys.argv[2:]))
+    if sys.argv[1:2] == ["batch"]:
+        sys.exit(batch.main(sys.argv[2:]))
+    if sys.argv[1:2] == ["serve"]:
+        sys.exit(server.main(sys.argv[2:]))
+    if sys.argv[1:2] == ["daemon"]:
+        sys.exit(daemon.main(sys.argv[2:]))
+    if sys.argv[1:2] == ["client"]:
+        sys.exit(client.main(sys.argv[2:]))
+
     args = get_args()
+    passes = PassManager.for_level(args.optimization_level, args.print_after)
 
-    if args.script:
-        run_file(args.script)
+    if args.script and args.dump_cfg:
+        dump_cfg(args.script, passes)
+    elif args.script and args.show_types:
+        show_types(args.script, passes)
+    elif args.script:
+        run_file(
+            args.script,
+            tiering=not args.no_tiering,
+            record_profile=args.record_profile,
+            use_profile=args.use_profile,
+            passes=passes,
+            pass_stats=args.pass_stats,
+            count=args.count,
+            stats=(
+                RunStats(memory=args.mem_stats)
+                if args.timings or args.mem_stats
+                else None
+            ),
+            profiler=FunctionProfiler(args.script) if args.profile else None,
+            profile_out=args.profile_out,
+            sampler=(
+                SamplingProfiler(args.sample_interval / 1000, args.script)
+                if args.sample
+                else None
+            ),
+            trace_out=args.trace_out,
+            coverage=Coverage(args.script) if args.coverage else None,
+            coverage_out=args.coverage_out,
+            snapshot_in=args.load_snapshot,
+            snapshot_out=args.save_snapshot,
+            limits=(
+                ExecutionLimits(args.fuel, args.timeout)
+                if args.fuel is not None or args.timeout is not None
+                else None
+            ),
+        )
     else:
-        run_prompt()
+        run_prompt(passes)
 
 
 if __name__ == "__main__":
@@ -1,4 +1,5 @@
-from typing import Any, TYPE_CHECKING
+from typing import Any, Callable, TYPE_CHECKING
+import inspect
 import time
 
 if TYPE_CHECKING:
@@ -24,3 +25,48 @@ class AssertEqualFunc(LoxCallable):
     @property
     def arity(self) -> int:
         return 2
+
+
+class HostFunction(LoxCallable):
+    """
+    A Python function that the program embedding Lox made available to it.
+    Async functions are awaited before the script goes on.
+    """
+
+    def __init__(self, function: Callable[..., Any]) -> None:
+        self._function = function
+        self._arity = sum(
+            1
+            for param in inspect.signature(function).parameters.values()
+            if param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD)
+            and param.default is param.empty
+        )
+
+    def call(self, interpreter: "Interpreter", arguments: list[Any]) -> Any:
+        result = self._function(*arguments)
+        if inspect.isawaitable(result):
+            result = interpreter.wait(result)
+        return to_lox_value(result)
+
+    @property
+    def function(self) -> Callable[..., Any]:
+        return self._function
+
+    @property
+    def arity(self) -> int:
+        return self._arity
+
+    def __str__(self) -> str:
+        return "<native fn>"
+
+
+def to_lox_value(value: Any) -> Any:
+    """
+    Converts a value from Python to the Lox value closest to it. Lox numbers
+    are all floats, and Python functions become callable.
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    if callable(value) and not isinstance(value, LoxCallable):
+        return HostFunction(value)
+    return value
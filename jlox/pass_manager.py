@@ -0,0 +1,119 @@
+import sys
+import time
+from dataclasses import dataclass
+from typing import Callable, Collection, Sequence, TextIO
+
+from jlox.ast_printer import AstPrinter
+from jlox.ast_utils import walk
+from jlox.counting_loops import specialize_counting_loops
+from jlox.inliner import inline_calls
+from jlox.loop_optimizer import optimize_loops
+from jlox.specializer import specialize_calls
+from jlox.statement import Stmt
+
+Pass = Callable[[Sequence[Stmt]], list[Stmt]]
+
+# Every pass maps a parsed program to an equivalent one and runs before
+# resolution. The order here is the order they run in.
+PASSES: dict[str, Pass] = {
+    "counting-loops": specialize_counting_loops,
+    "inline": inline_calls,
+    "licm-cse": optimize_loops,
+    # Last, since the guards of the specialized calls refer to the function
+    # declarations, which earlier passes may still rebuild.
+    "specialize": specialize_calls,
+}
+
+OPTIMIZATION_LEVELS: dict[int, list[str]] = {
+    0: [],
+    1: ["counting-loops"],
+    2: ["counting-loops", "inline", "licm-cse", "specialize"],
+}
+
+DEFAULT_OPTIMIZATION_LEVEL = 2
+
+# Type inference runs after resolution and only annotates the program, so it
+# is not one of the passes above.
+TYPE_INFERENCE_LEVEL = 2
+
+
+@dataclass
+class PassStats:
+    name: str
+    seconds: float
+    nodes_before: int
+    nodes_after: int
+
+
+class PassManager:
+    def __init__(
+        self,
+        passes: Sequence[tuple[str, Pass]] = (),
+        print_after: Collection[str] = (),
+        dump: TextIO | None = None,
+        infer_types: bool = False,
+    ) -> None:
+        self._passes = list(passes)
+        self._print_after = set(print_after)
+        self._dump = dump
+        self.infer_types = infer_types
+        self.stats: list[PassStats] = []
+
+    @classmethod
+    def for_level(
+        cls,
+        level: int = DEFAULT_OPTIMIZATION_LEVEL,
+        print_after: Collection[str] = (),
+        dump: TextIO | None = None,
+    ) -> "PassManager":
+        passes = [(name, PASSES[name]) for name in OPTIMIZATION_LEVELS[level]]
+        return cls(passes, print_after, dump, level >= TYPE_INFERENCE_LEVEL)
+
+    @property
+    def pass_names(self) -> list[str]:
+        return [name for name, _ in self._passes]
+
+    def add_pass(self, name: str, transform: Pass) -> None:
+        self._passes.append((name, transform))
+
+    def run(self, statements: Sequence[Stmt]) -> list[Stmt]:
+        """
+        Runs the passes in order. Stats only cover the latest run, so the REPL
+        reports on the line it just ran.
+        """
+        self.stats = []
+        result = list(statements)
+
+        for name, transform in self._passes:
+            nodes_before = count_nodes(result)
+            start = time.perf_counter()
+            result = transform(result)
+            seconds = time.perf_counter() - start
+
+            self.stats.append(
+                PassStats(name, seconds, nodes_before, count_nodes(result))
+            )
+
+            if name in self._print_after:
+                dump = self._dump or sys.stderr
+                print(f";; after {name}", file=dump)
+                print(AstPrinter().print_program(result), file=dump)
+
+        return result
+
+
+def format_stats(stats: Sequence[PassStats]) -> str:
+    lines = [f"{'pass':<16} {'time (ms)':>10} {'nodes':>8} {'delta':>7}"]
+
+    for pass_stats in stats:
+        delta = pass_stats.nodes_after - pass_stats.nodes_before
+        lines.append(
+            f"{pass_stats.name:<16} {pass_stats.seconds * 1000:>10.3f} "
+            f"{pass_stats.nodes_after:>8} {delta:>+7}"
+        )
+
+    return "\n".join(lines)
+
+
+def count_nodes(statements: Sequence[Stmt]) -> int:
+    return sum(1 for _ in walk(statements))
@@ -0,0 +1,148 @@
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Mapping
+
+from jlox.expression import Expr, ExprVisitor, IfElseExpr, LogicalExpr
+from jlox.statement import IfStmt, Stmt, StmtVisitor
+from jlox.tokens import TokenType
+
+if TYPE_CHECKING:
+    from jlox.interpreter import Interpreter
+
+
+class Probes:
+    """
+    The statements of a program that have not run yet in an interpreter, and
+    the outcomes its branch conditions have not had yet, each reported once.
+
+    While any are left the interpreter runs as a probed subclass, and the
+    code its tiers compile checks the ones in it. A probe is removed from
+    compiled code when it fires, and the subclass is swapped back once all
+    have, so code that ran before pays nothing for them. Unlike hooks,
+    probes leave tiering on.
+    """
+
+    def __init__(
+        self,
+        statements: Iterable[Stmt],
+        conditions: Mapping[Expr, Iterable[bool]],
+        on_statement: Callable[[Stmt], None],
+        on_branch: Callable[[Expr, bool], None],
+    ) -> None:
+        self.statements = set(statements)
+        # The outcomes, truthy or falsy, each condition has not had yet.
+        self.conditions = {
+            condition: set(outcomes)
+            for condition, outcomes in conditions.items()
+            if outcomes
+        }
+        self._on_statement = on_statement
+        self._on_branch = on_branch
+        self._interpreter: "Interpreter | None" = None
+
+    def attach(self, interpreter: "Interpreter") -> None:
+        if interpreter._probes is not None:
+            raise ValueError("The interpreter is already probed.")
+
+        interpreter._probes = self
+        self._interpreter = interpreter
+        if self.statements or self.conditions:
+            interpreter.__class__ = probed_class(type(interpreter))
+
+    def detach(self) -> None:
+        interpreter = self._interpreter
+        if interpreter is None:
+            return
+
+        if isinstance(interpreter, ProbedInterpreter):
+            interpreter.__class__ = interpreter.unprobed
+        interpreter._probes = None
+        self._interpreter = None
+
+    def statement(self, stmt: Stmt) -> None:
+        if stmt in self.statements:
+            self.statements.remove(stmt)
+            self._on_statement(stmt)
+            self._check_done()
+
+    def branch(self, condition: Expr, value: Any) -> bool:
+        """Whether the condition had both outcomes, and needs no probe."""
+        outcomes = self.conditions.get(condition)
+        if outcomes is None:
+            return True
+
+        outcome = bool(value)
+        if outcome in outcomes:
+            outcomes.remove(outcome)
+            self._on_branch(condition, outcome)
+            if not outcomes:
+                del self.conditions[condition]
+                self._check_done()
+
+        return not outcomes
+
+    def _check_done(self) -> None:
+        interpreter = self._interpreter
+        if (
+            not self.statements
+            and not self.conditions
+            and isinstance(interpreter, ProbedInterpreter)
+        ):
+            interpreter.__class__ = interpreter.unprobed
+
+
+_probed_classes: dict[type, type] = {}
+
+
+def probed_class(cls: type["Interpreter"]) -> type["Interpreter"]:
+    probed = _probed_classes.get(cls)
+    if probed is None:
+        probed = _probed_classes.setdefault(
+            cls,
+            type(f"Probed{cls.__name__}", (ProbedInterpreter, cls), {"unprobed": cls}),
+        )
+    return probed
+
+
+class ProbedInterpreter(ExprVisitor[Any], StmtVisitor[None]):
+    """
+    Fires the probes of the interpreter it is mixed into. Firing the last
+    probe swaps the class back in the middle of these methods, so like the
+    instrumented interpreter they look up what they call first.
+    """
+
+    unprobed: type["Interpreter"]
+    _probes: Probes
+    _evaluate: Callable[[Any], Any]
+
+    def visitLogicalExpr(self, expr: LogicalExpr) -> Any:
+        left = self._evaluate(expr.left)
+        self._probes.branch(expr.left, left)
+
+        if expr.operator.type == TokenType.OR:
+            if left:
+                return left
+        elif not left:
+            return left
+
+        return self._evaluate(expr.right)
+
+    def visitIfElseExpr(self, expr: IfElseExpr) -> Any:
+        condition = self._evaluate(expr.conditional)
+        self._probes.branch(expr.conditional, condition)
+
+        if condition:
+            return self._evaluate(expr.then_expr)
+        return self._evaluate(expr.else_expr)
+
+    def visitIfStmt(self, stmt: IfStmt) -> None:
+        condition = self._evaluate(stmt.condition)
+        self._probes.branch(stmt.condition, condition)
+
+        if condition:
+            self._execute(stmt.then_branch)
+        elif stmt.else_branch:
+            self._execute(stmt.else_branch)
+
+    def _execute(self, stmt: Stmt):
+        execute = super()._execute  # type: ignore[misc]
+        self._probes.statement(stmt)
+        execute(stmt)
@@ -0,0 +1,141 @@
+from dataclasses import dataclass
+from functools import cached_property
+from types import MappingProxyType
+from typing import Any, Callable, Mapping, TextIO
+
+from jlox.ast_utils import Node
+from jlox.expression import Expr
+from jlox.interpreter import Interpreter
+from jlox.limits import ExecutionLimits
+from jlox.native_functions import to_lox_value
+from jlox.parser import Parser
+from jlox.pass_manager import DEFAULT_OPTIMIZATION_LEVEL, PassManager, count_nodes
+from jlox.resolver import Resolver
+from jlox.run_stats import RunStats
+from jlox.scanner import Scanner
+from jlox.statement import Stmt
+from jlox.type_inference import infer_types
+
+
+@dataclass(frozen=True)
+class Program:
+    """
+    A script that has been parsed, optimized and resolved, ready to be run any
+    number of times. Runs share nothing but the program, which they only read,
+    so one program can be run from many threads at once without any locking.
+    """
+
+    statements: tuple[Stmt, ...]
+    # How many scopes up every resolved variable is, which the resolver would
+    # otherwise have written into the interpreter.
+    locals: Mapping[Expr, int]
+    unchecked_operations: Mapping[Expr, Callable[..., Any]]
+
+    def run(
+        self,
+        globals: Mapping[str, Any] | None = None,
+        stdout: TextIO | None = None,
+        tiering: bool = True,
+        limits: ExecutionLimits | None = None,
+    ) -> dict[str, Any]:
+        """
+        Runs the program in a fresh interpreter, with the given host values
+        defined as globals and printing to stdout. Returns the globals as the
+        program left them. Errors are raised as JloxRuntimeError, running out
+        of the limits as ExecutionLimitExceeded.
+        """
+        interpreter = Interpreter(
+            tiering=tiering, stdout=stdout, program=self, limits=limits
+        )
+        self._define(interpreter, globals)
+
+        interpreter.interpret(list(self.statements))
+        return dict(interpreter.globals._values)
+
+    def run_in(self, interpreter: Interpreter) -> None:
+        """
+        Runs the program in an interpreter the caller made, like a profiling
+        one, or one that keeps the globals of what it ran before, like the
+        REPL's. Errors are raised as they are by run.
+        """
+        interpreter.use_program(self)
+        interpreter.interpret(list(self.statements))
+
+    async def run_async(
+        self,
+        globals: Mapping[str, Any] | None = None,
+        stdout: TextIO | None = None,
+        tiering: bool = True,
+        limits: ExecutionLimits | None = None,
+    ) -> dict[str, Any]:
+        """
+        Like run, but as a coroutine of the running event loop, which
+        suspends the script whenever it awaits an async host function, and
+        runs other scripts and tasks in the meantime.
+        """
+        # Only scripts that embed Lox in asyncio need it loaded.
+        from jlox.async_interpreter import AsyncInterpreter
+
+        interpreter = AsyncInterpreter(
+            tiering=tiering, stdout=stdout, program=self, limits=limits
+        )
+        self._define(interpreter, globals)
+
+        await interpreter.interpret_async(list(self.statements), self.suspending)
+        return dict(interpreter.globals._values)
+
+    @cached_property
+    def suspending(self) -> frozenset[Node]:
+        """The nodes that can suspend an async run, found once per program."""
+        from jlox.async_interpreter import suspending_nodes
+
+        return suspending_nodes(self.statements)
+
+    @staticmethod
+    def _define(interpreter: Interpreter, globals: Mapping[str, Any] | None) -> None:
+        for name, value in (globals or {}).items():
+            interpreter.globals.define(name, to_lox_value(value))
+
+
+def compile(
+    source: str,
+    level: int = DEFAULT_OPTIMIZATION_LEVEL,
+    passes: PassManager | None = None,
+    stats: RunStats | None = None,
+) -> Program:
+    """
+    Compiles a script into a Program, raising JloxSyntaxError if it is invalid.
+    Passes, when given, are run instead of those of the level. Stats, when
+    given, are told how long every phase took.
+    """
+    if passes is None:
+        passes = PassManager.for_level(level)
+    if stats is None:
+        stats = RunStats()
+
+    with stats.phase("scan"):
+        tokens = Scanner(source).scan_tokens()
+    stats.tokens = len(tokens)
+
+    with stats.phase("parse"):
+        statements = Parser(tokens).parse()
+    stats.nodes = count_nodes(statements)
+
+    with stats.phase("optimize"):
+        statements = passes.run(statements)
+
+    # The resolver reports to an interpreter, which only collects what it says.
+    resolution = Interpreter(tiering=False)
+    with stats.phase("resolve"):
+        Resolver(resolution).resolve(statements)
+
+    unchecked: Mapping[Expr, Callable[..., Any]] = {}
+    if passes.infer_types:
+        with stats.phase("infer-types"):
+            unchecked = infer_types(statements).unchecked_operations()
+
+    return Program(
+        tuple(statements),
+        MappingProxyType(dict(resolution._locals)),
+        MappingProxyType(dict(unchecked)),
+    )
@@ -0,0 +1,81 @@
+import json
+import socket
+from pathlib import Path
+from typing import Any
+
+# The protocol the server and the daemon speak, kept apart from the
+# interpreter so that clients start without importing it.
+
+# Exit statuses of scripts, the ones jlox has always used for these errors.
+SYNTAX_ERROR_STATUS = 65
+RUNTIME_ERROR_STATUS = 70
+# The status sysexits.h has for a malformed request.
+PROTOCOL_ERROR_STATUS = 76
+
+Message = dict[str, Any]
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def send_message(connection: socket.socket, message: Message) -> None:
+    """Messages are JSON objects, one per line."""
+    connection.sendall(json.dumps(message).encode() + b"\n")
+
+
+def receive_message(connection: socket.socket) -> Message | None:
+    """The next message, or None if the other side closed the connection."""
+    data = bytearray()
+
+    while not data.endswith(b"\n"):
+        chunk = connection.recv(65536)
+        if not chunk:
+            return None
+        data += chunk
+
+    try:
+        message = json.loads(data)
+    except ValueError as e:
+        raise ProtocolError(f"Messages must be JSON: {e}") from e
+    if not isinstance(message, dict):
+        raise ProtocolError("Messages must be JSON objects.")
+
+    return message
+
+
+def check_request(message: Message) -> None:
+    """Requests carry the source of a script, or the path of one."""
+    if "source" in message:
+        if not isinstance(message["source"], str):
+            raise ProtocolError("The source of a script must be a string.")
+    elif not isinstance(message.get("path"), str):
+        raise ProtocolError("Requests must carry the source or the path of a script.")
+
+
+def protocol_error(error: ProtocolError) -> Message:
+    return {
+        "output": "",
+        "error": f"Protocol error: {error}",
+        "status": PROTOCOL_ERROR_STATUS,
+    }
+
+
+def request(path: str | Path, message: Message) -> Message:
+    """Sends one request to the server listening at path and returns its reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(str(path))
+        send_message(connection, message)
+        reply = receive_message(connection)
+
+    if reply is None:
+        raise ConnectionError(f"{path} closed the connection without replying")
+    return reply
+
+
+def listen(path: str | Path) -> socket.socket:
+    Path(path).unlink(missing_ok=True)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(str(path))
+    server.listen()
+    return server
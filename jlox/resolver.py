@@ -2,6 +2,7 @@ from typing import Any, Sequence
 from jlox.expression import (
     AssignExpr,
     BinaryExpr,
+    CachedExpr,
     CallExpr,
     CommaExpr,
     Expr,
@@ -17,11 +18,14 @@ from jlox.expression import (
     GetExpr,
     IfElseExpr,
     AnonymousFunctionExpr,
+    InlinedCallExpr,
+    InlinedGetterExpr,
 )
 from jlox.interpreter import Interpreter
 from jlox.lox_function import FunctionType
 from jlox.statement import (
     BreakStmt,
+    CountingLoopStmt,
     ClassStmt,
     FunctionStmt,
     ReturnStmt,
@@ -131,6 +135,17 @@ class Resolver(StmtVisitor[None], ExprVisitor[Any]):
     def visitAnonymousFunctionExpr(self, expr: "AnonymousFunctionExpr") -> None:
         self._resolve_function(expr, FunctionType.FUNCTION)
 
+    def visitCachedExpr(self, expr: "CachedExpr") -> None:
+        self._resolve_expr(expr.expression)
+        self._resolve_local(expr, expr.name)
+
+    def visitInlinedCallExpr(self, expr: "InlinedCallExpr") -> None:
+        self._resolve_expr(expr.call)
+        self._resolve_expr(expr.body)
+
+    def visitInlinedGetterExpr(self, expr: "InlinedGetterExpr") -> None:
+        self._resolve_expr(expr.call)
+
     def visitPrintStmt(self, stmt: "PrintStmt") -> None:
         self._resolve_expr(stmt.expression)
 
@@ -217,6 +232,14 @@ class Resolver(StmtVisitor[None], ExprVisitor[Any]):
     def visitBreakStmt(self, stmt: "BreakStmt") -> None:
         pass
 
+    def visitCountingLoopStmt(self, stmt: "CountingLoopStmt") -> None:
+        self._begin_scope()
+        self._resolve_stmts([stmt.initializer])
+        self._resolve_expr(stmt.condition)
+        self._resolve_stmts([stmt.loop_body])
+        self._resolve_expr(stmt.increment)
+        self._end_scope()
+
     def _resolve_stmts(self, stmts: Sequence[Stmt]) -> None:
         for stmt in stmts:
             stmt.accept(self)
@@ -0,0 +1,95 @@
+import time
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+
+
+@dataclass
+class PhaseStats:
+    name: str
+    seconds: float
+    # Highest memory traced during the phase, in bytes. None when memory was
+    # not traced.
+    peak_memory: int | None = None
+
+
+@dataclass
+class RunStats:
+    """
+    Where the time and memory of a run went, phase by phase. With memory set,
+    tracemalloc traces the run, which makes it several times slower.
+    """
+
+    memory: bool = False
+    phases: list[PhaseStats] = field(default_factory=list)
+    tokens: int = 0
+    nodes: int = 0
+
+    @property
+    def seconds(self) -> float:
+        return sum(phase.seconds for phase in self.phases)
+
+    def phase_stats(self, name: str) -> PhaseStats | None:
+        for phase in self.phases:
+            if phase.name == name:
+                return phase
+        return None
+
+    @contextmanager
+    def tracing(self) -> Iterator[None]:
+        """Traces memory allocations for the phases run inside it."""
+        start = self.memory and not tracemalloc.is_tracing()
+        if start:
+            tracemalloc.start()
+
+        try:
+            yield
+        finally:
+            if start:
+                tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1] if tracing else None
+            self.phases.append(PhaseStats(name, seconds, peak))
+
+
+def format_run_stats(stats: RunStats) -> str:
+    header = f"{'phase':<12} {'time (ms)':>10}"
+    if stats.memory:
+        header += f" {'peak memory':>12}"
+    lines = [header]
+
+    for phase in stats.phases:
+        line = f"{phase.name:<12} {phase.seconds * 1000:>10.3f}"
+        if phase.peak_memory is not None:
+            line += f" {_format_bytes(phase.peak_memory):>12}"
+        lines.append(line)
+
+    lines.append(f"{'total':<12} {stats.seconds * 1000:>10.3f}")
+    lines.append(f"{stats.tokens} tokens, {stats.nodes} AST nodes")
+
+    return "\n".join(lines)
+
+
+def _format_bytes(size: int) -> str:
+    if size < 1024:
+        return f"{size} B"
+
+    value = size / 1024
+    for unit in ("KiB", "MiB"):
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+
+    return f"{value:.1f} GiB"
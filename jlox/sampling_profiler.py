@@ -0,0 +1,258 @@
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any, Iterator
+
+from jlox.ast_utils import node_line
+from jlox.async_interpreter import AsyncInterpreter
+from jlox.compiler import ClosureCompiler
+from jlox.expression import Expr
+from jlox.function_profiler import (
+    NATIVE_FILE,
+    FunctionKey,
+    callable_classes,
+    function_key,
+)
+from jlox.interpreter import Interpreter
+from jlox.lox_callable import LoxCallable
+from jlox.lox_function import LoxFunction
+from jlox.statement import Stmt
+from jlox.tokens import Token
+
+DEFAULT_INTERVAL = 0.005
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+# Lox frames from the outermost in, as the function and the line it is at.
+# The line is None where it is not known.
+Stack = tuple[tuple[FunctionKey, int | None], ...]
+
+_INTERPRETER_FILE = Interpreter.interpret.__code__.co_filename
+_COMPILER_FILE = ClosureCompiler.compile_stmt.__code__.co_filename
+_ASYNC_FILE = AsyncInterpreter.interpret_async.__code__.co_filename
+
+# Python frames that know which line of Lox they are running, with the local
+# that tells. Calls from compiled code only know the line of the call.
+_LINE_SOURCES = {
+    (_INTERPRETER_FILE, "_execute"): "stmt",
+    (_INTERPRETER_FILE, "_invoke"): "expr",
+    (_COMPILER_FILE, "invoke"): "paren",
+    (_ASYNC_FILE, "_exec"): "stmt",
+    (_ASYNC_FILE, "_call"): "expr",
+}
+
+_CALL = "call"
+# The async interpreter calls Lox functions without their call method.
+_ASYNC_CALL = "async call"
+_SCRIPT = "script"
+_UNKNOWN = object()
+
+
+@dataclass
+class StackSamples:
+    count: int = 0
+    # Wall time between the samples, which is longer than the interval when
+    # the interpreter held on to the GIL.
+    seconds: float = 0.0
+
+
+class SamplingProfiler:
+    """
+    Samples the Lox stack of the thread that runs the script from a background
+    thread. The interpreter itself is left alone, the stack is read off the
+    Python frames, so the only cost is the sampler taking the GIL once every
+    interval.
+    """
+
+    def __init__(
+        self, interval: float = DEFAULT_INTERVAL, filename: str = "<script>"
+    ) -> None:
+        self.interval = interval
+        self.filename = filename
+        # Samples are added up per stack, so a long run takes bounded memory.
+        self.stacks: dict[Stack, StackSamples] = {}
+        self._script: FunctionKey = (filename, 0, "<script>")
+        self._keys: dict[Any, FunctionKey] = {}
+        self._lines: dict[Any, int | None] = {}
+        # What every Python function seen on the stack means for the Lox one.
+        self._roles: dict[CodeType, str | None] = {}
+
+    @property
+    def samples(self) -> int:
+        return sum(samples.count for samples in self.stacks.values())
+
+    @contextmanager
+    def sampling(self) -> Iterator[None]:
+        """Samples the calling thread while it is active."""
+        stop = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample_until,
+            args=(threading.get_ident(), stop),
+            name="jlox-sampler",
+            daemon=True,
+        )
+        sampler.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            sampler.join()
+
+    def collapsed(self) -> str:
+        """The stacks in the collapsed format that flamegraph.pl reads."""
+        lines = [
+            ";".join(_label(key, line) for key, line in stack) + f" {samples.count}"
+            for stack, samples in self._by_count()
+        ]
+        return "".join(line + "\n" for line in lines)
+
+    def speedscope(self) -> dict[str, Any]:
+        frames: list[dict[str, Any]] = []
+        indices: dict[tuple[FunctionKey, int | None], int] = {}
+        samples = []
+        weights = []
+
+        for stack, stack_samples in self._by_count():
+            for frame in stack:
+                if frame not in indices:
+                    indices[frame] = len(frames)
+                    frames.append(_speedscope_frame(*frame))
+            samples.append([indices[frame] for frame in stack])
+            weights.append(stack_samples.seconds)
+
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "name": self.filename,
+            "exporter": "jlox",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": self.filename,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+    def save_collapsed(self, path: str | Path) -> None:
+        Path(path).write_text(self.collapsed())
+
+    def save_speedscope(self, path: str | Path) -> None:
+        Path(path).write_text(json.dumps(self.speedscope()) + "\n")
+
+    def _by_count(self) -> list[tuple[Stack, StackSamples]]:
+        return sorted(self.stacks.items(), key=lambda item: -item[1].count)
+
+    def _sample_until(self, thread_id: int, stop: threading.Event) -> None:
+        last = time.perf_counter()
+
+        while not stop.wait(self.interval):
+            frame = sys._current_frames().get(thread_id)
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+
+            stack = self._lox_stack(frame) if frame is not None else None
+            if stack is None:
+                continue
+
+            samples = self.stacks.get(stack)
+            if samples is None:
+                samples = self.stacks[stack] = StackSamples()
+            samples.count += 1
+            samples.seconds += elapsed
+
+    def stack(self, frame: FrameType) -> Stack | None:
+        """The Lox stack at a Python frame, None outside of a script."""
+        return self._lox_stack(frame)
+
+    def _lox_stack(self, frame: FrameType | None) -> Stack | None:
+        """None when the thread is not running Lox code."""
+        stack = []
+        line = None
+        roles = self._roles
+
+        while frame is not None:
+            code = frame.f_code
+            role = roles.get(code, _UNKNOWN)
+            if role is _UNKNOWN:
+                role = roles[code] = _role(code)
+
+            if role is None:
+                pass
+            elif role == _CALL:
+                stack.append(self._frame(frame.f_locals["self"], line))
+                line = None
+            elif role == _ASYNC_CALL:
+                stack.append(self._frame(frame.f_locals["function"], line))
+                line = None
+            elif role == _SCRIPT:
+                stack.append((self._script, line))
+                stack.reverse()
+                return tuple(stack)
+            elif line is None:
+                line = self._line(frame.f_locals.get(role))
+
+            frame = frame.f_back
+
+        return None
+
+    def _frame(
+        self, callee: LoxCallable, line: int | None
+    ) -> tuple[FunctionKey, int | None]:
+        if not isinstance(callee, LoxFunction):
+            return function_key(callee, self.filename), None
+
+        key = self._keys.get(callee.declaration)
+        if key is None:
+            key = self._keys[callee.declaration] = function_key(callee, self.filename)
+
+        # Compiled code that is not calling anything has no line to tell, the
+        # function is all that is known.
+        return key, line if line is not None else key[1]
+
+    def _line(self, value: Token | Expr | Stmt | None) -> int | None:
+        if value is None:
+            return None
+        if isinstance(value, Token):
+            return value.line
+
+        if value not in self._lines:
+            self._lines[value] = node_line(value) or None
+        return self._lines[value]
+
+
+def _role(code: CodeType) -> str | None:
+    if code in (Interpreter.interpret.__code__, AsyncInterpreter._interpret.__code__):
+        return _SCRIPT
+    if code is AsyncInterpreter._call_function.__code__:
+        return _ASYNC_CALL
+    if code.co_name == "call" and any(
+        getattr(cls.__dict__.get("call"), "__code__", None) is code
+        for cls in callable_classes()
+    ):
+        return _CALL
+    return _LINE_SOURCES.get((code.co_filename, code.co_name))
+
+
+def _label(key: FunctionKey, line: int | None) -> str:
+    name = key[2]
+    return name if line is None else f"{name}:{line}"
+
+
+def _speedscope_frame(key: FunctionKey, line: int | None) -> dict[str, Any]:
+    file, _, name = key
+    frame: dict[str, Any] = {"name": _label(key, line)}
+    if file != NATIVE_FILE:
+        frame["file"] = file
+    if line is not None:
+        frame["line"] = line
+    return frame
@@ -0,0 +1,223 @@
+import argparse
+import gc
+import io
+import os
+import socket
+import sys
+from pathlib import Path
+from typing import Sequence
+
+from jlox.errors import JloxRuntimeError, JloxSyntaxError
+from jlox.interpreter import Interpreter
+from jlox.pass_manager import DEFAULT_OPTIMIZATION_LEVEL, OPTIMIZATION_LEVELS
+from jlox.program import Program, compile
+from jlox.protocol import (
+    RUNTIME_ERROR_STATUS,
+    SYNTAX_ERROR_STATUS,
+    Message,
+    ProtocolError,
+    check_request,
+    listen,
+    protocol_error,
+    receive_message,
+    send_message,
+)
+
+
+def execute(program: Program, interpreter: Interpreter) -> Message:
+    """
+    Runs a compiled script and replies with what it printed, the error it
+    stopped on and its exit status.
+    """
+    output = io.StringIO()
+    interpreter.stdout = output
+
+    try:
+        program.run_in(interpreter)
+    except JloxRuntimeError as e:
+        return _reply(output, f"Runtime error: {e}", RUNTIME_ERROR_STATUS)
+    except JloxSyntaxError as e:
+        return _reply(output, f"Syntax error: {e}", SYNTAX_ERROR_STATUS)
+    except Exception as e:
+        # Errors of the interpreter itself, like dividing by zero, only fail
+        # the one script.
+        return _reply(output, f"{type(e).__name__}: {e}", 1)
+    finally:
+        interpreter.stdout = None
+
+    return _reply(output)
+
+
+def syntax_error(error: JloxSyntaxError) -> Message:
+    return _reply(io.StringIO(), f"Syntax error: {error}", SYNTAX_ERROR_STATUS)
+
+
+def _reply(output: io.StringIO, error: str | None = None, status: int = 0) -> Message:
+    return {"output": output.getvalue(), "error": error, "status": status}
+
+
+def read_source(message: Message) -> str:
+    """Requests carry the source of a script, or the path of one."""
+    check_request(message)
+    if "source" in message:
+        return message["source"]
+    return Path(message["path"]).read_text()
+
+
+class ForkServer:
+    """
+    Runs scripts sent to a Unix socket, each in a child forked from a template
+    interpreter that has already run the prelude. Children start with every
+    module imported and the prelude defined, and share the memory holding
+    them with the server until they write to it.
+
+    Without forking, scripts run one after the other in the server, each in
+    a fresh interpreter that runs the prelude first.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        prelude: str = "",
+        level: int = DEFAULT_OPTIMIZATION_LEVEL,
+        tiering: bool = True,
+        fork: bool = True,
+    ) -> None:
+        self.path = Path(path)
+        self._level = level
+        self._tiering = tiering
+        self._fork = fork
+        self._prelude = compile(prelude, level)
+
+        self._template = self._prepare()
+        if fork:
+            # Objects the collector never moves to another generation keep
+            # the pages holding them shared with the children.
+            gc.freeze()
+
+        self._socket = listen(self.path)
+
+    def serve_forever(self) -> None:
+        while True:
+            connection, _ = self._socket.accept()
+            with connection:
+                if self._fork:
+                    self._fork_child(connection)
+                else:
+                    self._serve(connection, self._prepare())
+            self._reap()
+
+    def close(self) -> None:
+        self._socket.close()
+        self.path.unlink(missing_ok=True)
+
+    def _prepare(self) -> Interpreter:
+        interpreter = Interpreter(tiering=self._tiering)
+        reply = execute(self._prelude, interpreter)
+        if reply["error"] is not None:
+            raise RuntimeError(f"The prelude failed. {reply['error']}")
+        return interpreter
+
+    def _fork_child(self, connection: socket.socket) -> None:
+        if os.fork() != 0:
+            return
+
+        try:
+            self._socket.close()
+            self._serve(connection, self._template)
+        finally:
+            os._exit(0)
+
+    def _serve(self, connection: socket.socket, interpreter: Interpreter) -> None:
+        try:
+            message = receive_message(connection)
+            if message is None:
+                return
+            reply = self._run(message, interpreter)
+        except ProtocolError as e:
+            reply = protocol_error(e)
+
+        try:
+            send_message(connection, reply)
+        except ConnectionError:
+            # The client hung up, which costs it the reply and nothing else.
+            pass
+
+    def _run(self, message: Message, interpreter: Interpreter) -> Message:
+        try:
+            program = compile(read_source(message), self._level)
+        except JloxSyntaxError as e:
+            return syntax_error(e)
+        except ProtocolError:
+            raise
+        except Exception as e:
+            # Missing scripts, and whatever else goes wrong, only fail the one
+            # request.
+            return _reply(io.StringIO(), f"{type(e).__name__}: {e}", 1)
+
+        return execute(program, interpreter)
+
+    def _reap(self) -> None:
+        while self._fork:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+
+def get_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="jlox serve", description="Run Lox scripts sent to a Unix socket"
+    )
+    parser.add_argument("socket", type=Path, help="path of the socket to listen on")
+    parser.add_argument(
+        "--fork",
+        action="store_true",
+        help="run every script in a child forked from an interpreter that has "
+        "already run the prelude",
+    )
+    parser.add_argument(
+        "--prelude",
+        type=Path,
+        help="a script defining what every script can use",
+    )
+    parser.add_argument(
+        "-O",
+        dest="optimization_level",
+        type=int,
+        choices=sorted(OPTIMIZATION_LEVELS),
+        default=DEFAULT_OPTIMIZATION_LEVEL,
+    )
+    parser.add_argument("--no-tiering", action="store_true")
+
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    args = get_args(argv)
+    # Import everything a script could need before the first child is forked.
+    import jlox.main  # noqa: F401
+
+    server = ForkServer(
+        args.socket,
+        args.prelude.read_text() if args.prelude else "",
+        args.optimization_level,
+        not args.no_tiering,
+        args.fork,
+    )
+    print(f"Listening on {args.socket}", file=sys.stderr)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import io
+import pickle
+from pathlib import Path
+from typing import Any, TextIO
+
+from jlox.environment import Environment
+from jlox.interpreter import Interpreter
+from jlox.limits import ExecutionLimits
+from jlox.lox_class import LoxClass
+from jlox.lox_function import LoxFunction
+from jlox.lox_instance import LoxInstance
+
+# Bumped whenever the classes a snapshot holds change shape.
+SNAPSHOT_VERSION = 2
+
+# What Lox values are made of, and what links them into chains as long as the
+# program makes them: instances through their fields, environments through
+# the ones enclosing them. Pickle would recurse into every link, so each of
+# these is written as a record of its own, and referred to by number.
+_LINKED = (Environment, LoxInstance, LoxFunction, LoxClass)
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class _Pickler(pickle.Pickler):
+    def __init__(self, file: io.BytesIO, objects: list[Any]) -> None:
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self._numbers = {id(obj): number for number, obj in enumerate(objects)}
+
+    def persistent_id(self, obj: Any) -> int | None:
+        return self._numbers.get(id(obj)) if type(obj) in _LINKED else None
+
+
+class _Unpickler(pickle.Unpickler):
+    def __init__(self, file: io.BytesIO) -> None:
+        super().__init__(file)
+        self.objects: list[Any] = []
+
+    def persistent_load(self, pid: int) -> Any:
+        return self.objects[pid]
+
+
+def save_snapshot(interpreter: Interpreter, path: str | Path) -> None:
+    """
+    Writes the globals of an interpreter that is not running, and everything
+    they reference, to path: functions with their closures and declarations,
+    classes, instances, and the resolution of the code they hold. Compiled
+    code is left out, the tiers of the restored interpreter compile it again.
+    """
+    objects = _linked_objects(interpreter.globals)
+    data = io.BytesIO()
+    pickler = _Pickler(data, objects)
+
+    try:
+        pickler.dump(SNAPSHOT_VERSION)
+        # The objects are created before their attributes are read, so that
+        # the attributes can refer to any of them.
+        pickler.dump([type(obj) for obj in objects])
+        pickler.dump(
+            {
+                "objects": [vars(obj) for obj in objects],
+                "globals": interpreter.globals,
+                "locals": dict(interpreter._locals),
+                "unchecked_operations": dict(interpreter._unchecked_operations),
+            }
+        )
+    except (pickle.PicklingError, TypeError, AttributeError, RecursionError) as e:
+        # Host functions and other Python objects put in the globals.
+        raise SnapshotError(f"Cannot snapshot the globals: {e}") from e
+
+    Path(path).write_bytes(data.getvalue())
+
+
+def load_snapshot(
+    path: str | Path,
+    tiering: bool = True,
+    stdout: TextIO | None = None,
+    limits: ExecutionLimits | None = None,
+) -> Interpreter:
+    """
+    A new interpreter with the globals a snapshot was taken of. Snapshots are
+    pickles, and loading one runs whatever code it names, so only load
+    snapshots from a source you trust.
+    """
+    unpickler = _Unpickler(io.BytesIO(Path(path).read_bytes()))
+    if unpickler.load() != SNAPSHOT_VERSION:
+        raise SnapshotError(f"{path} is not a snapshot this version of jlox wrote")
+
+    unpickler.objects = [cls.__new__(cls) for cls in unpickler.load()]
+    state = unpickler.load()
+    for obj, attributes in zip(unpickler.objects, state["objects"]):
+        vars(obj).update(attributes)
+
+    interpreter = Interpreter(tiering=tiering, stdout=stdout, limits=limits)
+    interpreter._globals = interpreter._environment = state["globals"]
+    interpreter._locals.update(state["locals"])
+    interpreter._unchecked_operations.update(state["unchecked_operations"])
+    return interpreter
+
+
+def _linked_objects(root: Environment) -> list[Any]:
+    """Every Lox value and environment reachable from root, found by a loop."""
+    found: dict[int, Any] = {}
+    stack: list[Any] = [root]
+
+    while stack:
+        value = stack.pop()
+        kind = type(value)
+        if kind in _LINKED:
+            if id(value) not in found:
+                found[id(value)] = value
+                stack.extend(vars(value).values())
+        elif kind is dict:
+            stack.extend(value.values())
+        elif kind in (list, tuple):
+            stack.extend(value)
+
+    return list(found.values())
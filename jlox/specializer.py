@@ -0,0 +1,353 @@
+from dataclasses import replace
+from typing import Any, Sequence
+
+from jlox.ast_utils import AstTransformer, Node, walk
+from jlox.errors import JloxRuntimeError
+from jlox.expression import (
+    AnonymousFunctionExpr,
+    AssignExpr,
+    BinaryExpr,
+    CallExpr,
+    Expr,
+    GroupingExpr,
+    IfElseExpr,
+    InlinedCallExpr,
+    InlinedGetterExpr,
+    LiteralExpr,
+    LogicalExpr,
+    UnaryExpr,
+    VariableExpr,
+)
+from jlox.interpreter import Interpreter
+from jlox.statement import (
+    BlockStmt,
+    BreakStmt,
+    ClassStmt,
+    FunctionStmt,
+    IfStmt,
+    ReturnStmt,
+    Stmt,
+    VarStmt,
+    WhileStmt,
+)
+from jlox.tokens import Token, TokenType
+
+# Every constant argument pattern gets a clone of its own, so a function called
+# with many different constants would otherwise grow the program without bound.
+MAX_CLONES_PER_FUNCTION = 8
+
+Signature = tuple[tuple[int, type, Any], ...]
+
+
+def specialize_calls(statements: Sequence[Stmt]) -> list[Stmt]:
+    """
+    Clones global functions for calls that pass them constant arguments, with
+    the constants substituted for the parameters and the clone folded. The
+    calls go through InlinedCallExpr, so they only use the clone while the
+    callee is still the function it was made from.
+    """
+    functions = _specializable_functions(statements)
+    if not functions:
+        return list(statements)
+
+    specializer = _Specializer(functions)
+    transformed = specializer.transform_list(statements)
+
+    # Calls in the body of a function change its node, the guards have to
+    # refer to the one that ends up in the program.
+    final = {}
+    result: list[Stmt] = []
+
+    for original, stmt in zip(statements, transformed):
+        result.append(stmt)
+        if isinstance(original, FunctionStmt) and original.name.lexeme in functions:
+            final[original.name.lexeme] = stmt
+            result.extend(specializer.clones_of(original.name.lexeme))
+
+    for name, call in specializer.guarded_calls:
+        call.declaration = final[name]
+
+    return result
+
+
+def fold_constants(statements: Sequence[Stmt]) -> list[Stmt]:
+    """
+    Evaluates operators on literals and drops the branches that literal
+    conditions never take.
+    """
+    return _Folder().transform_list(statements)
+
+
+def _specializable_functions(
+    statements: Sequence[Stmt],
+) -> dict[str, tuple[FunctionStmt, set[int]]]:
+    """
+    Global functions declared once and never assigned or shadowed, with the
+    positions of the parameters that their body neither assigns nor redeclares.
+    """
+    seen: set[str] = set()
+    unstable: set[str] = set()
+
+    for node in walk(statements):
+        match node:
+            case VarStmt(name=name) | FunctionStmt(name=name) | ClassStmt(name=name):
+                if name.lexeme in seen:
+                    unstable.add(name.lexeme)
+                seen.add(name.lexeme)
+            case AssignExpr(name=name):
+                unstable.add(name.lexeme)
+        if isinstance(node, (FunctionStmt, AnonymousFunctionExpr)):
+            unstable.update(param.lexeme for param in node.params)
+
+    functions = {}
+
+    for stmt in statements:
+        if not isinstance(stmt, FunctionStmt) or stmt.name.lexeme in unstable:
+            continue
+
+        rebound = _rebound_names(stmt.body)
+        params = [param.lexeme for param in stmt.params]
+        constant = {
+            index
+            for index, param in enumerate(params)
+            if param not in rebound and params.count(param) == 1
+        }
+
+        if constant:
+            functions[stmt.name.lexeme] = (stmt, constant)
+
+    return functions
+
+
+def _rebound_names(body: Sequence[Stmt]) -> set[str]:
+    names = set()
+
+    for node in walk(body):
+        match node:
+            case VarStmt(name=name) | FunctionStmt(name=name) | ClassStmt(name=name):
+                names.add(name.lexeme)
+            case AssignExpr(name=name):
+                names.add(name.lexeme)
+        if isinstance(node, (FunctionStmt, AnonymousFunctionExpr)):
+            names.update(param.lexeme for param in node.params)
+
+    return names
+
+
+def _always_exits(stmt: Stmt) -> bool:
+    match stmt:
+        case ReturnStmt() | BreakStmt():
+            return True
+        case BlockStmt(statements=[*_, last]):
+            return _always_exits(last)
+        case _:
+            return False
+
+
+def _size(nodes: Sequence[Node]) -> int:
+    return sum(1 for _ in walk(nodes))
+
+
+class _Specializer(AstTransformer):
+    def __init__(self, functions: dict[str, tuple[FunctionStmt, set[int]]]) -> None:
+        self._functions = functions
+        self._folder = _Folder()
+        # None marks signatures whose clone would not have been any smaller.
+        self._clones: dict[str, dict[Signature, FunctionStmt | None]] = {}
+        self.guarded_calls: list[tuple[str, InlinedCallExpr]] = []
+
+    def clones_of(self, name: str) -> list[FunctionStmt]:
+        clones = self._clones.get(name, {}).values()
+        return [clone for clone in clones if clone is not None]
+
+    def transformCallExpr(self, expr: CallExpr) -> Expr:
+        call = self.generic_transform(expr)
+
+        match call.callee:
+            case VariableExpr(name=name) if name.lexeme in self._functions:
+                declaration, constant = self._functions[name.lexeme]
+            case _:
+                return call
+
+        if len(call.arguments) != len(declaration.params):
+            return call
+
+        arguments = [self._folder.transform(argument) for argument in call.arguments]
+        signature = tuple(
+            (index, type(argument.value), argument.value)
+            for index, argument in enumerate(arguments)
+            if index in constant and isinstance(argument, LiteralExpr)
+        )
+        if not signature:
+            return call
+
+        clone = self._clone(declaration, signature)
+        if clone is None:
+            return call
+
+        substituted = {index for index, _, _ in signature}
+        remaining = [
+            argument
+            for index, argument in enumerate(call.arguments)
+            if index not in substituted
+        ]
+        body = CallExpr(VariableExpr(clone.name), call.paren, remaining)
+
+        guarded = InlinedCallExpr(call, declaration, body)
+        self.guarded_calls.append((name.lexeme, guarded))
+        return guarded
+
+    def transformInlinedCallExpr(self, expr: InlinedCallExpr) -> Expr:
+        return expr
+
+    def transformInlinedGetterExpr(self, expr: InlinedGetterExpr) -> Expr:
+        return expr
+
+    def _clone(
+        self, declaration: FunctionStmt, signature: Signature
+    ) -> FunctionStmt | None:
+        name = declaration.name.lexeme
+        clones = self._clones.setdefault(name, {})
+
+        if signature in clones:
+            return clones[signature]
+        if len(clones) >= MAX_CLONES_PER_FUNCTION:
+            return None
+
+        constants = {
+            declaration.params[index].lexeme: value for index, _, value in signature
+        }
+        substituted = _Substituter(constants).transform_list(declaration.body)
+        body = self._folder.transform_list(substituted)
+
+        if _size(body) >= _size(declaration.body):
+            clones[signature] = None
+            return None
+
+        clone_name = Token(
+            TokenType.IDENTIFIER,
+            f"{name}${len(clones) + 1}",
+            None,
+            declaration.name.line,
+        )
+        params = [
+            param for param in declaration.params if param.lexeme not in constants
+        ]
+        clone = FunctionStmt(clone_name, params, [])
+        # Registered before its body is specialized, so recursive calls with
+        # the same constants reuse it.
+        clones[signature] = clone
+        clone.body = self.transform_list(body)
+
+        return clone
+
+
+class _Substituter(AstTransformer):
+    """
+    Copies nodes, replacing reads of the given parameters with literals. Every
+    clone gets its own nodes so the resolver can bind them separately.
+    """
+
+    def __init__(self, constants: dict[str, Any]) -> None:
+        self._constants = constants
+
+    def transformVariableExpr(self, expr: VariableExpr) -> Expr:
+        if expr.name.lexeme in self._constants:
+            return LiteralExpr(self._constants[expr.name.lexeme])
+        return replace(expr)
+
+    def generic_transform(self, node: Node) -> Node:
+        new = super().generic_transform(node)
+        return replace(new) if new is node else new
+
+
+class _Folder(AstTransformer):
+    def __init__(self) -> None:
+        # Operators are evaluated exactly like the interpreter would.
+        self._interpreter = Interpreter(tiering=False)
+
+    def transformGroupingExpr(self, expr: GroupingExpr) -> Expr:
+        folded = self.generic_transform(expr)
+        if isinstance(folded.expression, LiteralExpr):
+            return folded.expression
+        return folded
+
+    def transformUnaryExpr(self, expr: UnaryExpr) -> Expr:
+        folded = self.generic_transform(expr)
+
+        match folded.operator.type, folded.right:
+            case TokenType.MINUS, LiteralExpr(value=float(value)):
+                return LiteralExpr(-value)
+            case TokenType.BANG, LiteralExpr(value=value):
+                return LiteralExpr(not self._interpreter._is_truthy(value))
+            case _:
+                return folded
+
+    def transformBinaryExpr(self, expr: BinaryExpr) -> Expr:
+        folded = self.generic_transform(expr)
+
+        match folded.left, folded.right:
+            case LiteralExpr(value=left), LiteralExpr(value=right):
+                try:
+                    value = self._interpreter._binary_op(folded.operator, left, right)
+                except (JloxRuntimeError, ArithmeticError):
+                    # Left for run time, where it raises the same error.
+                    return folded
+                return LiteralExpr(value)
+            case _:
+                return folded
+
+    def transformLogicalExpr(self, expr: LogicalExpr) -> Expr:
+        folded = self.generic_transform(expr)
+        if not isinstance(folded.left, LiteralExpr):
+            return folded
+
+        truthy = self._interpreter._is_truthy(folded.left.value)
+        if truthy == (folded.operator.type == TokenType.OR):
+            return folded.left
+        return folded.right
+
+    def transformIfElseExpr(self, expr: IfElseExpr) -> Expr:
+        folded = self.generic_transform(expr)
+        if not isinstance(folded.conditional, LiteralExpr):
+            return folded
+
+        if self._interpreter._is_truthy(folded.conditional.value):
+            return folded.then_expr
+        return folded.else_expr
+
+    def transformIfStmt(self, stmt: IfStmt) -> Stmt:
+        folded = self.generic_transform(stmt)
+        if not isinstance(folded.condition, LiteralExpr):
+            return folded
+
+        if self._interpreter._is_truthy(folded.condition.value):
+            return folded.then_branch
+        if folded.else_branch is not None:
+            return folded.else_branch
+        return BlockStmt([])
+
+    def transformWhileStmt(self, stmt: WhileStmt) -> Stmt:
+        folded = self.generic_transform(stmt)
+
+        match folded.condition:
+            case LiteralExpr(value=value) if not self._interpreter._is_truthy(value):
+                return BlockStmt([])
+            case _:
+                return folded
+
+    def transform_list(self, items: Sequence[Any]) -> list[Any]:
+        result = []
+
+        for item in super().transform_list(items):
+            # Dropped branches leave empty blocks behind, which do nothing.
+            if isinstance(item, BlockStmt) and not item.statements:
+                continue
+
+            result.append(item)
+
+            # Nothing after these runs, which folding often exposes.
+            if _always_exits(item):
+                break
+
+        return result
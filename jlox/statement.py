@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from typing import Protocol, Sequence, TypeVar
 
-from jlox.expression import Expr, VariableExpr
+from jlox.expression import AssignExpr, BinaryExpr, Expr, VariableExpr
 from jlox.tokens import Token
 
 
@@ -39,6 +39,9 @@ class StmtVisitor(Protocol[T]):
     def visitBreakStmt(self, stmt: "BreakStmt") -> T:
         ...
 
+    def visitCountingLoopStmt(self, stmt: "CountingLoopStmt") -> T:
+        ...
+
 
 V = TypeVar("V")
 
@@ -47,6 +50,13 @@ class Stmt(Protocol):
     def accept(self, visitor: StmtVisitor[V]) -> V:
         ...
 
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want statements to be globally unique
+        in dicts.
+        """
+        return id(self)
+
 
 @dataclass
 class ExpressionStmt(Stmt):
@@ -55,6 +65,13 @@ class ExpressionStmt(Stmt):
     def accept(self, visitor: StmtVisitor[V]) -> V:
         return visitor.visitExpressionStmt(self)
 
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want statements to be globally unique
+        in dicts.
+        """
+        return id(self)
+
 
 @dataclass
 class PrintStmt(Stmt):
@@ -63,6 +80,13 @@ class PrintStmt(Stmt):
     def accept(self, visitor: StmtVisitor[V]) -> V:
         return visitor.visitPrintStmt(self)
 
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want statements to be globally unique
+        in dicts.
+        """
+        return id(self)
+
 
 @dataclass
 class VarStmt(Stmt):
@@ -72,6 +96,13 @@ class VarStmt(Stmt):
     def accept(self, visitor: StmtVisitor[V]) -> V:
         return visitor.visitVarStmt(self)
 
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want statements to be globally unique
+        in dicts.
+        """
+        return id(self)
+
 
 @dataclass
 class BlockStmt(Stmt):
@@ -80,6 +111,13 @@ class BlockStmt(Stmt):
     def accept(self, visitor: StmtVisitor[V]) -> V:
         return visitor.visitBlockStmt(self)
 
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want statements to be globally unique
+        in dicts.
+        """
+        return id(self)
+
 
 @dataclass
 class IfStmt(Stmt):
@@ -90,6 +128,13 @@ class IfStmt(Stmt):
     def accept(self, visitor: StmtVisitor[V]) -> V:
         return visitor.visitIfStmt(self)
 
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want statements to be globally unique
+        in dicts.
+        """
+        return id(self)
+
 
 @dataclass
 class WhileStmt(Stmt):
@@ -99,6 +144,13 @@ class WhileStmt(Stmt):
     def accept(self, visitor: StmtVisitor[V]) -> V:
         return visitor.visitWhileStmt(self)
 
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want statements to be globally unique
+        in dicts.
+        """
+        return id(self)
+
 
 @dataclass
 class FunctionStmt(Stmt):
@@ -109,6 +161,13 @@ class FunctionStmt(Stmt):
     def accept(self, visitor: StmtVisitor[V]) -> V:
         return visitor.visitFunctionStmt(self)
 
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want statements to be globally unique
+        in dicts.
+        """
+        return id(self)
+
 
 @dataclass
 class ReturnStmt(Stmt):
@@ -118,6 +177,13 @@ class ReturnStmt(Stmt):
     def accept(self, visitor: StmtVisitor[V]) -> V:
         return visitor.visitReturnStmt(self)
 
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want statements to be globally unique
+        in dicts.
+        """
+        return id(self)
+
 
 @dataclass
 class ClassStmt(Stmt):
@@ -128,6 +194,13 @@ class ClassStmt(Stmt):
     def accept(self, visitor: StmtVisitor[V]) -> V:
         return visitor.visitClassStmt(self)
 
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want statements to be globally unique
+        in dicts.
+        """
+        return id(self)
+
 
 @dataclass
 class BreakStmt(Stmt):
@@ -135,3 +208,35 @@ class BreakStmt(Stmt):
 
     def accept(self, visitor: StmtVisitor[V]) -> V:
         return visitor.visitBreakStmt(self)
+
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want statements to be globally unique
+        in dicts.
+        """
+        return id(self)
+
+
+@dataclass
+class CountingLoopStmt(Stmt):
+    """
+    A desugared `for (var i = start; i < bound; i = i + step)` loop whose body
+    assigns neither the counter nor the bound. Produced after parsing by
+    jlox.counting_loops, never by the parser itself.
+    """
+
+    initializer: VarStmt
+    condition: BinaryExpr
+    loop_body: Stmt
+    increment: AssignExpr
+    step: int
+
+    def accept(self, visitor: StmtVisitor[V]) -> V:
+        return visitor.visitCountingLoopStmt(self)
+
+    def __hash__(self) -> int:
+        """
+        Use ID as hash because we want statements to be globally unique
+        in dicts.
+        """
+        return id(self)
@@ -0,0 +1,92 @@
+from typing import TYPE_CHECKING
+
+from jlox.compiler import ClosureCompiler, FunctionDeclaration, StmtCode
+from jlox.statement import CountingLoopStmt, WhileStmt
+
+if TYPE_CHECKING:
+    from jlox.interpreter import Interpreter
+    from jlox.type_profile import ProfileHints
+
+DEFAULT_CALL_THRESHOLD = 50
+DEFAULT_LOOP_THRESHOLD = 200
+
+Loop = WhileStmt | CountingLoopStmt
+
+
+class TierController:
+    """
+    Keeps invocation counters per function declaration and back-edge counters
+    per loop. Once a counter crosses its threshold the function body or
+    loop is handed to the ClosureCompiler and the compiled code is used for
+    every later execution. Counters are per declaration rather than per
+    LoxFunction object, so closures and bound methods created from the same
+    declaration share their warmup.
+
+    With profile hints, functions and loops that were hot in the profiled run
+    are compiled on their first execution instead of after a warmup.
+    """
+
+    def __init__(
+        self,
+        interpreter: "Interpreter",
+        call_threshold: int = DEFAULT_CALL_THRESHOLD,
+        loop_threshold: int = DEFAULT_LOOP_THRESHOLD,
+    ) -> None:
+        self._interpreter = interpreter
+        self._compiler = ClosureCompiler(interpreter)
+        self._hints: "ProfileHints | None" = None
+        self._call_threshold = call_threshold
+        self._loop_threshold = loop_threshold
+
+        self._call_counts: dict[FunctionDeclaration, int] = {}
+        self._back_edges: dict[Loop, int] = {}
+
+        self._functions: dict[FunctionDeclaration, StmtCode] = {}
+        self._loops: dict[Loop, StmtCode] = {}
+
+    def use_hints(self, hints: "ProfileHints") -> None:
+        self._hints = hints
+        self._compiler = ClosureCompiler(self._interpreter, hints)
+
+    def function_entry(self, declaration: FunctionDeclaration) -> StmtCode | None:
+        code = self._functions.get(declaration)
+        if code is not None:
+            return code
+
+        count = self._call_counts.get(declaration, 0) + 1
+        self._call_counts[declaration] = count
+
+        if count < self._call_threshold and not (
+            self._hints and self._hints.call_count(declaration) >= self._call_threshold
+        ):
+            return None
+
+        code = self._compiler.compile_function(declaration)
+        self._functions[declaration] = code
+        return code
+
+    def compiled_loop(self, stmt: Loop) -> StmtCode | None:
+        code = self._loops.get(stmt)
+        if code is not None or self._hints is None:
+            return code
+
+        if self._hints.loop_iterations(stmt) < self._loop_threshold:
+            return None
+
+        code = self._compiler.compile_loop(stmt)
+        self._loops[stmt] = code
+        return code
+
+    def back_edge(self, stmt: Loop) -> StmtCode | None:
+        count = self._back_edges.get(stmt, 0) + 1
+        self._back_edges[stmt] = count
+
+        if count < self._loop_threshold:
+            return None
+
+        code = self._compiler.compile_loop(stmt)
+        self._loops[stmt] = code
+        return code
+
+    def is_compiled(self, node: FunctionDeclaration | Loop) -> bool:
+        return node in self._functions or node in self._loops
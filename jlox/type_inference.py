@@ -0,0 +1,430 @@
+from dataclasses import dataclass
+from operator import add, ge, gt, le, lt, mul, neg, sub, truediv
+from typing import Any, Callable, Sequence
+
+from jlox.ast_printer import AstPrinter
+from jlox.ast_utils import node_line, walk
+from jlox.expression import (
+    AnonymousFunctionExpr,
+    AssignExpr,
+    BinaryExpr,
+    CachedExpr,
+    CallExpr,
+    CommaExpr,
+    Expr,
+    ExprVisitor,
+    GetExpr,
+    GroupingExpr,
+    IfElseExpr,
+    InlinedCallExpr,
+    InlinedGetterExpr,
+    LiteralExpr,
+    LogicalExpr,
+    SetExpr,
+    SuperExpr,
+    ThisExpr,
+    UnaryExpr,
+    VariableExpr,
+)
+from jlox.ir import (
+    BasicBlock,
+    Branch,
+    ControlFlowGraph,
+    Return,
+    Variable,
+    lower_all,
+)
+from jlox.statement import (
+    ClassStmt,
+    ExpressionStmt,
+    FunctionStmt,
+    PrintStmt,
+    Stmt,
+    VarStmt,
+)
+from jlox.tokens import TokenType
+
+NUMBER = "number"
+STRING = "string"
+BOOL = "bool"
+NIL = "nil"
+FUNCTION = "function"
+CLASS = "class"
+
+# None stands for a value whose type is not known statically.
+Type = str | None
+State = dict[Variable, Type]
+
+_NUMBER_OPERATIONS = {
+    TokenType.MINUS: sub,
+    TokenType.SLASH: truediv,
+    TokenType.STAR: mul,
+    TokenType.PLUS: add,
+    TokenType.GREATER: gt,
+    TokenType.GREATER_EQUAL: ge,
+    TokenType.LESS: lt,
+    TokenType.LESS_EQUAL: le,
+}
+
+_COMPARISONS = {
+    TokenType.GREATER,
+    TokenType.GREATER_EQUAL,
+    TokenType.LESS,
+    TokenType.LESS_EQUAL,
+    TokenType.EQUAL_EQUAL,
+    TokenType.BANG_EQUAL,
+}
+
+
+def instance_type(class_name: str) -> str:
+    return f"instance {class_name}"
+
+
+@dataclass
+class TypedFunction:
+    """The expressions of one function in evaluation order, with their types."""
+
+    name: str
+    expressions: list[tuple[Expr, Type]]
+
+
+class TypeTable:
+    """
+    The static types of the expressions of a program. An expression has a
+    type if every value it evaluates to has it, numbers being Python floats.
+    """
+
+    def __init__(self, functions: Sequence[TypedFunction]) -> None:
+        self.functions = list(functions)
+        self._types = {
+            expr: type_
+            for function in self.functions
+            for expr, type_ in function.expressions
+            if type_ is not None
+        }
+
+    def type_of(self, expr: Expr) -> Type:
+        return self._types.get(expr)
+
+    def unchecked_operations(self) -> dict[Expr, Callable[..., Any]]:
+        """
+        The Python operations that can replace the dynamically checked ones
+        of unary and binary expressions whose operand types are known.
+        """
+        operations: dict[Expr, Callable[..., Any]] = {}
+
+        for expr in self._types:
+            match expr:
+                case UnaryExpr(operator=operator, right=right):
+                    if (
+                        operator.type == TokenType.MINUS
+                        and self.type_of(right) == NUMBER
+                    ):
+                        operations[expr] = neg
+                case BinaryExpr(left=left, operator=operator, right=right):
+                    operands = (self.type_of(left), self.type_of(right))
+                    if operands == (NUMBER, NUMBER):
+                        operation = _NUMBER_OPERATIONS.get(operator.type)
+                        if operation is not None:
+                            operations[expr] = operation
+                    elif operands == (STRING, STRING):
+                        if operator.type == TokenType.PLUS:
+                            operations[expr] = add
+
+        return operations
+
+
+def infer_types(statements: Sequence[Stmt]) -> TypeTable:
+    """
+    Infers the types of the expressions of a resolved program. Locals are
+    tracked through their assignments, flow-sensitively over the control flow
+    graph of every function. Globals, parameters and locals that nested
+    functions assign to can hold anything.
+    """
+    classes = _stable_classes(statements)
+    return TypeTable([_infer_function(cfg, classes) for cfg in lower_all(statements)])
+
+
+def format_types(table: TypeTable) -> str:
+    """
+    Lists the expressions of every function by line with their inferred
+    types, then the share of them that got one.
+    """
+    printer = AstPrinter()
+    lines = []
+    typed = total = 0
+
+    for function in table.functions:
+        lines.append(f";; {function.name}")
+
+        expressions = [
+            (node_line(expr), expr, type_)
+            for expr, type_ in function.expressions
+            if not isinstance(expr, (LiteralExpr, GroupingExpr))
+        ]
+        expressions.sort(key=lambda item: item[0])
+
+        for line, expr, type_ in expressions:
+            total += 1
+            typed += type_ is not None
+            lines.append(f"{line:>4}  {printer.print(expr)} : {type_ or '?'}")
+
+    percent = 100 * typed / total if total else 100
+    lines.append(f";; {typed} of {total} expressions typed ({percent:.0f}%)")
+    return "\n".join(lines)
+
+
+def _infer_function(cfg: ControlFlowGraph, classes: set[str]) -> TypedFunction:
+    preds = cfg.predecessors()
+    entry_state: State = {param: None for param in cfg.params}
+    states_out: dict[BasicBlock, State] = {}
+
+    def state_in(block: BasicBlock) -> State:
+        if block is cfg.entry:
+            return dict(entry_state)
+        return _join_states(
+            [states_out[pred] for pred in preds[block] if pred in states_out]
+        )
+
+    # Types only ever go from known to unknown, so this settles quickly.
+    changed = True
+    while changed:
+        changed = False
+
+        for block in cfg.blocks:
+            state = _ExprTyper(cfg, classes, state_in(block)).run(block)
+            if states_out.get(block) != state:
+                states_out[block] = state
+                changed = True
+
+    expressions: list[tuple[Expr, Type]] = []
+    for block in cfg.blocks:
+        _ExprTyper(cfg, classes, state_in(block), expressions).run(block)
+
+    return TypedFunction(cfg.name, expressions)
+
+
+def _join(a: Type, b: Type) -> Type:
+    return a if a == b else None
+
+
+def _join_states(states: Sequence[State]) -> State:
+    if not states:
+        return {}
+
+    result = dict(states[0])
+    for state in states[1:]:
+        for variable, type_ in state.items():
+            # A variable declared on only one of the paths is out of scope
+            # after they meet, so whatever it holds no longer matters.
+            if variable in result:
+                result[variable] = _join(result[variable], type_)
+            else:
+                result[variable] = type_
+
+    return result
+
+
+def _stable_classes(statements: Sequence[Stmt]) -> set[str]:
+    """
+    Names of global classes that nothing else declares or assigns, so calling
+    them by name always creates one of their instances.
+    """
+    classes = {stmt.name.lexeme for stmt in statements if isinstance(stmt, ClassStmt)}
+    seen: set[str] = set()
+    unstable: set[str] = set()
+
+    for node in walk(statements):
+        match node:
+            case ClassStmt(name=name) | FunctionStmt(name=name) | VarStmt(name=name):
+                if name.lexeme in seen:
+                    unstable.add(name.lexeme)
+                seen.add(name.lexeme)
+            case AssignExpr(name=name):
+                unstable.add(name.lexeme)
+        if isinstance(node, (FunctionStmt, AnonymousFunctionExpr)):
+            unstable.update(param.lexeme for param in node.params)
+
+    return classes - unstable
+
+
+class _ExprTyper(ExprVisitor[Type]):
+    """
+    Types the expressions of a block in evaluation order, updating the types
+    of the locals they assign as it goes.
+    """
+
+    def __init__(
+        self,
+        cfg: ControlFlowGraph,
+        classes: set[str],
+        state: State,
+        record: list[tuple[Expr, Type]] | None = None,
+    ) -> None:
+        self._cfg = cfg
+        self._classes = classes
+        self._state = state
+        self._record = record
+
+    def run(self, block: BasicBlock) -> State:
+        for stmt in block.statements:
+            match stmt:
+                case ExpressionStmt(expression=expression) | PrintStmt(
+                    expression=expression
+                ):
+                    self._type(expression)
+                case VarStmt(initializer=initializer):
+                    type_ = NIL if initializer is None else self._type(initializer)
+                    self._set(self._cfg.bindings[stmt], type_)
+                case FunctionStmt():
+                    self._set(self._cfg.bindings[stmt], FUNCTION)
+                case ClassStmt(superclass=superclass):
+                    if superclass is not None:
+                        self._type(superclass)
+                    self._set(self._cfg.bindings[stmt], CLASS)
+
+        match block.terminator:
+            case Branch(condition=condition):
+                self._type(condition)
+            case Return(value=value) if value is not None:
+                self._type(value)
+
+        return self._state
+
+    def visitLiteralExpr(self, expr: LiteralExpr) -> Type:
+        match expr.value:
+            case None:
+                return NIL
+            case bool():
+                return BOOL
+            case float():
+                return NUMBER
+            case str():
+                return STRING
+            case _:
+                return None
+
+    def visitGroupingExpr(self, expr: GroupingExpr) -> Type:
+        return self._type(expr.expression)
+
+    def visitUnaryExpr(self, expr: UnaryExpr) -> Type:
+        self._type(expr.right)
+
+        match expr.operator.type:
+            case TokenType.MINUS:
+                return NUMBER
+            case TokenType.BANG:
+                return BOOL
+            case _:
+                return NIL
+
+    def visitBinaryExpr(self, expr: BinaryExpr) -> Type:
+        operands = {self._type(expr.left), self._type(expr.right)}
+        operator = expr.operator.type
+
+        # Numbers only mix with numbers, so one number operand is enough, and
+        # adding to a string either fails or makes another string.
+        if operator in _COMPARISONS:
+            return BOOL
+        if operator == TokenType.SLASH:
+            return NUMBER
+        if operator in (TokenType.MINUS, TokenType.STAR, TokenType.PLUS):
+            if NUMBER in operands:
+                return NUMBER
+            if operator == TokenType.PLUS and STRING in operands:
+                return STRING
+        return None
+
+    def visitAssignExpr(self, expr: AssignExpr) -> Type:
+        type_ = self._type(expr.value)
+        self._set(self._cfg.bindings[expr], type_)
+        return type_
+
+    def visitVariableExpr(self, expr: VariableExpr) -> Type:
+        return self._state.get(self._cfg.bindings[expr])
+
+    def visitLogicalExpr(self, expr: LogicalExpr) -> Type:
+        left = self._type(expr.left)
+        right = self._branch(expr.right)
+        return _join(left, right)
+
+    def visitCallExpr(self, expr: CallExpr) -> Type:
+        self._type(expr.callee)
+        for argument in expr.arguments:
+            self._type(argument)
+
+        match expr.callee:
+            case VariableExpr(name=name) if name.lexeme in self._classes:
+                return instance_type(name.lexeme)
+        return None
+
+    def visitGetExpr(self, expr: GetExpr) -> Type:
+        self._type(expr.object)
+        return None
+
+    def visitSetExpr(self, expr: SetExpr) -> Type:
+        self._type(expr.object)
+        return self._type(expr.value)
+
+    def visitThisExpr(self, expr: ThisExpr) -> Type:
+        return None
+
+    def visitSuperExpr(self, expr: SuperExpr) -> Type:
+        return FUNCTION
+
+    def visitCommaExpr(self, expr: CommaExpr) -> Type:
+        self._type(expr.left)
+        return self._type(expr.right)
+
+    def visitIfElseExpr(self, expr: IfElseExpr) -> Type:
+        self._type(expr.conditional)
+        before = dict(self._state)
+        then_type = self._type(expr.then_expr)
+        after_then = self._state
+
+        self._state = before
+        else_type = self._type(expr.else_expr)
+        self._state = _join_states([after_then, self._state])
+
+        return _join(then_type, else_type)
+
+    def visitAnonymousFunctionExpr(self, expr: AnonymousFunctionExpr) -> Type:
+        return FUNCTION
+
+    def visitCachedExpr(self, expr: CachedExpr) -> Type:
+        type_ = self._type(expr.expression)
+        self._set(self._cfg.bindings[expr], None)
+        return type_
+
+    def visitInlinedCallExpr(self, expr: InlinedCallExpr) -> Type:
+        # The body only runs while the call would have run it, otherwise the
+        # call is made and could return anything.
+        self._type(expr.call.callee)
+        self._branch(expr.body)
+        for argument in expr.call.arguments:
+            self._branch(argument)
+        return None
+
+    def visitInlinedGetterExpr(self, expr: InlinedGetterExpr) -> Type:
+        self._type(expr.call)
+        return None
+
+    def _type(self, expr: Expr) -> Type:
+        type_ = expr.accept(self)
+        if self._record is not None:
+            self._record.append((expr, type_))
+        return type_
+
+    def _branch(self, expr: Expr) -> Type:
+        """Types an expression that may or may not be evaluated."""
+        before = dict(self._state)
+        type_ = self._type(expr)
+        self._state = _join_states([before, self._state])
+        return type_
+
+    def _set(self, variable: Variable, type_: Type) -> None:
+        if not variable.is_local:
+            return
+        if variable in self._cfg.assigned_by_closures:
+            type_ = None
+        self._state[variable] = type_
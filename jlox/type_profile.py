@@ -0,0 +1,293 @@
+import hashlib
+import json
+import sys
+from typing import Any, Sequence
+
+from jlox.ast_utils import Node, walk
+from jlox.compiler import FunctionDeclaration
+from jlox.environment import Environment
+from jlox.errors import JloxRuntimeError
+from jlox.exception_wrappers import BreakWrapper
+from jlox.expression import (
+    AnonymousFunctionExpr,
+    BinaryExpr,
+    CallExpr,
+    GetExpr,
+)
+from jlox.interpreter import Interpreter
+from jlox.limits import ExecutionLimits
+from jlox.lox_class import LoxClass
+from jlox.lox_function import LoxFunction
+from jlox.lox_instance import LoxInstance
+from jlox.statement import (
+    CountingLoopStmt,
+    FunctionStmt,
+    IfStmt,
+    Stmt,
+    WhileStmt,
+)
+
+PROFILE_VERSION = 2
+
+
+def profile_path(script: str) -> str:
+    return script + ".profile.json"
+
+
+def source_hash(source: str) -> str:
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def type_name(value: Any) -> str:
+    match value:
+        case None:
+            return "nil"
+        case bool():
+            return "bool"
+        case float() | int():
+            return "number"
+        case str():
+            return "string"
+        case LoxInstance():
+            return "instance"
+        case LoxClass():
+            return "class"
+        case _:
+            return "function"
+
+
+class SiteTable:
+    """
+    Numbers the nodes of a program in preorder. The numbers are stable for a
+    given source text, which is what makes them usable as keys in a profile
+    written by one process and read by another.
+    """
+
+    def __init__(self) -> None:
+        self._ids: dict[Node, int] = {}
+        self._nodes: list[Node] = []
+
+    def add(self, statements: Sequence[Stmt]) -> None:
+        for node in walk(statements):
+            self._ids[node] = len(self._nodes)
+            self._nodes.append(node)
+
+    def site(self, node: Node) -> int:
+        return self._ids.get(node, -1)
+
+    def node(self, site: int) -> Node | None:
+        return self._nodes[site] if 0 <= site < len(self._nodes) else None
+
+
+class TypeProfile:
+    def __init__(self) -> None:
+        self.binary: dict[int, dict[str, int]] = {}
+        self.get: dict[int, dict[str, int]] = {}
+        self.call: dict[int, dict[str, int]] = {}
+        self.branch: dict[int, list[int]] = {}
+        self.loop: dict[int, int] = {}
+
+    # Sites are numbered after the passes ran, so a profile is only valid for
+    # the source it was recorded from, optimized by the same passes.
+    def to_json(self, source: str, passes: Sequence[str] = ()) -> dict[str, Any]:
+        return {
+            "version": PROFILE_VERSION,
+            "source_hash": source_hash(source),
+            "passes": list(passes),
+            "binary": self.binary,
+            "get": self.get,
+            "call": self.call,
+            "branch": self.branch,
+            "loop": self.loop,
+        }
+
+    @classmethod
+    def from_json(
+        cls, data: dict[str, Any], source: str, passes: Sequence[str] = ()
+    ) -> "TypeProfile | None":
+        if data.get("version") != PROFILE_VERSION:
+            return None
+        if data.get("source_hash") != source_hash(source):
+            return None
+        if data.get("passes") != list(passes):
+            return None
+
+        profile = cls()
+        for table in ["binary", "get", "call", "branch", "loop"]:
+            setattr(profile, table, {int(k): v for k, v in data.get(table, {}).items()})
+
+        return profile
+
+    def save(self, path: str, source: str, passes: Sequence[str] = ()) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_json(source, passes), f)
+
+    @classmethod
+    def load(
+        cls, path: str, source: str, passes: Sequence[str] = ()
+    ) -> "TypeProfile | None":
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        profile = cls.from_json(data, source, passes)
+        if profile is None:
+            print(f"Ignoring stale profile {path}", file=sys.stderr)
+
+        return profile
+
+
+class ProfileHints:
+    """
+    Answers the questions the compiled tier asks about a node, using a
+    profile recorded by an earlier run of the same program.
+    """
+
+    def __init__(self, profile: TypeProfile, statements: Sequence[Stmt]) -> None:
+        self._profile = profile
+        self._sites = SiteTable()
+        self._sites.add(statements)
+
+        self._call_counts: dict[str, int] = {}
+        for callees in profile.call.values():
+            for key, count in callees.items():
+                self._call_counts[key] = self._call_counts.get(key, 0) + count
+
+    def binary_types(self, expr: BinaryExpr) -> set[str]:
+        return set(self._profile.binary.get(self._sites.site(expr), {}))
+
+    def receivers(self, expr: GetExpr) -> set[str]:
+        return set(self._profile.get.get(self._sites.site(expr), {}))
+
+    def callee(self, expr: CallExpr) -> FunctionDeclaration | None:
+        callees = self._profile.call.get(self._sites.site(expr), {})
+        if len(callees) != 1:
+            return None
+
+        [callee] = callees
+        kind, _, site = callee.partition(":")
+        if kind != "fn":
+            return None
+
+        node = self._sites.node(int(site))
+        if isinstance(node, (FunctionStmt, AnonymousFunctionExpr)):
+            return node
+
+        return None
+
+    def branch_counts(self, stmt: IfStmt) -> tuple[int, int] | None:
+        counts = self._profile.branch.get(self._sites.site(stmt))
+        return (counts[0], counts[1]) if counts else None
+
+    def call_count(self, declaration: FunctionDeclaration) -> int:
+        return self._call_counts.get(f"fn:{self._sites.site(declaration)}", 0)
+
+    def loop_iterations(self, stmt: WhileStmt | CountingLoopStmt) -> int:
+        return self._profile.loop.get(self._sites.site(stmt), 0)
+
+
+class ProfilingInterpreter(Interpreter):
+    """
+    Tree walking interpreter that records operand types, property receivers,
+    callees, branch directions and loop trip counts per site. Tiering is off
+    so that every site is observed by the visitor.
+    """
+
+    def __init__(self, repl: bool = False, limits: ExecutionLimits | None = None):
+        super().__init__(repl, tiering=False, limits=limits)
+
+        self.profile = TypeProfile()
+        self._sites = SiteTable()
+
+    def interpret(self, statements: list[Stmt]):
+        self._sites.add(statements)
+        super().interpret(statements)
+
+    def visitBinaryExpr(self, expr: BinaryExpr) -> Any:
+        left = self._evaluate(expr.left)
+        right = self._evaluate(expr.right)
+
+        self._record(self.profile.binary, expr, f"{type_name(left)} {type_name(right)}")
+
+        return self._binary_op(expr.operator, left, right)
+
+    def visitGetExpr(self, expr: GetExpr) -> Any:
+        obj = self._evaluate(expr.object)
+
+        if not isinstance(obj, LoxInstance):
+            self._record(self.profile.get, expr, type_name(obj))
+            raise JloxRuntimeError(expr.name, "Only instances have properties.")
+
+        self._record(self.profile.get, expr, obj.kind.name)
+        return obj.get(expr.name)
+
+    def visitIfStmt(self, stmt: IfStmt) -> None:
+        condition = self._evaluate(stmt.condition)
+
+        counts = self.profile.branch.setdefault(self._sites.site(stmt), [0, 0])
+        counts[0 if condition else 1] += 1
+
+        if condition:
+            self._execute(stmt.then_branch)
+        elif stmt.else_branch:
+            self._execute(stmt.else_branch)
+
+    def visitWhileStmt(self, stmt: WhileStmt) -> None:
+        iterations = 0
+
+        try:
+            while self._evaluate(stmt.condition):
+                self._execute(stmt.loop_body)
+                iterations += 1
+
+                if self._limits is not None:
+                    self._limits.charge(stmt)
+        except BreakWrapper:
+            pass
+        finally:
+            site = self._sites.site(stmt)
+            self.profile.loop[site] = self.profile.loop.get(site, 0) + iterations
+
+    def visitCountingLoopStmt(self, stmt: CountingLoopStmt) -> None:
+        # Runs the loop it was specialized from, so that its condition and
+        # increment are observed like those of any other loop.
+        prev_env = self._environment
+        iterations = 0
+
+        try:
+            self._environment = Environment(prev_env)
+            self._execute(stmt.initializer)
+
+            while self._evaluate(stmt.condition):
+                self._execute(stmt.loop_body)
+                self._evaluate(stmt.increment)
+                iterations += 1
+
+                if self._limits is not None:
+                    self._limits.charge(stmt)
+        except BreakWrapper:
+            pass
+        finally:
+            self._environment = prev_env
+
+            site = self._sites.site(stmt)
+            self.profile.loop[site] = self.profile.loop.get(site, 0) + iterations
+
+    def _invoke(self, expr: CallExpr, callee: Any) -> Any:
+        match callee:
+            case LoxFunction():
+                key = f"fn:{self._sites.site(callee.declaration)}"
+            case LoxClass():
+                key = f"class:{callee.name}"
+            case _:
+                key = f"native:{type(callee).__name__}"
+
+        self._record(self.profile.call, expr, key)
+
+        return super()._invoke(expr, callee)
+
+    def _record(self, table: dict[int, dict[str, int]], node: Node, key: str):
+        counts = table.setdefault(self._sites.site(node), {})
+        counts[key] = counts.get(key, 0) + 1
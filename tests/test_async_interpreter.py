@@ -0,0 +1,155 @@
+import asyncio
+import io
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import jlox
+from jlox.errors import JloxRuntimeError
+from jlox.limits import ExecutionLimitExceeded, ExecutionLimits
+
+SCRIPTS = 200
+
+source = """
+var total = 0;
+for (var i = 0; i < 3; i = i + 1) {
+    total = total + fetch(id, i);
+}
+print total;
+"""
+
+
+async def fetch(id, i):
+    await asyncio.sleep(0.02)
+    return id * 10 + i
+
+
+def test_runs_scripts_concurrently():
+    program = jlox.compile(source)
+
+    async def main():
+        stdouts = [io.StringIO() for _ in range(SCRIPTS)]
+        results = await asyncio.gather(
+            *(
+                program.run_async({"fetch": fetch, "id": id}, stdout)
+                for id, stdout in enumerate(stdouts)
+            )
+        )
+        return [stdout.getvalue() for stdout in stdouts], results
+
+    start = time.perf_counter()
+    outputs, results = asyncio.run(main())
+    seconds = time.perf_counter() - start
+
+    assert outputs == [f"{id * 30 + 3:.1f}\n" for id in range(SCRIPTS)]
+    assert results[7]["total"] == 213.0
+    # One after the other they would take 12 s.
+    assert seconds < SCRIPTS * 3 * 0.02 / 4
+
+
+def test_shares_one_thread():
+    program = jlox.compile(source)
+    threads = []
+
+    async def fetch_on_thread(id, i):
+        threads.append(threading.get_ident())
+        return await fetch(id, i)
+
+    async def main():
+        return await asyncio.gather(
+            *(
+                program.run_async({"fetch": fetch_on_thread, "id": id}, io.StringIO())
+                for id in range(2000)
+            )
+        )
+
+    results = asyncio.run(main())
+    assert [result["total"] for result in results[:3]] == [3.0, 33.0, 63.0]
+    assert set(threads) == {threading.get_ident()}
+
+
+def test_suspends_in_functions_and_methods():
+    program = jlox.compile("""
+        class Account {
+            init(id) { this.balance = fetch(id, 0); }
+            deposit(n) {
+                for (var i = 0; i < n; i = i + 1) {
+                    if (i == 1) break;
+                    this.balance = this.balance + fetch(0, 1);
+                }
+                return this.balance;
+            }
+        }
+        fun open(id) { return Account(id); }
+        var account = open(4);
+        print account.deposit(5);
+        """)
+
+    stdout = io.StringIO()
+    asyncio.run(program.run_async({"fetch": fetch}, stdout))
+    assert stdout.getvalue() == "41.0\n"
+
+
+def test_does_not_block_the_event_loop():
+    program = jlox.compile("wait(); print 1;")
+    ticks = []
+
+    async def tick():
+        for _ in range(5):
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(
+            program.run_async({"wait": lambda: asyncio.sleep(0.1)}, io.StringIO()),
+            tick(),
+        )
+
+    asyncio.run(main())
+    assert len(ticks) == 5
+
+
+def test_awaits_outside_event_loops():
+    stdout = io.StringIO()
+    jlox.compile("print fetch(4, 2);").run({"fetch": fetch}, stdout)
+    assert stdout.getvalue() == "42.0\n"
+
+
+def test_raises_errors():
+    async def fail():
+        raise ValueError("unavailable")
+
+    program = jlox.compile("print fail();")
+    with pytest.raises(ValueError, match="unavailable"):
+        asyncio.run(program.run_async({"fail": fail}, io.StringIO()))
+
+    program = jlox.compile("print nil + 1;")
+    with pytest.raises(JloxRuntimeError):
+        asyncio.run(program.run_async(stdout=io.StringIO()))
+
+
+def test_imports_asyncio_only_when_used():
+    code = "import sys, jlox; jlox.compile('print 1;').run(); print('asyncio' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout == "1.0\nFalse\n"
+
+
+def test_reports_where_limits_ran_out():
+    program = jlox.compile("""
+fun spin() {
+    while (true) { fetch(0, 0); }
+}
+spin();
+""")
+
+    with pytest.raises(ExecutionLimitExceeded) as info:
+        asyncio.run(
+            program.run_async({"fetch": fetch}, limits=ExecutionLimits(fuel=10))
+        )
+
+    assert info.value.stack == ["[line 3] in spin", "[line 5] in <script>"]
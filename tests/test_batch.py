@@ -0,0 +1,55 @@
+from pathlib import Path
+
+from jlox.batch import main, run_batch, script_paths
+
+scripts = {
+    "a.lox": "print 1 + 2;",
+    "b.lox": 'print "before"; print nil + 1;',
+    "nested/c.lox": "print (;",
+    "nested/d.lox": "fun f(n) { return n * 2; } print f(21);",
+}
+
+
+def write_scripts(directory: Path) -> None:
+    for name, source in scripts.items():
+        path = directory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(source)
+
+
+def test_runs_scripts_separately(tmp_path):
+    write_scripts(tmp_path)
+    paths = script_paths([tmp_path])
+    assert [path.relative_to(tmp_path).as_posix() for path in paths] == list(scripts)
+
+    results = run_batch(paths, workers=2)
+
+    assert [(result.output, result.error) for result in results.scripts] == [
+        ("3.0\n", None),
+        ("before\n", "Runtime error: Operands must be two numbers or two strings"),
+        ("", "Syntax error: l.1 - at ;. Expect expression."),
+        ("42.0\n", None),
+    ]
+    assert len(results.failed) == 2
+    assert results.throughput > 0
+
+
+def test_recycles_workers(tmp_path):
+    write_scripts(tmp_path)
+    results = run_batch(script_paths([tmp_path]), workers=1, max_runs=1)
+
+    assert len({result.worker for result in results.scripts}) == len(scripts)
+
+
+def test_main_writes_outputs(tmp_path, capsys):
+    write_scripts(tmp_path / "scripts")
+    out = tmp_path / "out"
+
+    assert main([str(tmp_path / "scripts"), "--workers", "2", "-o", str(out)]) == 1
+    assert (out / "a.out").read_text() == "3.0\n"
+    assert not (out / "a.err").exists()
+    assert (out / "nested" / "c.err").read_text().startswith("Syntax error")
+    assert "4 scripts in" in capsys.readouterr().err
+
+    assert main([str(tmp_path / "scripts" / "a.lox"), "--workers", "1"]) == 0
+    assert capsys.readouterr().out.endswith("a.lox <==\n3.0\n")
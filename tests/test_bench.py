@@ -0,0 +1,120 @@
+import math
+from pathlib import Path
+
+import pytest
+
+from jlox.bench import (
+    BenchmarkResult,
+    SuiteResults,
+    benchmark_paths,
+    compare,
+    format_comparison,
+    main,
+    regressions,
+    run_suite,
+)
+from jlox.interpreter import Interpreter
+from jlox.parser import Parser
+from jlox.resolver import Resolver
+from jlox.scanner import Scanner
+
+CORPUS = [
+    "binary_trees",
+    "closures",
+    "equality",
+    "fib",
+    "instantiation",
+    "invocation",
+    "method_call",
+    "properties",
+    "string_concat",
+    "string_equality",
+    "trees",
+    "zoo",
+]
+
+
+def test_corpus_compiles():
+    paths = benchmark_paths()
+    assert [path.stem for path in paths] == CORPUS
+
+    for path in paths:
+        statements = Parser(Scanner(path.read_text()).scan_tokens()).parse()
+        Resolver(Interpreter()).resolve(statements)
+
+
+def test_runs_and_saves_results(tmp_path: Path, capsys):
+    (tmp_path / "small.lox").write_text("var a = 0; while (a < 10) a = a + 1;")
+
+    results = run_suite(benchmark_paths(directory=tmp_path), warmup=1, repetitions=3)
+    [small] = results.benchmarks
+    assert small.name == "small" and len(small.times) == 3
+    assert results.metadata["repetitions"] == 3
+
+    results.save(tmp_path / "results.json")
+    loaded = SuiteResults.load(tmp_path / "results.json")
+    assert loaded.benchmarks == results.benchmarks
+    assert loaded.benchmarks[0].mean == small.mean
+
+
+def test_records_work_counts(tmp_path: Path, capsys):
+    (tmp_path / "small.lox").write_text("var a = 0; while (a < 10) a = a + 1;")
+
+    [small] = run_suite(
+        benchmark_paths(directory=tmp_path), warmup=0, repetitions=1, count=True
+    ).benchmarks
+    assert small.counts["nodes"] > 0 and small.counts["environments"] == 0
+
+    more_work = BenchmarkResult("small", small.times, dict(small.counts, nodes=1e9))
+    [comparison] = compare(SuiteResults([small]), SuiteResults([more_work]))
+    assert comparison.counts == {"nodes": (small.counts["nodes"], 1e9)}
+    assert regressions([comparison], threshold=10.0) == [comparison]
+
+
+def test_flags_regressions_above_threshold(tmp_path: Path, capsys):
+    baseline = SuiteResults(
+        [BenchmarkResult("fib", [1.0, 1.0]), BenchmarkResult("zoo", [2.0, 2.0])]
+    )
+    current = SuiteResults(
+        [BenchmarkResult("fib", [1.2, 1.2]), BenchmarkResult("zoo", [2.02, 2.02])]
+    )
+
+    comparisons = compare(baseline, current)
+    assert [c.name for c in regressions(comparisons, 0.05)] == ["fib"]
+    assert "REGRESSION" in format_comparison(comparisons).splitlines()[1]
+
+    baseline.save(tmp_path / "baseline.json")
+    current.save(tmp_path / "current.json")
+    files = [str(tmp_path / "baseline.json"), str(tmp_path / "current.json")]
+
+    assert main(["--compare", *files]) == 1
+    assert main(["--compare", *files, "--threshold", "0.5"]) == 0
+
+
+def test_compares_benchmarks_that_took_no_time():
+    [unchanged, slower] = compare(
+        SuiteResults([BenchmarkResult("a", [0.0]), BenchmarkResult("b", [0.0])]),
+        SuiteResults([BenchmarkResult("a", [0.0]), BenchmarkResult("b", [0.1])]),
+    )
+
+    assert unchanged.change == 0.0 and not unchanged.is_regression(0.05)
+    assert slower.change == math.inf and slower.is_regression(0.05)
+    assert "+inf%" in format_comparison([slower])
+
+
+def test_reports_bad_arguments(tmp_path: Path, capsys):
+    with pytest.raises(SystemExit) as info:
+        main(["fibb"])
+    assert info.value.code == 2
+    assert "Unknown benchmarks: fibb" in capsys.readouterr().err
+
+    with pytest.raises(SystemExit):
+        main(["--dir", str(tmp_path)])
+    assert f"no benchmarks in {tmp_path}" in capsys.readouterr().err
+
+
+def test_runs_benchmarks_from_any_directory(tmp_path: Path, capsys):
+    (tmp_path / "small.lox").write_text("print 1;")
+
+    assert main(["--dir", str(tmp_path), "--warmup", "0", "--repetitions", "1"]) == 0
+    assert capsys.readouterr().out.splitlines()[1].startswith("small")
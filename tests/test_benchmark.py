@@ -1,60 +1,21 @@
+from pathlib import Path
 from typing import Any
-import pytest
-
-from jlox.expression import (
-    CallExpr,
-    LiteralExpr,
-    VariableExpr,
-    BinaryExpr,
-)
-from jlox.interpreter import Interpreter
-from jlox.resolver import Resolver
-from jlox.scanner import Scanner
-from jlox.parser import Parser
-from jlox.statement import (
-    ExpressionStmt,
-    FunctionStmt,
-    IfStmt,
-    ReturnStmt,
-    Stmt,
-)
-from jlox.tokens import Token, TokenType
-
-
-@pytest.fixture
-def interpreter() -> Interpreter:
-    return Interpreter()
-
-
-def name(n: str, line: int = 1) -> Token:
-    return Token(TokenType.IDENTIFIER, n, None, line)
 
+import pytest
 
-def right_paren():
-    return Token(TokenType.RIGHT_PAREN, ")", None, 0)
-
-
-lox_fib = """
-fun fib(n) {
-    if (n < 2) return n;
-    return fib(n - 1) + fib(n - 2);
-}
-
-var res = fib(10);
-assert_equal(res, 55);
-"""
-
+from jlox.bench import DEFAULT_REPETITIONS, DEFAULT_WARMUP, benchmark_paths, run_once
+from jlox.pass_manager import DEFAULT_OPTIMIZATION_LEVEL
 
-@pytest.mark.skip
-def test_fib(interpreter: Interpreter, benchmark: Any):
-    def run():
-        scanner = Scanner(lox_fib)
-        tokens = scanner.scan_tokens()
-        parser = Parser(tokens)
-        statements = parser.parse()
-        resolver = Resolver(interpreter)
+# The corpus run by pytest-benchmark, a development dependency. jlox bench
+# runs the same programs the same way without it.
+pytest.importorskip("pytest_benchmark")
 
-        resolver.resolve(statements)
-        interpreter.interpret(statements)
 
-    benchmark(run)
+@pytest.mark.parametrize("path", benchmark_paths(), ids=lambda path: path.stem)
+def test_corpus(path: Path, benchmark: Any):
+    benchmark.pedantic(
+        run_once,
+        args=(path.read_text(), DEFAULT_OPTIMIZATION_LEVEL, True),
+        rounds=DEFAULT_REPETITIONS,
+        warmup_rounds=DEFAULT_WARMUP,
+    )
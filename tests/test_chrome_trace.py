@@ -0,0 +1,85 @@
+import json
+
+from jlox.chrome_trace import TraceRecorder
+from jlox.interpreter import Interpreter
+from jlox.main import run
+from jlox.pass_manager import PassManager
+
+source = """
+class Point {
+    init(x) { this.x = x; }
+}
+fun double(n) { return Point(n * 2); }
+for (var i = 0; i < 3; i = i + 1) {
+    double(i);
+}
+print "done";
+"""
+
+
+def record(capacity: int = 1000) -> TraceRecorder:
+    interpreter = Interpreter()
+    recorder = TraceRecorder(capacity)
+    with recorder.recording(interpreter):
+        run(source, interpreter, passes=PassManager.for_level(0))
+    return recorder
+
+
+def spans(events: list[dict]) -> list[tuple[int, str, str]]:
+    """The begin events with their depth, checking that every one ends."""
+    result = []
+    stack = []
+
+    for event in events:
+        if event["ph"] == "B":
+            result.append((len(stack), event["cat"], event["name"]))
+            stack.append(event)
+        else:
+            begin = stack.pop()
+            assert (event["name"], event["cat"]) == (begin["name"], begin["cat"])
+            assert event["ts"] >= begin["ts"]
+
+    assert stack == []
+    return result
+
+
+def test_records_nested_spans(capsys):
+    events = record().trace_events()
+
+    assert spans(events)[:8] == [
+        (0, "statement", "class (line 2)"),
+        (0, "statement", "function (line 5)"),
+        (0, "statement", "block (line 6)"),
+        (1, "function", "double"),
+        (2, "class", "Point"),
+        (3, "function", "init"),
+        (1, "function", "double"),
+        (2, "class", "Point"),
+    ]
+    assert spans(events)[-1] == (0, "statement", "print")
+    assert capsys.readouterr().out == "done\n"
+
+
+def test_overwrites_the_oldest_events(capsys):
+    recorder = record(capacity=10)
+    events = recorder.trace_events()
+
+    assert recorder.recorded == 26
+    assert recorder.dropped == 16
+    # The block statement began too long ago, its end is left out.
+    assert spans(events) == [
+        (0, "function", "double"),
+        (1, "class", "Point"),
+        (2, "function", "init"),
+        (0, "statement", "print"),
+    ]
+
+
+def test_saves_trace_event_json(tmp_path, capsys):
+    path = tmp_path / "trace.json"
+    record().save(path)
+    data = json.loads(path.read_text())
+
+    assert data["otherData"] == {"recorded": 26, "dropped": 0}
+    assert {event["ph"] for event in data["traceEvents"]} == {"B", "E"}
+    assert data["traceEvents"][0]["ts"] == 0
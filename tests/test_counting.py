@@ -0,0 +1,55 @@
+from jlox.counting import CountingInterpreter, WorkCounts, format_counts
+from jlox.parser import Parser
+from jlox.resolver import Resolver
+from jlox.scanner import Scanner
+
+lox_program = """
+class A { init() { this.x = 1; } }
+fun f(n) { return n + 1; }
+var s = "";
+var i = 0;
+while (i < 3) {
+    s = s + "ab";
+    f(i);
+    A();
+    i = i + 1;
+    if (i == 10) break;
+}
+"""
+
+
+def count(source: str) -> WorkCounts:
+    interpreter = CountingInterpreter()
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    Resolver(interpreter).resolve(statements)
+    interpreter.interpret(statements)
+    return interpreter.counts
+
+
+def test_counts_work():
+    counts = count(lox_program)
+
+    assert counts.summary() == {
+        "nodes": 109,
+        # A block per iteration, a call scope per call and the binding of init
+        "environments": 3 + 3 + 3 * 2,
+        "calls": 6,
+        "instances": 3,
+        "control_flow_exceptions": 3,
+        "string_bytes": 2 + 4 + 6,
+    }
+    assert counts.nodes["WhileStmt"] == 1
+    assert counts.nodes["BlockStmt"] == 3
+    assert counts.nodes["ReturnStmt"] == 3
+
+
+def test_counts_are_deterministic():
+    assert count(lox_program) == count(lox_program)
+
+
+def test_format_lists_nodes_by_count():
+    lines = format_counts(count(lox_program)).splitlines()
+
+    assert lines[0].startswith("nodes evaluated")
+    assert lines[1].split()[0] == "VariableExpr"
+    assert lines[-1].split()[-1] == "12"
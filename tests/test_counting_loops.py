@@ -0,0 +1,99 @@
+import pytest
+
+from jlox.counting_loops import specialize_counting_loops
+from jlox.errors import JloxRuntimeError
+from jlox.interpreter import Interpreter
+from jlox.parser import Parser
+from jlox.resolver import Resolver
+from jlox.scanner import Scanner
+from jlox.statement import CountingLoopStmt, Stmt
+from jlox.tiering import TierController
+
+
+def parse(source: str) -> list[Stmt]:
+    return Parser(Scanner(source).scan_tokens()).parse()
+
+
+def run(interpreter: Interpreter, statements: list[Stmt]):
+    Resolver(interpreter).resolve(statements)
+    interpreter.interpret(statements)
+
+
+def is_specialized(source: str) -> bool:
+    [stmt] = specialize_counting_loops(parse(source))
+    return isinstance(stmt, CountingLoopStmt)
+
+
+def test_detects_canonical_loops():
+    assert is_specialized("for (var i = 0; i < 10; i = i + 1) print i;")
+    assert is_specialized("for (var i = 1; i <= n; i = i + 2) { print i; }")
+
+
+def test_guards_fall_back_to_generic_loop():
+    assert not is_specialized("for (var i = 0; i < 10; i = i + 1) i = i + 1;")
+    assert not is_specialized("for (var i = 0; i < n; i = i + 1) { n = n - 1; }")
+    assert not is_specialized("for (var i = 0; i < 10; i = i - 1) print i;")
+    assert not is_specialized("for (var i = 0; i < 10; i = i + 0.5) print i;")
+    assert not is_specialized("for (var i = 0; i < f(); i = i + 1) print i;")
+    assert not is_specialized(
+        "for (var i = 0; i < 10; i = i + 1) { fun f() { i = 3; } f(); }"
+    )
+
+
+def test_bound_assigned_elsewhere_is_not_specialized():
+    source = """
+    var n = 10;
+    fun shrink() { n = n - 1; }
+    for (var i = 0; i < n; i = i + 1) shrink();
+    """
+
+    [_, _, loop] = specialize_counting_loops(parse(source))
+    assert not isinstance(loop, CountingLoopStmt)
+
+
+lox_program = """
+var closures = 0;
+var sum = 0;
+for (var i = 0; i < 10; i = i + 1) {
+    sum = sum + i;
+    if (i == 5) closures = fun () { return i; };
+}
+print sum;
+print closures();
+
+for (var j = 0; j <= 7.5; j = j + 3) print j;
+
+for (var k = 0; k < 100; k = k + 1) {
+    if (k == 4) break;
+    print k;
+}
+
+var n = 2.5;
+for (var x = 0.5; x < n; x = x + 1) print x;
+"""
+
+
+def test_specialized_loops_match_generic_loops(capsys: pytest.CaptureFixture[str]):
+    run(Interpreter(tiering=False), parse(lox_program))
+    expected = capsys.readouterr().out
+
+    statements = specialize_counting_loops(parse(lox_program))
+    assert sum(isinstance(s, CountingLoopStmt) for s in statements) == 4
+
+    interpreter = Interpreter(tiering=False)
+    run(interpreter, specialize_counting_loops(parse(lox_program)))
+    assert capsys.readouterr().out == expected
+
+    interpreter = Interpreter()
+    interpreter._tiers = TierController(interpreter, loop_threshold=2)
+    run(interpreter, specialize_counting_loops(parse(lox_program)))
+    assert capsys.readouterr().out == expected
+
+
+def test_non_number_bounds_raise_like_generic_loop():
+    statements = specialize_counting_loops(
+        parse('for (var i = 0; i < "ten"; i = i + 1) print i;')
+    )
+
+    with pytest.raises(JloxRuntimeError):
+        run(Interpreter(), statements)
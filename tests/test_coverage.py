@@ -0,0 +1,150 @@
+import time
+
+import pytest
+
+import jlox
+from jlox.coverage import Coverage, format_coverage
+from jlox.interpreter import Interpreter
+from jlox.main import run, run_file
+from jlox.pass_manager import PassManager
+from jlox.statement import WhileStmt
+
+source = """
+fun sign(n) {
+    if (n < 0) return -1;
+    if (n == 0) {
+        return 0;
+    }
+    return 1;
+}
+class Box {
+    init(value) { this.value = value; }
+    unused() { return nil; }
+}
+var total = 0;
+for (var i = 1; i < 300; i = i + 1) {
+    total = total + sign(i);
+}
+print total > 0 and Box(total).value;
+print total < 0 ? "negative" : "positive";
+"""
+
+
+@pytest.fixture(params=[False, True], ids=["tree", "tiered"])
+def coverage(request, capsys) -> Coverage:
+    coverage = Coverage("test.lox")
+    run(
+        source,
+        Interpreter(tiering=request.param),
+        passes=PassManager.for_level(0),
+        coverage=coverage,
+    )
+    assert capsys.readouterr().out == "299.0\npositive\n"
+    return coverage
+
+
+def test_records_statements_and_branches(coverage: Coverage):
+    assert [line for line, hit in coverage.lines().items() if not hit] == [5, 11]
+    assert coverage.branch_lines() == [
+        (3, False, True),
+        (4, False, True),
+        (17, True, False),
+        (18, False, True),
+    ]
+    assert format_coverage(coverage) == "lines: 11/13 (84.6%), branches: 4/8 (50.0%)"
+
+
+def test_leaves_the_program_alone(capsys):
+    interpreter = Interpreter()
+    coverage = Coverage()
+    run(source, interpreter, passes=PassManager.for_level(0), coverage=coverage)
+    capsys.readouterr()
+
+    assert type(interpreter) is Interpreter
+    assert not any(
+        "accept" in vars(node) for node in [*coverage.statements, *coverage.branches]
+    )
+
+
+def test_runs_the_source_as_written(tmp_path, capsys):
+    # At -O2 the invariant would be hoisted out of the loop, and the calls
+    # would go to a clone of check.
+    script = tmp_path / "script.lox"
+    script.write_text("""
+fun check(flag, n) {
+    if (flag) return n;
+    return -n;
+}
+var limit = 0;
+for (var i = 0; i < limit; i = i + 1) {
+    var twice = limit * 2;
+}
+print check(true, 1);
+""")
+    coverage = Coverage(str(script))
+
+    run_file(str(script), passes=PassManager.for_level(2), coverage=coverage)
+
+    assert capsys.readouterr().out == "1.0\n"
+    assert [line for line, hit in coverage.lines().items() if not hit] == [4, 8]
+    assert (3, True, False) in coverage.branch_lines()
+
+
+def test_writes_lcov(coverage: Coverage):
+    records = coverage.lcov().splitlines()
+
+    assert records[:2] == ["TN:", "SF:test.lox"]
+    assert records[2:4] == ["BRDA:3,0,0,0", "BRDA:3,0,1,1"]
+    assert "DA:5,0" in records
+    assert records[-3:] == ["LF:13", "LH:11", "end_of_record"]
+
+
+hot = """
+var total = 0;
+for (var i = 0; i < 20000; i = i + 1) {
+    if (i < 0) {
+        print i;
+    }
+    total = total + (i > 5 and 1 or 0);
+}
+"""
+
+
+def run_hot(coverage: Coverage | None) -> tuple[Interpreter, float]:
+    program = jlox.compile(hot, passes=PassManager())
+    interpreter = Interpreter()
+
+    start = time.perf_counter()
+    if coverage is None:
+        program.run_in(interpreter)
+    else:
+        with coverage.recording(interpreter, program.statements):
+            program.run_in(interpreter)
+    return interpreter, time.perf_counter() - start
+
+
+def test_keeps_tiering_on():
+    coverage = Coverage()
+    interpreter, seconds = run_hot(coverage)
+    _, plain_seconds = run_hot(None)
+
+    loop = next(node for node in coverage.statements if isinstance(node, WhileStmt))
+    assert interpreter._tiers.is_compiled(loop)
+    assert [line for line, hit in coverage.lines().items() if not hit] == [5]
+    # The loop runs compiled, with its probes gone once they fired.
+    assert seconds < plain_seconds * 3
+
+
+def test_removes_probes_once_they_all_fired():
+    program = jlox.compile(
+        "var n = 0; while (n < 300) n = n + 1;", passes=PassManager()
+    )
+    interpreter = Interpreter()
+    coverage = Coverage()
+
+    with coverage.recording(interpreter, program.statements):
+        program.run_in(interpreter)
+        assert type(interpreter) is Interpreter
+
+    assert all(coverage.lines().values())
+    assert interpreter._probes is None
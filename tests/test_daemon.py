@@ -0,0 +1,83 @@
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from jlox import client
+from jlox.daemon import Daemon
+from jlox.protocol import PROTOCOL_ERROR_STATUS, RUNTIME_ERROR_STATUS, request
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    daemon = Daemon(tmp_path / "jlox.sock", cache_size=2)
+    threading.Thread(target=daemon.serve_forever, daemon=True).start()
+    yield daemon
+    daemon.close()
+
+
+def test_caches_programs(daemon: Daemon, tmp_path):
+    script = tmp_path / "script.lox"
+    script.write_text("print 1;")
+
+    replies = [request(daemon.path, {"path": str(script)}) for _ in range(3)]
+    assert [(reply["output"], reply["cached"]) for reply in replies] == [
+        ("1.0\n", False),
+        ("1.0\n", True),
+        ("1.0\n", True),
+    ]
+
+    script.write_text("print 2;")
+    os.utime(script, ns=(0, script.stat().st_mtime_ns + 1))
+    reply = request(daemon.path, {"path": str(script)})
+    assert (reply["output"], reply["cached"]) == ("2.0\n", False)
+
+
+def test_evicts_least_recently_used(daemon: Daemon):
+    for source in ["print 1;", "print 2;", "print 1;", "print 3;"]:
+        request(daemon.path, {"source": source})
+
+    assert len(daemon.cache) == 2
+    assert request(daemon.path, {"source": "print 1;"})["cached"]
+    assert not request(daemon.path, {"source": "print 2;"})["cached"]
+    assert (daemon.cache.hits, daemon.cache.misses) == (2, 4)
+
+
+def test_runs_requests_concurrently(daemon: Daemon):
+    source = "var total = 0; for (var i = 0; i < 1000; i = i + 1) total = total + i; print total;"
+
+    with ThreadPoolExecutor(8) as pool:
+        replies = list(
+            pool.map(lambda _: request(daemon.path, {"source": source}), range(32))
+        )
+
+    assert {reply["output"] for reply in replies} == {"499500.0\n"}
+
+
+def test_rejects_malformed_requests(daemon: Daemon):
+    reply = request(daemon.path, {})
+    assert reply["status"] == PROTOCOL_ERROR_STATUS
+    assert request(daemon.path, {"source": "print 1;"})["output"] == "1.0\n"
+
+
+def test_client(daemon: Daemon, tmp_path, capsys, monkeypatch):
+    script = tmp_path / "script.lox"
+    script.write_text('print "before"; print nil + 1;')
+    socket = ["--socket", str(daemon.path)]
+
+    assert client.main([str(script), *socket]) == RUNTIME_ERROR_STATUS
+    out, err = capsys.readouterr()
+    assert out == "before\n"
+    assert err.startswith("Runtime error")
+
+    monkeypatch.setattr("sys.stdin", io.StringIO("print 3;"))
+    assert client.main(["-", *socket]) == 0
+    assert capsys.readouterr().out == "3.0\n"
+
+    assert client.main(["missing.lox", *socket]) == 1
+    assert "FileNotFoundError" in capsys.readouterr().err
+
+    assert client.main(["-", "--socket", str(tmp_path / "none.sock")]) == 1
+    assert "Cannot reach" in capsys.readouterr().err
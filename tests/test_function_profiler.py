@@ -0,0 +1,121 @@
+import pstats
+
+from jlox.function_profiler import FunctionProfiler, format_profile
+from jlox.interpreter import Interpreter
+from jlox.lox_function import LoxFunction
+from jlox.main import run, run_file
+from jlox.pass_manager import PassManager
+
+source = """
+fun fact(n) {
+    if (n < 2) return 1;
+    return n * fact(n - 1);
+}
+class Point {
+    init(x) { this.x = x; }
+}
+var twice = fun (x) { return x * 2; };
+for (var i = 0; i < 30; i = i + 1) {
+    fact(5);
+    Point(twice(i));
+}
+clock();
+"""
+
+
+def profile(tiering: bool = True) -> FunctionProfiler:
+    profiler = FunctionProfiler("test.lox")
+    with profiler.profiling():
+        run(source, Interpreter(tiering=tiering), passes=PassManager.for_level(0))
+    return profiler
+
+
+def by_name(profiler: FunctionProfiler) -> dict[str, tuple[int, int]]:
+    return {
+        stats.name: (stats.calls, stats.primitive_calls) for stats in profiler.stats()
+    }
+
+
+def test_counts_calls_of_every_kind():
+    for tiering in (False, True):
+        assert by_name(profile(tiering)) == {
+            "fact (test.lox:2)": (150, 30),
+            "<class Point> (test.lox:0)": (30, 30),
+            "init (test.lox:7)": (30, 30),
+            "<anonymous> (test.lox:9)": (30, 30),
+            "<native ClockFunc>": (1, 1),
+        }
+
+    # The calls are only wrapped while profiling.
+    assert "profiled_call" not in LoxFunction.call.__qualname__
+
+
+def test_recursion_is_not_counted_twice():
+    profiler = profile()
+    fact = next(stats for stats in profiler.stats() if stats.key[2] == "fact")
+
+    assert fact.exclusive <= fact.inclusive
+    assert sum(stats.inclusive for stats in profiler.stats()) <= (
+        profiler.script.inclusive
+    )
+    assert fact.callers[profiler.script.key].calls == 30
+    assert fact.callers[fact.key].calls == 120
+
+
+def test_runtime_errors_end_the_profile(capsys):
+    profiler = FunctionProfiler()
+    with profiler.profiling():
+        run(
+            "fun f() { return 1 + nil; } f();",
+            Interpreter(),
+            passes=PassManager.for_level(0),
+        )
+
+    assert "Runtime error" in capsys.readouterr().out
+    assert [stats.calls for stats in profiler.stats()] == [1]
+    assert "f (<script>:1)" in format_profile(profiler)
+
+
+def test_dump_loads_in_pstats(tmp_path):
+    path = tmp_path / "test.prof"
+    profile().dump_stats(path)
+
+    stats = pstats.Stats(str(path))
+    assert stats.total_calls == 242
+    assert stats.prim_calls == 122
+    assert ("test.lox", 2, "fact") in stats.stats
+
+
+def test_specialized_clones_are_their_function():
+    profiler = FunctionProfiler("test.lox")
+    with profiler.profiling():
+        run(
+            """
+            fun scale(x, factor) {
+                if (factor == 1) return x;
+                return x * factor;
+            }
+            for (var i = 0; i < 10; i = i + 1) {
+                scale(i, 1); scale(i, 2); scale(i, 3);
+            }
+            """,
+            Interpreter(),
+            passes=PassManager.for_level(2),
+        )
+
+    assert by_name(profiler) == {"scale (test.lox:2)": (30, 30)}
+
+
+def test_profiles_the_source_as_written(tmp_path, capsys):
+    # At -O2 twice would be inlined into the loop, and never called.
+    script = tmp_path / "script.lox"
+    script.write_text("""
+fun twice(x) { return x * 2; }
+var total = 0;
+for (var i = 0; i < 10; i = i + 1) total = total + twice(i);
+""")
+    profiler = FunctionProfiler(str(script))
+
+    run_file(str(script), passes=PassManager.for_level(2), profiler=profiler)
+
+    assert by_name(profiler) == {f"twice ({script}:2)": (10, 10)}
@@ -0,0 +1,133 @@
+from typing import Any
+
+import pytest
+
+from jlox.errors import JloxRuntimeError
+from jlox.hooks import Event, InstrumentedInterpreter
+from jlox.interpreter import Interpreter
+from jlox.parser import Parser
+from jlox.pass_manager import PassManager
+from jlox.resolver import Resolver
+from jlox.scanner import Scanner
+
+source = """
+class Counter {
+    init() { this.count = 0; }
+    add(n) { this.count = this.count + n; return this.count; }
+}
+var counter = Counter();
+for (var i = 0; i < 3; i = i + 1) {
+    counter.add(i);
+}
+print counter.count;
+"""
+
+
+def run(interpreter: Interpreter, source: str, level: int = 0) -> None:
+    statements = PassManager.for_level(level).run(
+        Parser(Scanner(source).scan_tokens()).parse()
+    )
+    Resolver(interpreter).resolve(statements)
+    interpreter.interpret(statements)
+
+
+def record(interpreter: Interpreter) -> list[tuple[Event, Any]]:
+    events = []
+
+    def listener(event: Event):
+        return lambda *args: events.append((event, args))
+
+    for event in Event:
+        interpreter.add_hook(event, listener(event))
+
+    return events
+
+
+def describe(value: Any) -> Any:
+    return value if isinstance(value, float) else type(value).__name__
+
+
+def summary(events: list[tuple[Event, Any]]) -> list[tuple[str, Any]]:
+    result = []
+    for event, args in events:
+        match event, args:
+            case Event.FUNCTION_ENTER, (declaration, _):
+                result.append(("enter", declaration.name.lexeme))
+            case Event.FUNCTION_EXIT, (declaration, value):
+                result.append(("exit", declaration.name.lexeme, value))
+            case Event.INSTANCE_CREATED, (instance,):
+                result.append(("new", str(instance)))
+            case Event.PROPERTY_GET | Event.PROPERTY_SET, (_, name, value):
+                kind = "get" if event == Event.PROPERTY_GET else "set"
+                result.append((kind, name.lexeme, describe(value)))
+    return result
+
+
+# Optimized programs run fewer statements, counting loops for one have no
+# separate increment.
+@pytest.mark.parametrize("level, statements", [(0, 25), (2, 18)])
+def test_reports_events(level, statements, capsys):
+    interpreter = Interpreter()
+    events = record(interpreter)
+    run(interpreter, source, level)
+
+    assert capsys.readouterr().out == "3.0\n"
+    assert sum(event == Event.STATEMENT for event, _ in events) == statements
+    assert summary(events)[:8] == [
+        ("enter", "init"),
+        ("set", "count", 0.0),
+        ("exit", "init", None),
+        ("new", "Counter instance"),
+        ("get", "add", "LoxFunction"),
+        ("enter", "add"),
+        ("get", "count", 0.0),
+        ("set", "count", 0.0),
+    ]
+    assert summary(events)[-3:] == [
+        ("get", "count", 3.0),
+        ("exit", "add", 3.0),
+        ("get", "count", 3.0),
+    ]
+
+
+def test_reports_runtime_errors():
+    interpreter = Interpreter()
+    errors = []
+    interpreter.add_hook(Event.RUNTIME_ERROR, errors.append)
+
+    with pytest.raises(JloxRuntimeError) as e:
+        run(interpreter, "fun f() { return nil.x; } f();")
+
+    assert errors == [e.value]
+
+
+def test_class_is_swapped_only_while_hooked():
+    interpreter = Interpreter()
+    tiers = interpreter._tiers
+
+    def listener(stmt):
+        pass
+
+    interpreter.add_hook(Event.STATEMENT, listener)
+    assert isinstance(interpreter, InstrumentedInterpreter)
+    assert interpreter._tiers is None
+
+    interpreter.remove_hook(Event.STATEMENT, listener)
+    assert type(interpreter) is Interpreter
+    assert interpreter._tiers is tiers
+
+
+def test_listeners_can_remove_themselves(capsys):
+    interpreter = Interpreter()
+    seen = []
+
+    def once(stmt):
+        seen.append(stmt)
+        interpreter.remove_hook(Event.STATEMENT, once)
+
+    interpreter.add_hook(Event.STATEMENT, once)
+    run(interpreter, source)
+
+    assert len(seen) == 1
+    assert type(interpreter) is Interpreter
+    assert capsys.readouterr().out == "3.0\n"
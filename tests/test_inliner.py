@@ -0,0 +1,117 @@
+import pytest
+
+from jlox.ast_utils import walk
+from jlox.errors import JloxRuntimeError
+from jlox.expression import InlinedCallExpr, InlinedGetterExpr
+from jlox.inliner import inline_calls
+from jlox.interpreter import Interpreter
+from jlox.parser import Parser
+from jlox.resolver import Resolver
+from jlox.scanner import Scanner
+from jlox.statement import Stmt
+from jlox.tiering import TierController
+
+
+def parse(source: str) -> list[Stmt]:
+    return Parser(Scanner(source).scan_tokens()).parse()
+
+
+def run(interpreter: Interpreter, statements: list[Stmt]):
+    Resolver(interpreter).resolve(statements)
+    interpreter.interpret(statements)
+
+
+def inlined(source: str) -> list[str]:
+    return [
+        type(node).__name__
+        for node in walk(inline_calls(parse(source)))
+        if isinstance(node, (InlinedCallExpr, InlinedGetterExpr))
+    ]
+
+
+def test_inlines_small_functions_and_getters():
+    assert inlined("fun sq(x) { return x * x; } print sq(2);") == ["InlinedCallExpr"]
+    assert inlined(
+        "class A { get() { return this.a; } } var a = A(); print a.get();"
+    ) == ["InlinedGetterExpr"]
+
+
+def test_leaves_other_calls_alone():
+    for source in [
+        # Reassigned.
+        "fun sq(x) { return x * x; } sq = nil; print sq(2);",
+        # More than a single return.
+        "fun sq(x) { print x; return x * x; } print sq(2);",
+        # Calls something.
+        "fun f(x) { return x + clock(); } print f(1);",
+        # The argument would be evaluated twice.
+        "fun sq(x) { return x * x; } print sq(clock());",
+        # The argument is not evaluated on every path.
+        "fun pick(c, a) { return c and a; } print pick(false, 1);",
+        # k could be shadowed where sq is called.
+        "var k = 2; fun sq(x) { return k * x; } fun f(k) { return sq(k); }",
+        # Not a getter in every class.
+        "class A { v() { return this.a; } } class B { v() { return 1; } } A().v();",
+    ]:
+        assert not inlined(source), source
+
+
+lox_program = """
+fun sq(x) { return x * x; }
+fun mix(a, b) { return (a + b) / 2; }
+class Point {
+    init(x) { this.x = x; }
+    getX() { return this.x; }
+}
+class Shadow < Point {
+    init(x) { super.init(x); this.getX = fun () { return -1; }; }
+}
+
+var total = 0;
+var points = Point(2);
+for (var i = 0; i < 20; i = i + 1) {
+    total = total + sq(i) + mix(i, sq(2)) + points.getX();
+}
+print total;
+print Shadow(5).getX();
+"""
+
+
+def test_inlined_program_matches_original(capsys: pytest.CaptureFixture[str]):
+    run(Interpreter(tiering=False), parse(lox_program))
+    expected = capsys.readouterr().out
+
+    statements = inline_calls(parse(lox_program))
+    assert inlined(lox_program) == [
+        "InlinedCallExpr",
+        "InlinedCallExpr",
+        "InlinedGetterExpr",
+        "InlinedGetterExpr",
+    ]
+
+    run(Interpreter(tiering=False), statements)
+    assert capsys.readouterr().out == expected
+
+    interpreter = Interpreter()
+    interpreter._tiers = TierController(interpreter, loop_threshold=2)
+    run(interpreter, inline_calls(parse(lox_program)))
+    assert capsys.readouterr().out == expected
+
+
+def test_guard_falls_back_when_function_is_redefined(
+    capsys: pytest.CaptureFixture[str],
+):
+    interpreter = Interpreter(tiering=False)
+
+    run(
+        interpreter,
+        inline_calls(parse("fun sq(x) { return x * x; } fun use() { return sq(3); }")),
+    )
+    assert inlined("fun sq(x) { return x * x; } fun use() { return sq(3); }")
+
+    run(interpreter, inline_calls(parse("print use();")))
+    run(interpreter, inline_calls(parse("fun sq(x) { return x + 1; } print use();")))
+    assert capsys.readouterr().out == "9.0\n4.0\n"
+
+    with pytest.raises(JloxRuntimeError):
+        run(interpreter, inline_calls(parse("print use().field;")))
@@ -0,0 +1,116 @@
+from jlox.ir import (
+    Branch,
+    Return,
+    dominates,
+    immediate_dominators,
+    liveness,
+    lower_all,
+    lower_function,
+    lower_program,
+    to_dot,
+)
+from jlox.parser import Parser
+from jlox.scanner import Scanner
+from jlox.statement import FunctionStmt, Stmt
+
+
+def parse(source: str) -> list[Stmt]:
+    return Parser(Scanner(source).scan_tokens()).parse()
+
+
+def parse_function(source: str) -> FunctionStmt:
+    [function] = parse(source)
+    assert isinstance(function, FunctionStmt)
+    return function
+
+
+loop_function = """
+fun f(n) {
+    var total = 0;
+    var unused = 5;
+    for (var i = 0; i < n; i = i + 1) {
+        if (i == 3) break;
+        total = total + i;
+    }
+    return total;
+    print "unreachable";
+}
+"""
+
+
+def test_lowers_loops_and_prunes_unreachable_code():
+    cfg = lower_function(parse_function(loop_function))
+
+    assert [param.name for param in cfg.params] == ["n"]
+    assert len([b for b in cfg.blocks if isinstance(b.terminator, Branch)]) == 2
+    assert len([b for b in cfg.blocks if isinstance(b.terminator, Return)]) == 1
+    assert "unreachable" not in to_dot(cfg)
+
+
+def test_dominators():
+    cfg = lower_function(parse_function(loop_function))
+    idom = immediate_dominators(cfg)
+
+    assert idom[cfg.entry] is cfg.entry
+    assert all(dominates(idom, cfg.entry, block) for block in cfg.blocks)
+
+    # The loop header dominates the end of the body that jumps back to it.
+    header = cfg.entry.successors[0]
+    [latch] = [b for b in cfg.blocks if header in b.successors and b is not cfg.entry]
+    assert dominates(idom, header, latch)
+    assert not dominates(idom, latch, header)
+
+    # The loop exit is reached from the header and from the break.
+    [exit_block] = [b for b in cfg.blocks if isinstance(b.terminator, Return)]
+    preds = cfg.predecessors()[exit_block]
+    assert len(preds) == 2
+    assert idom[exit_block] is header
+
+
+def test_liveness():
+    cfg = lower_function(parse_function(loop_function))
+    live = liveness(cfg)
+
+    assert {str(v) for v in live.live_in[cfg.entry]} == {"n.0"}
+
+    live_out = {str(v) for v in live.live_out[cfg.entry]}
+    assert live_out == {"n.0", "total.1", "i.3"}
+
+    [exit_block] = [b for b in cfg.blocks if isinstance(b.terminator, Return)]
+    assert {str(v) for v in live.live_in[exit_block]} == {"total.1"}
+
+
+def test_captured_variables_are_used_where_the_closure_is_created():
+    cfg = lower_function(
+        parse_function(
+            "fun counter() { var n = 0; fun inc() { n = n + 1; return n; } return inc; }"
+        )
+    )
+
+    assert {str(v) for v in cfg.captured} == {"n.0"}
+    assert {str(v) for v in liveness(cfg).live_out[cfg.entry]} == set()
+
+
+program = """
+var x = 1;
+if (x > 0) print x; else print -x;
+class A { m() { return fun () { return 1; }; } }
+fun g() {}
+"""
+
+
+def test_program_and_functions_get_graphs():
+    graphs = lower_all(parse(program))
+
+    assert [cfg.name for cfg in graphs] == ["<script>", "A.m", "<anonymous 1>", "g"]
+
+    script = graphs[0]
+    assert len(script.blocks) == 4
+    assert liveness(script).live_in[script.entry] == set()
+
+    dot = to_dot(script)
+    assert dot.startswith('digraph "<script>" {')
+    assert '[label="true"]' in dot and '[label="false"]' in dot
+
+    empty = lower_program([]).entry.terminator
+    assert isinstance(empty, Return) and empty.value is None
@@ -0,0 +1,162 @@
+import asyncio
+import io
+import subprocess
+import sys
+import time
+
+import pytest
+
+import jlox
+from jlox.ast_utils import walk
+from jlox.batch import run_script
+from jlox.errors import JloxRuntimeError
+from jlox.expression import InlinedCallExpr, InlinedGetterExpr
+from jlox.coverage import Coverage
+from jlox.function_profiler import FunctionProfiler
+from jlox.limits import ExecutionLimitExceeded, ExecutionLimits
+from jlox.main import run_file
+from jlox.pass_manager import PASSES, PassManager
+
+counted = """
+fun add(a, b) { return a + b; }
+var total = 0;
+for (var i = 0; i < 300; i = i + 1) {
+    total = add(total, i);
+}
+var j = 0;
+while (j < 300) j = j + 1;
+"""
+
+spinning = """
+fun spin() {
+    while (true) {}
+}
+fun outer() {
+    spin();
+}
+outer();
+"""
+
+
+@pytest.mark.parametrize("tiering", [False, True], ids=["tree", "tiered"])
+def test_charges_statements_in_both_tiers(tiering: bool):
+    limits = ExecutionLimits(fuel=10_000)
+    result = jlox.compile(counted, 0).run(tiering=tiering, limits=limits)
+
+    assert result["total"] == 44850.0
+    # The desugared for loop runs its body, the block in it, the assignment
+    # and the increment, the calls one plus their return, and the while loop
+    # its assignment.
+    assert limits.fuel == 10_000 - 300 * 4 - 300 * 2 - 300
+
+
+@pytest.mark.parametrize("tiering", [False, True], ids=["tree", "tiered"])
+@pytest.mark.parametrize("level", [0, 2])
+def test_stops_infinite_loops(tiering: bool, level: int):
+    program = jlox.compile(spinning, level)
+
+    with pytest.raises(ExecutionLimitExceeded) as info:
+        program.run(tiering=tiering, limits=ExecutionLimits(fuel=100_000))
+
+    assert isinstance(info.value, JloxRuntimeError)
+    assert info.value.stack == [
+        "[line 2] in spin",
+        "[line 6] in outer",
+        "[line 8] in <script>",
+    ]
+    assert str(info.value).startswith("Ran out of fuel.\n[line 2] in spin")
+
+
+def test_stops_at_deadline():
+    program = jlox.compile("var n = 0; while (true) n = n + 1;")
+
+    start = time.monotonic()
+    with pytest.raises(ExecutionLimitExceeded, match="Ran past the deadline"):
+        program.run(stdout=io.StringIO(), limits=ExecutionLimits(timeout=0.05))
+
+    assert time.monotonic() - start < 1
+
+
+def test_batch_limits(tmp_path):
+    script = tmp_path / "spin.lox"
+    script.write_text(spinning)
+
+    result = run_script(script, 0, True, fuel=1000)
+    assert result.error is not None
+    assert result.error.startswith("Runtime error: Ran out of fuel.")
+
+
+@pytest.mark.parametrize("mode", ["record_profile", "count", "profiler", "coverage"])
+def test_limits_every_kind_of_run(mode, tmp_path, capsys):
+    script = tmp_path / "spin.lox"
+    script.write_text(spinning)
+    options = {
+        "record_profile": {"record_profile": True},
+        "count": {"count": True},
+        "profiler": {"profiler": FunctionProfiler(str(script))},
+        "coverage": {"coverage": Coverage(str(script))},
+    }[mode]
+
+    run_file(str(script), limits=ExecutionLimits(fuel=1000), **options)
+    assert capsys.readouterr().out.startswith("Runtime error: Ran out of fuel.")
+
+
+def test_rejects_flags_that_do_not_go_together(tmp_path):
+    script = tmp_path / "script.lox"
+    script.write_text("print 1;")
+
+    def jlox(*arguments: str) -> subprocess.CompletedProcess[str]:
+        return subprocess.run(
+            [sys.executable, "-m", "jlox.main", str(script), *arguments],
+            capture_output=True,
+            text=True,
+        )
+
+    for arguments, error in [
+        (["--count", "--profile"], "--count cannot be used with --profile"),
+        (["--dump-cfg", "--fuel", "10"], "--fuel cannot be used with --dump-cfg"),
+        (["--coverage", "--save-snapshot", "x"], "--save-snapshot cannot be used"),
+        (["--profile-out", "x.prof"], "--profile-out needs --profile"),
+    ]:
+        result = jlox(*arguments)
+        assert result.returncode == 2
+        assert error in result.stderr
+
+    assert jlox("--count", "--fuel", "10").returncode == 0
+
+
+inlined = """
+fun add(a, b) { return a + b; }
+class Box {
+    init(value) { this.value = value; }
+    get() { return this.value; }
+}
+var box = Box(1);
+var total = 0;
+var j = 0;
+while (j < 300) {
+    total = add(total, 1) + box.get() - 1;
+    j = j + 1;
+}
+"""
+
+
+@pytest.mark.parametrize("mode", ["tree", "tiered", "async"])
+def test_charges_inlined_calls(mode: str):
+    def fuel_used(passes: PassManager) -> float:
+        program = jlox.compile(inlined, passes=passes)
+        limits = ExecutionLimits(fuel=100_000)
+        if mode == "async":
+            result = asyncio.run(program.run_async(limits=limits))
+        else:
+            result = program.run(tiering=mode == "tiered", limits=limits)
+        assert result["total"] == 300.0
+        return 100_000 - limits.fuel
+
+    inlining = PassManager()
+    inlining.add_pass("inline", PASSES["inline"])
+
+    program = jlox.compile(inlined, passes=inlining)
+    assert any(isinstance(node, InlinedCallExpr) for node in walk(program.statements))
+    assert any(isinstance(node, InlinedGetterExpr) for node in walk(program.statements))
+    assert fuel_used(inlining) == fuel_used(PassManager())
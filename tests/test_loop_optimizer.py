@@ -0,0 +1,139 @@
+import pytest
+
+import jlox
+
+from jlox.ast_utils import walk
+from jlox.counting_loops import specialize_counting_loops
+from jlox.expression import CachedExpr
+from jlox.interpreter import Interpreter
+from jlox.loop_optimizer import optimize_loops
+from jlox.parser import Parser
+from jlox.resolver import Resolver
+from jlox.scanner import Scanner
+from jlox.snapshot import load_snapshot, save_snapshot
+from jlox.statement import BlockStmt, Stmt, VarStmt
+from jlox.tiering import TierController
+
+
+def parse(source: str) -> list[Stmt]:
+    return Parser(Scanner(source).scan_tokens()).parse()
+
+
+def run(interpreter: Interpreter, statements: list[Stmt]):
+    Resolver(interpreter).resolve(statements)
+    interpreter.interpret(statements)
+
+
+def cached(statements: list[Stmt]) -> list[str]:
+    return [
+        node.name.lexeme for node in walk(statements) if isinstance(node, CachedExpr)
+    ]
+
+
+hoisting_program = """
+var w = 3; var h = 4; var total = 0; var i = 0;
+while (i < 10) { total = total + w * h; i = i + 1; }
+"""
+
+
+def test_hoists_invariants_before_the_loop():
+    statements = optimize_loops(parse(hoisting_program))
+
+    # At the top level the cache is kept out of the globals by a block.
+    scope = statements[4]
+    assert isinstance(scope, BlockStmt)
+    hoisted = scope.statements[0]
+    assert isinstance(hoisted, VarStmt)
+    assert hoisted.name.lexeme == "$licm0"
+    assert cached(statements) == ["$licm0"]
+
+
+def test_keeps_caches_out_of_the_globals(tmp_path):
+    result = jlox.compile(hoisting_program, 2).run()
+    assert result["total"] == 120.0
+    assert not [name for name in result if "$" in name]
+
+    interpreter = Interpreter()
+    jlox.compile(hoisting_program, 2).run_in(interpreter)
+    save_snapshot(interpreter, tmp_path / "snapshot")
+    restored = load_snapshot(tmp_path / "snapshot").globals._values
+    assert restored["total"] == 120.0
+    assert not [name for name in restored if "$" in name]
+
+
+call_program = """
+var w = 1;
+fun grow() { w = w + 1; }
+while (w < 10) { print w * 2; grow(); }
+"""
+
+
+def test_leaves_changing_operands_alone():
+    for source in [
+        "var i = 0; while (i < 10) { print i * 2; i = i + 1; }",
+        "while (true) { var w = 1; print w * 2; }",
+        # A call could assign w, so w * 2 has to be recomputed after it.
+        call_program,
+    ]:
+        assert not cached(optimize_loops(parse(source)))
+
+
+sharing_program = """
+var i = 0;
+while (i < 10) {
+    print i * i + 1;
+    print i * i + 1;
+    i = i + 1;
+    print i * i + 1;
+}
+"""
+
+
+def test_shares_repeated_expressions_in_straight_line_code():
+    statements = optimize_loops(parse(sharing_program))
+
+    # The third occurrence comes after i changes.
+    assert cached(statements) == ["$cse0", "$cse0"]
+
+
+lox_program = """
+var w = 3;
+var h = 4;
+var total = 0;
+for (var i = 0; i < 6; i = i + 1) {
+    var a = i * (w * h - 1);
+    total = total + a + i * (w * h - 1);
+    if (i == 3) w = w + 1;
+    print w * h + i;
+}
+print total;
+
+fun bump() { h = h + 1; }
+var j = 0;
+while (j < w - 1) {
+    print h * 2 + h * 2;
+    bump();
+    print h * 2;
+    j = j + 1;
+}
+
+for (var k = 0; k < 3; k = k + 1) {
+    for (var m = 0; m < 3; m = m + 1) print k * w + m * (w - 1);
+}
+"""
+
+
+def test_optimized_program_matches_original(capsys: pytest.CaptureFixture[str]):
+    run(Interpreter(tiering=False), parse(lox_program))
+    expected = capsys.readouterr().out
+
+    statements = optimize_loops(specialize_counting_loops(parse(lox_program)))
+    assert cached(statements)
+
+    run(Interpreter(tiering=False), statements)
+    assert capsys.readouterr().out == expected
+
+    interpreter = Interpreter()
+    interpreter._tiers = TierController(interpreter, loop_threshold=2)
+    run(interpreter, optimize_loops(specialize_counting_loops(parse(lox_program))))
+    assert capsys.readouterr().out == expected
@@ -0,0 +1,78 @@
+import io
+
+from jlox.ast_printer import AstPrinter
+from jlox.expression import ExprVisitor
+from jlox.parser import Parser
+from jlox.pass_manager import PassManager, format_stats
+from jlox.scanner import Scanner
+from jlox.statement import CountingLoopStmt, Stmt, StmtVisitor
+
+
+def parse(source: str) -> list[Stmt]:
+    return Parser(Scanner(source).scan_tokens()).parse()
+
+
+lox_program = """
+fun sq(x) { return x * x; }
+class A < B { get() { return this.a; } set(v) { this.a = v; super.set(v); } }
+var total = 0;
+for (var i = 0; i < 10; i = i + 1) {
+    if (i == 3) break; else total = total + sq(i) + (-i, !true ? 1 : nil);
+}
+while (total > 0 or false) total = total - 1;
+print fun (a) { return; };
+print "done";
+"""
+
+
+def test_levels_choose_passes():
+    assert PassManager.for_level(0).pass_names == []
+    assert PassManager.for_level(1).pass_names == ["counting-loops"]
+    assert PassManager.for_level(2).pass_names == [
+        "counting-loops",
+        "inline",
+        "licm-cse",
+        "specialize",
+    ]
+
+    assert PassManager.for_level(0).run(parse(lox_program)) == parse(lox_program)
+
+
+def test_records_stats_and_dumps_trees():
+    dump = io.StringIO()
+    passes = PassManager.for_level(2, print_after=["counting-loops"], dump=dump)
+
+    statements = passes.run(parse(lox_program))
+
+    assert any(isinstance(stmt, CountingLoopStmt) for stmt in statements)
+    assert [stats.name for stats in passes.stats] == passes.pass_names
+    assert passes.stats[0].nodes_after < passes.stats[0].nodes_before
+
+    output = dump.getvalue()
+    assert output.startswith(";; after counting-loops\n")
+    assert "(counting-loop (var i 0.0) (< i 10.0) (= i (+ i 1.0))" in output
+
+    assert format_stats(passes.stats).splitlines()[1].startswith("counting-loops")
+
+
+def test_custom_passes_run_after_presets():
+    passes = PassManager.for_level(0)
+    passes.add_pass("drop-prints", lambda statements: statements[:-1])
+
+    assert len(passes.run(parse(lox_program))) == len(parse(lox_program)) - 1
+
+
+def test_printer_covers_every_node():
+    visit_methods = [
+        name
+        for visitor in (ExprVisitor, StmtVisitor)
+        for name in vars(visitor)
+        if name.startswith("visit")
+    ]
+
+    assert all(name in vars(AstPrinter) for name in visit_methods)
+
+    printed = AstPrinter().print_program(parse(lox_program))
+    assert "(class A < B" in printed
+    assert "(.= this a v)" in printed
+    assert '(print "done")' in printed
@@ -0,0 +1,69 @@
+import dataclasses
+import io
+
+import pytest
+
+import jlox
+from jlox.errors import JloxRuntimeError, JloxSyntaxError
+
+source = """
+fun fib(n) {
+    if (n < 2) return n;
+    return fib(n - 1) + fib(n - 2);
+}
+var result = fib(n);
+print greeting + " " + name;
+"""
+
+
+@pytest.fixture(scope="module")
+def program() -> jlox.Program:
+    return jlox.compile(source)
+
+
+@pytest.mark.parametrize("tiering", [False, True], ids=["tree", "tiered"])
+def test_runs_many_times(program: jlox.Program, tiering: bool):
+    for n, name in [(10, "Ada"), (15, "Grace"), (10, "Alan")]:
+        stdout = io.StringIO()
+        result = program.run(
+            {"n": n, "greeting": "hello", "name": name}, stdout, tiering=tiering
+        )
+
+        assert stdout.getvalue() == f"hello {name}\n"
+        assert result["result"] == {10: 55.0, 15: 610.0}[n]
+        assert "fib" in result and "clock" in result
+
+
+def test_calls_host_functions():
+    calls = []
+
+    def record(value, scale=2):
+        calls.append(value)
+        return len(calls) * scale
+
+    stdout = io.StringIO()
+    jlox.compile("print record(1) + record(true);").run({"record": record}, stdout)
+
+    assert calls == [1.0, True]
+    assert stdout.getvalue() == "6.0\n"
+
+
+def test_is_immutable(program: jlox.Program):
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        program.statements = ()  # type: ignore[misc]
+    with pytest.raises(TypeError):
+        program.locals[program.statements[0]] = 0  # type: ignore[index]
+
+    locals_before = dict(program.locals)
+    program.run({"n": 3, "greeting": "hi", "name": "there"}, io.StringIO())
+    assert dict(program.locals) == locals_before
+
+
+def test_raises_errors():
+    with pytest.raises(JloxSyntaxError):
+        jlox.compile("print (;")
+
+    program = jlox.compile("print missing;")
+    with pytest.raises(JloxRuntimeError):
+        program.run(stdout=io.StringIO())
+    assert program.run({"missing": 1}, io.StringIO())["missing"] == 1.0
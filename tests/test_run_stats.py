@@ -0,0 +1,52 @@
+from jlox.interpreter import Interpreter
+from jlox.main import measure
+from jlox.pass_manager import PassManager
+from jlox.run_stats import RunStats, format_run_stats
+
+lox_program = """
+var items = "";
+for (var i = 0; i < 100; i = i + 1) items = items + "item";
+print items == "";
+"""
+
+
+def test_measures_every_phase(capsys):
+    stats = measure(lox_program)
+
+    assert capsys.readouterr().out == "False\n"
+    assert [phase.name for phase in stats.phases] == [
+        "scan",
+        "parse",
+        "optimize",
+        "resolve",
+        "infer-types",
+        "interpret",
+    ]
+    assert stats.tokens == 34
+    assert stats.nodes > 0
+    assert all(phase.peak_memory is None for phase in stats.phases)
+    assert stats.seconds == sum(phase.seconds for phase in stats.phases)
+
+
+def test_traces_memory_per_phase(capsys):
+    stats = measure(
+        lox_program, Interpreter(tiering=False), PassManager.for_level(0), memory=True
+    )
+
+    assert "infer-types" not in [phase.name for phase in stats.phases]
+    interpret = stats.phase_stats("interpret")
+    assert interpret is not None and interpret.peak_memory is not None
+    # The string grows to 400 characters.
+    assert interpret.peak_memory > 400
+
+    report = format_run_stats(stats).splitlines()
+    assert report[0].split() == ["phase", "time", "(ms)", "peak", "memory"]
+    assert report[-1] == f"34 tokens, {stats.nodes} AST nodes"
+
+
+def test_errors_end_the_run_early(capsys):
+    stats = measure("print 1 +;")
+
+    assert capsys.readouterr().out.startswith("Syntax error")
+    assert [phase.name for phase in stats.phases] == ["scan", "parse"]
+    assert RunStats().phase_stats("scan") is None
@@ -0,0 +1,64 @@
+import json
+
+import pytest
+
+from jlox.interpreter import Interpreter
+from jlox.main import run
+from jlox.pass_manager import PassManager
+from jlox.sampling_profiler import SPEEDSCOPE_SCHEMA, SamplingProfiler
+
+source = """
+fun fib(n) {
+    if (n < 2) return n;
+    return fib(n - 2) + fib(n - 1);
+}
+var start = clock();
+while (clock() - start < 0.1) {
+    fib(12);
+}
+"""
+
+
+@pytest.fixture(params=[False, True], ids=["tree", "tiered"])
+def profiler(request, capsys) -> SamplingProfiler:
+    profiler = SamplingProfiler(0.001, "test.lox")
+    with profiler.sampling():
+        run(
+            source,
+            Interpreter(tiering=request.param),
+            passes=PassManager.for_level(0),
+        )
+    return profiler
+
+
+def test_samples_lox_stacks(profiler: SamplingProfiler):
+    assert profiler.samples > 10
+
+    for stack in profiler.stacks:
+        (script, line), *calls = stack
+        assert script == ("test.lox", 0, "<script>")
+        assert line in (7, 8)
+        for key, line in calls:
+            assert key in [("test.lox", 2, "fib"), ("~", 0, "<native ClockFunc>")]
+            assert line in (2, 3, 4, None)
+
+
+def test_writes_collapsed_stacks(profiler: SamplingProfiler):
+    lines = profiler.collapsed().splitlines()
+
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == profiler.samples
+    assert any(line.startswith("<script>:8;fib:4;fib:") for line in lines)
+
+
+def test_writes_speedscope(profiler: SamplingProfiler, tmp_path):
+    path = tmp_path / "test.speedscope.json"
+    profiler.save_speedscope(path)
+    data = json.loads(path.read_text())
+
+    assert data["$schema"] == SPEEDSCOPE_SCHEMA
+    frames = data["shared"]["frames"]
+    [profile] = data["profiles"]
+    assert profile["type"] == "sampled"
+    assert len(profile["samples"]) == len(profile["weights"])
+    assert {"name": "<script>:8", "file": "test.lox", "line": 8} in frames
+    assert all(0 <= index < len(frames) for s in profile["samples"] for index in s)
@@ -0,0 +1,107 @@
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+from jlox.protocol import (
+    PROTOCOL_ERROR_STATUS,
+    RUNTIME_ERROR_STATUS,
+    SYNTAX_ERROR_STATUS,
+    receive_message,
+    request,
+)
+
+prelude = """
+var greeting = "hello";
+fun square(n) { return n * n; }
+class Greeter {
+    init(name) { this.name = name; }
+    greet() { return greeting + " " + this.name; }
+}
+"""
+
+
+@pytest.fixture(params=[True, False], ids=["fork", "no-fork"])
+def server(request, tmp_path):
+    (tmp_path / "prelude.lox").write_text(prelude)
+    path = tmp_path / "jlox.sock"
+    arguments = [str(path), "--prelude", str(tmp_path / "prelude.lox")]
+    if request.param:
+        arguments.append("--fork")
+
+    process = subprocess.Popen(
+        [sys.executable, "-m", "jlox.main", "serve", *arguments],
+        stderr=subprocess.PIPE,
+    )
+    assert process.stderr is not None
+    assert process.stderr.readline().startswith(b"Listening on")
+
+    yield path
+
+    process.terminate()
+    process.wait(5)
+
+
+def test_runs_scripts_with_prelude(server: Path, tmp_path):
+    assert request(server, {"source": 'print Greeter("Ada").greet();'}) == {
+        "output": "hello Ada\n",
+        "error": None,
+        "status": 0,
+    }
+
+    (tmp_path / "script.lox").write_text("print square(12);")
+    assert request(server, {"path": str(tmp_path / "script.lox")})["output"] == (
+        "144.0\n"
+    )
+
+
+def test_isolates_scripts(server: Path):
+    script = 'print greeting; greeting = "bye"; fun square(n) { return 0; }'
+    for _ in range(3):
+        assert request(server, {"source": script})["output"] == "hello\n"
+    assert request(server, {"source": "print square(3);"})["output"] == "9.0\n"
+
+
+def test_reports_errors(server: Path):
+    reply = request(server, {"source": 'print "before"; print nil + 1;'})
+    assert reply == {
+        "output": "before\n",
+        "error": "Runtime error: Operands must be two numbers or two strings",
+        "status": RUNTIME_ERROR_STATUS,
+    }
+
+    reply = request(server, {"source": "print (;"})
+    assert reply["status"] == SYNTAX_ERROR_STATUS
+
+    assert request(server, {"path": "missing.lox"})["status"] == 1
+
+    reply = request(server, {"source": 'print "before"; print 1 / 0;'})
+    assert reply["output"] == "before\n"
+    assert reply["status"] == 1
+    assert request(server, {"source": "print 1;"})["output"] == "1.0\n"
+
+
+def test_rejects_malformed_requests(server: Path):
+    for message in [{}, {"source": 1}, {"path": None}]:
+        reply = request(server, message)
+        assert reply["status"] == PROTOCOL_ERROR_STATUS
+        assert reply["error"].startswith("Protocol error:")
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(str(server))
+        connection.sendall(b"print 1;\n")
+        reply = receive_message(connection)
+    assert reply is not None and reply["status"] == PROTOCOL_ERROR_STATUS
+
+    assert request(server, {"source": "print 1;"})["output"] == "1.0\n"
+
+
+def test_serves_requests_quickly(server: Path):
+    start = time.perf_counter()
+    for _ in range(20):
+        request(server, {"source": "print square(2);"})
+
+    assert (time.perf_counter() - start) / 20 < 0.1
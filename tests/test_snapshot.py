@@ -0,0 +1,90 @@
+import subprocess
+import sys
+
+import pytest
+
+from jlox.interpreter import Interpreter
+from jlox.main import run
+from jlox.snapshot import SnapshotError, load_snapshot, save_snapshot
+
+setup = """
+fun counter() {
+    var count = 0;
+    fun increment() {
+        count = count + 1;
+        return count;
+    }
+    return increment;
+}
+
+class Shape {
+    init(name) { this.name = name; }
+    describe() { return this.name; }
+}
+class Square < Shape {
+    init(side) { super.init("square"); this.side = side; }
+    area() { return this.side * this.side; }
+}
+
+fun even(n) { if (n == 0) return true; return odd(n - 1); }
+fun odd(n) { if (n == 0) return false; return even(n - 1); }
+
+var next_id = counter();
+next_id();
+var square = Square(3);
+square.self = square;
+var table = nil;
+for (var i = 0; i < 20000; i = i + 1) {
+    var entry = Square(i);
+    entry.rest = table;
+    table = entry;
+}
+"""
+
+work = """
+print next_id();
+print square.self.self.describe();
+print square.area();
+print table.rest.rest.side;
+print even(10);
+print next_id();
+"""
+
+
+def test_round_trips_globals(tmp_path, capsys):
+    recursion_limit = sys.getrecursionlimit()
+    interpreter = Interpreter()
+    run(setup, interpreter)
+    save_snapshot(interpreter, tmp_path / "setup.snap")
+    # The long list of instances is written without deep recursion.
+    assert sys.getrecursionlimit() == recursion_limit
+
+    for tiering in [False, True]:
+        run(work, load_snapshot(tmp_path / "setup.snap", tiering))
+        assert capsys.readouterr().out == "2.0\nsquare\n9.0\n19997.0\nTrue\n3.0\n"
+
+
+def test_restores_in_another_process(tmp_path):
+    (tmp_path / "setup.lox").write_text(setup)
+    (tmp_path / "work.lox").write_text(work)
+    snapshot = str(tmp_path / "setup.snap")
+
+    def jlox(*arguments: str) -> str:
+        return subprocess.run(
+            [sys.executable, "-m", "jlox.main", *arguments],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+    assert jlox(str(tmp_path / "setup.lox"), "--save-snapshot", snapshot) == ""
+    assert jlox(str(tmp_path / "work.lox"), "--load-snapshot", snapshot) == (
+        "2.0\nsquare\n9.0\n19997.0\nTrue\n3.0\n"
+    )
+
+
+def test_rejects_what_it_cannot_save(tmp_path):
+    interpreter = Interpreter()
+    interpreter.globals.define("host", lambda: None)
+    with pytest.raises(SnapshotError):
+        save_snapshot(interpreter, tmp_path / "host.snap")
@@ -0,0 +1,99 @@
+from jlox.ast_printer import AstPrinter
+from jlox.interpreter import Interpreter
+from jlox.parser import Parser
+from jlox.resolver import Resolver
+from jlox.scanner import Scanner
+from jlox.specializer import MAX_CLONES_PER_FUNCTION, fold_constants, specialize_calls
+from jlox.statement import FunctionStmt, Stmt
+
+
+def parse(source: str) -> list[Stmt]:
+    return Parser(Scanner(source).scan_tokens()).parse()
+
+
+def run(statements: list[Stmt], capsys) -> str:
+    interpreter = Interpreter(tiering=False)
+    Resolver(interpreter).resolve(statements)
+    interpreter.interpret(statements)
+    return capsys.readouterr().out
+
+
+def clones(statements: list[Stmt]) -> dict[str, str]:
+    printer = AstPrinter()
+    return {
+        stmt.name.lexeme: printer.print(stmt)
+        for stmt in statements
+        if isinstance(stmt, FunctionStmt) and "$" in stmt.name.lexeme
+    }
+
+
+mode_source = """
+fun scale(mode, x) {
+    if (mode == "double") return x * 2;
+    if (mode == "square" or mode == "cube") {
+        if (mode == "cube") return x * x * x;
+        return x * x;
+    }
+    return x;
+}
+for (var i = 0; i < 3; i = i + 1) {
+    print scale("double", i) + scale("cube", i) + scale("none", i);
+}
+print scale(-(-1), 2);
+"""
+
+
+def test_clones_fold_away_decided_branches(capsys):
+    statements = specialize_calls(parse(mode_source))
+
+    assert clones(statements) == {
+        "scale$1": "(fun scale$1 (x)\n  (return (* x 2.0)))",
+        "scale$2": "(fun scale$2 (x)\n  (block\n    (return (* (* x x) x))))",
+        "scale$3": "(fun scale$3 (x)\n  (return x))",
+        "scale$4": "(fun scale$4 ()\n  (return 2.0))",
+    }
+    assert run(statements, capsys) == run(parse(mode_source), capsys)
+
+
+redefined_source = """
+fun pick(flag) { if (flag) return "yes"; return "no"; }
+var f = pick;
+print f(true);
+print pick(true);
+"""
+
+
+def test_calls_are_guarded(capsys):
+    assert run(specialize_calls(parse(redefined_source)), capsys) == "yes\nyes\n"
+
+    # pick is reassigned, so it could be anything when called.
+    source = redefined_source + "pick = clock;"
+    assert clones(specialize_calls(parse(source))) == {}
+
+
+def test_rebound_parameters_are_not_substituted():
+    source = """
+    fun f(a, b) { a = a + 1; fun g(b) { return b; } return a + g(b); }
+    print f(1, 2);
+    """
+    assert clones(specialize_calls(parse(source))) == {}
+
+
+def test_clones_are_bounded():
+    calls = "".join(f"print f({n});" for n in range(MAX_CLONES_PER_FUNCTION + 4))
+    source = "fun f(n) { if (n > 2) return n; return -n; }" + calls
+
+    assert len(clones(specialize_calls(parse(source)))) == MAX_CLONES_PER_FUNCTION
+
+
+def test_folding_keeps_errors_for_run_time():
+    printer = AstPrinter()
+    statements = fold_constants(
+        parse('print 1 + "a"; print 1 / 0; print !nil and (2 < 3); while (false) {}')
+    )
+
+    assert [printer.print(stmt) for stmt in statements] == [
+        '(print (+ 1.0 "a"))',
+        "(print (/ 1.0 0.0))",
+        "(print true)",
+    ]
@@ -0,0 +1,62 @@
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import jlox
+
+THREADS = 32
+
+source = """
+class Counter {
+    init(start) { this.count = start; }
+    add(n) { this.count = this.count + n; return this; }
+}
+
+fun adder(n) {
+    fun add(x) { return x + n; }
+    return add;
+}
+
+var counter = Counter(seed);
+var add_seed = adder(seed);
+var total = 0;
+for (var i = 0; i < 300; i = i + 1) {
+    counter.add(1);
+    total = add_seed(total);
+}
+print counter.count + total;
+"""
+
+
+@pytest.fixture
+def switch_often():
+    # Switch threads as often as possible, so they interleave inside runs.
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+@pytest.mark.parametrize("level", [0, 2])
+def test_runs_one_program_from_many_threads(switch_often, level: int):
+    program = jlox.compile(source, level)
+    start = threading.Barrier(THREADS)
+
+    def run(seed: int) -> list[str]:
+        start.wait()
+        outputs = []
+        for tiering in [False, True, True]:
+            stdout = io.StringIO()
+            result = program.run({"seed": seed}, stdout, tiering=tiering)
+            assert result["total"] == seed * 300
+            outputs.append(stdout.getvalue())
+        return outputs
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        results = list(pool.map(run, range(THREADS)))
+
+    for seed, outputs in enumerate(results):
+        assert outputs == [f"{seed + 300 + seed * 300:.1f}\n"] * 3
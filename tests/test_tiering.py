@@ -0,0 +1,136 @@
+import pytest
+
+from jlox.interpreter import Interpreter
+from jlox.parser import Parser
+from jlox.resolver import Resolver
+from jlox.scanner import Scanner
+from jlox.statement import FunctionStmt, Stmt, WhileStmt
+from jlox.tiering import TierController
+
+
+def parse(source: str) -> list[Stmt]:
+    return Parser(Scanner(source).scan_tokens()).parse()
+
+
+def run(interpreter: Interpreter, source: str) -> list[Stmt]:
+    statements = parse(source)
+    Resolver(interpreter).resolve(statements)
+    interpreter.interpret(statements)
+    return statements
+
+
+def eager_interpreter() -> Interpreter:
+    interpreter = Interpreter()
+    interpreter._tiers = TierController(interpreter, call_threshold=1, loop_threshold=1)
+    return interpreter
+
+
+lox_program = """
+class Shape {
+    init(name) { this.name = name; }
+    describe() { print this.area(); return this.name; }
+}
+
+class Square < Shape {
+    init(side) { super.init("square"); this.side = side; }
+    area() { return this.side * this.side; }
+    describe() { return "a " + super.describe(); }
+}
+
+fun make_counter() {
+    var count = 0;
+    fun counter() {
+        count = count + 1;
+        return count;
+    }
+    return counter;
+}
+
+fun fib(n) {
+    if (n < 2) return n;
+    return fib(n - 1) + fib(n - 2);
+}
+
+var counter = make_counter();
+var total = 0;
+for (var i = 0; i < 30; i = i + 1) {
+    if (i == 25) break;
+    total = total + counter();
+    var label = i > 10 ? "big" : "small";
+    if (i == 3 or i == 20) print label;
+    if (i == 3 or i == 20) print total;
+}
+
+var shapes = 0;
+while (shapes < 5) {
+    shapes = shapes + 1;
+    print Square(shapes).describe();
+}
+
+var negate = fun (x) { return -x; };
+print negate(fib(12));
+print !nil and true;
+"""
+
+
+def test_compiled_tier_matches_tree_walker(capsys: pytest.CaptureFixture[str]):
+    run(Interpreter(tiering=False), lox_program)
+    expected = capsys.readouterr().out
+
+    run(eager_interpreter(), lox_program)
+    assert capsys.readouterr().out == expected
+
+
+def test_hot_function_is_promoted():
+    interpreter = Interpreter()
+    interpreter._tiers = TierController(interpreter, call_threshold=3)
+
+    statements = run(
+        interpreter,
+        """
+        fun hot(x) { return x + 1; }
+        fun cold(x) { return x - 1; }
+        var a = 0;
+        for (var i = 0; i < 5; i = i + 1) a = hot(a);
+        a = cold(a);
+        assert_equal(a, 4);
+        """,
+    )
+
+    hot, cold = statements[0], statements[1]
+    assert isinstance(hot, FunctionStmt) and isinstance(cold, FunctionStmt)
+    assert interpreter._tiers.is_compiled(hot)
+    assert not interpreter._tiers.is_compiled(cold)
+
+
+def test_hot_loop_is_promoted_mid_loop():
+    interpreter = Interpreter()
+    interpreter._tiers = TierController(interpreter, loop_threshold=10)
+
+    statements = run(
+        interpreter,
+        """
+        var i = 0;
+        var sum = 0;
+        while (i < 100) {
+            sum = sum + i;
+            i = i + 1;
+        }
+        assert_equal(sum, 4950);
+        var j = 0;
+        while (j < 3) j = j + 1;
+        """,
+    )
+
+    hot, cold = statements[2], statements[5]
+    assert isinstance(hot, WhileStmt) and isinstance(cold, WhileStmt)
+    assert interpreter._tiers.is_compiled(hot)
+    assert not interpreter._tiers.is_compiled(cold)
+
+
+def test_compiled_code_raises_runtime_errors():
+    from jlox.errors import JloxRuntimeError
+
+    interpreter = eager_interpreter()
+    with pytest.raises(JloxRuntimeError):
+        run(interpreter, 'fun f(x) { return x - "a"; } f(1);')
@@ -0,0 +1,110 @@
+from operator import add, mul, neg
+
+from jlox.ast_utils import walk
+from jlox.expression import BinaryExpr, CallExpr, UnaryExpr
+from jlox.interpreter import Interpreter
+from jlox.parser import Parser
+from jlox.resolver import Resolver
+from jlox.scanner import Scanner
+from jlox.statement import Stmt
+from jlox.type_inference import TypeTable, format_types, infer_types
+
+
+def parse(source: str) -> list[Stmt]:
+    statements = Parser(Scanner(source).scan_tokens()).parse()
+    Resolver(Interpreter(tiering=False)).resolve(statements)
+    return statements
+
+
+def types_of(table: TypeTable, statements: list[Stmt], kind: type) -> list:
+    return [table.type_of(node) for node in walk(statements) if isinstance(node, kind)]
+
+
+loop_source = """
+fun f(n) {
+    var total = 0;
+    var text = "";
+    for (var i = 0; i < n; i = i + 1) {
+        total = total + i * 2;
+        text = text + "x";
+    }
+    return -total;
+}
+"""
+
+
+def test_locals_updated_with_arithmetic_stay_numbers():
+    statements = parse(loop_source)
+    table = infer_types(statements)
+
+    # i < n, total + i * 2, i * 2, text + "x", i + 1
+    assert types_of(table, statements, BinaryExpr) == [
+        "bool",
+        "number",
+        "number",
+        "string",
+        "number",
+    ]
+    assert types_of(table, statements, UnaryExpr) == ["number"]
+
+    operations = table.unchecked_operations()
+    binaries = [node for node in walk(statements) if isinstance(node, BinaryExpr)]
+    # n is a parameter, so i < n keeps its checks.
+    assert binaries[0] not in operations
+    assert [operations[expr] for expr in binaries[1:]] == [add, mul, add, add]
+    unary = next(node for node in walk(statements) if isinstance(node, UnaryExpr))
+    assert operations[unary] is neg
+
+
+merge_source = """
+class Point {}
+fun f(flag) {
+    var x = 1;
+    if (flag) x = "one";
+    var y = x - 1;
+    var z = 2;
+    fun bump() { z = z + 1; }
+    return z - 1;
+}
+var global = 1;
+print global - 1;
+print Point();
+"""
+
+
+def test_unknown_types():
+    statements = parse(merge_source)
+    table = infer_types(statements)
+
+    # x - 1 is still a number: numbers never mix with anything else, and z is
+    # assigned by a closure. z + 1 in the closure, global - 1 at the top.
+    assert types_of(table, statements, BinaryExpr) == [
+        "number",
+        "number",
+        "number",
+        "number",
+    ]
+
+    operations = table.unchecked_operations()
+    assert not any(isinstance(expr, BinaryExpr) for expr in operations)
+    assert types_of(table, statements, CallExpr) == ["instance Point"]
+
+
+def test_typed_programs_run_the_same(capsys):
+    for tiering in (False, True):
+        statements = parse(loop_source + "print f(300);")
+        interpreter = Interpreter(tiering=tiering)
+        Resolver(interpreter).resolve(statements)
+        interpreter.use_types(infer_types(statements))
+        interpreter.interpret(statements)
+
+    assert capsys.readouterr().out == "-89700.0\n-89700.0\n"
+
+
+def test_dump_reports_coverage():
+    output = format_types(infer_types(parse(loop_source)))
+
+    assert output.splitlines()[0] == ";; <script>"
+    assert "   6  (+ total (* i 2.0)) : number" in output
+    assert "   5  n : ?" in output
+    assert output.splitlines()[-1].endswith("15 of 16 expressions typed (94%)")
@@ -0,0 +1,115 @@
+import json
+
+import pytest
+
+from jlox.interpreter import Interpreter
+from jlox.parser import Parser
+from jlox.pass_manager import PassManager
+from jlox.resolver import Resolver
+from jlox.scanner import Scanner
+from jlox.statement import CountingLoopStmt, FunctionStmt, Stmt
+from jlox.type_profile import ProfileHints, ProfilingInterpreter, TypeProfile
+
+lox_program = """
+class Point {
+    init(x, y) { this.x = x; this.y = y; }
+}
+
+fun norm(p) { return p.x * p.x + p.y * p.y; }
+
+var total = 0;
+var label = "";
+for (var i = 0; i < 10; i = i + 1) {
+    if (i < 8) total = total + norm(Point(i, 1));
+    label = label + "a";
+}
+print total;
+print label;
+"""
+
+
+def parse(source: str) -> list[Stmt]:
+    return Parser(Scanner(source).scan_tokens()).parse()
+
+
+def run(interpreter: Interpreter, statements: list[Stmt]):
+    Resolver(interpreter).resolve(statements)
+    interpreter.interpret(statements)
+
+
+def record(source: str) -> TypeProfile:
+    interpreter = ProfilingInterpreter()
+    run(interpreter, parse(source))
+    return interpreter.profile
+
+
+def test_profile_records_sites(capsys: pytest.CaptureFixture[str]):
+    profile = record(lox_program)
+    capsys.readouterr()
+
+    binary_types = [set(types) for types in profile.binary.values()]
+    assert {"number number"} in binary_types
+    assert {"string string"} in binary_types
+    assert {"Point"} in [set(receivers) for receivers in profile.get.values()]
+    assert [8, 2] in profile.branch.values()
+    assert 10 in profile.loop.values()
+
+
+def test_profile_records_counting_loops(capsys: pytest.CaptureFixture[str]):
+    statements = PassManager.for_level(2).run(parse(lox_program))
+    interpreter = ProfilingInterpreter()
+    run(interpreter, statements)
+    capsys.readouterr()
+
+    [loop] = [stmt for stmt in statements if isinstance(stmt, CountingLoopStmt)]
+    assert ProfileHints(interpreter.profile, statements).loop_iterations(loop) == 10
+    assert {"number number"} in [
+        set(types) for types in interpreter.profile.binary.values()
+    ]
+
+
+def test_profile_round_trips_and_rejects_other_sources(
+    capsys: pytest.CaptureFixture[str],
+):
+    profile = record(lox_program)
+    capsys.readouterr()
+
+    data = json.loads(json.dumps(profile.to_json(lox_program)))
+
+    loaded = TypeProfile.from_json(data, lox_program)
+    assert loaded is not None
+    assert loaded.call == profile.call
+
+    assert TypeProfile.from_json(data, lox_program + "print 1;") is None
+
+    # Sites are numbered after the passes, which have to match as well.
+    assert TypeProfile.from_json(data, lox_program, ["counting-loops"]) is None
+
+
+def test_hints_resolve_sites_in_a_fresh_parse(capsys: pytest.CaptureFixture[str]):
+    profile = record(lox_program)
+    capsys.readouterr()
+
+    statements = parse(lox_program)
+    hints = ProfileHints(profile, statements)
+
+    norm = statements[1]
+    assert isinstance(norm, FunctionStmt)
+    assert hints.call_count(norm) == 8
+
+
+def test_profile_guided_run_compiles_up_front(capsys: pytest.CaptureFixture[str]):
+    profile = record(lox_program)
+    expected = capsys.readouterr().out
+
+    statements = parse(lox_program)
+    interpreter = Interpreter()
+    Resolver(interpreter).resolve(statements)
+
+    hints = ProfileHints(profile, statements)
+    interpreter._tiers._call_threshold = 5
+    interpreter.use_profile(hints)
+    interpreter.interpret(statements)
+
+    assert capsys.readouterr().out == expected
+    assert interpreter._tiers.is_compiled(statements[1])